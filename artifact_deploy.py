@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Prebuilt Artifact Deploy
+
+Ships binaries from an ARM build done elsewhere (cross or emulated build on
+the dev machine) instead of rebuilding on the Pi:
+- collects the DEBUG_PROGRAMS binaries and the shared libraries of devel/lib
+- transfers only objects whose content hash changed since the last deploy,
+  as one compressed archive
+- stages them as a new generation of $workspace/devel/lib (hard-linked copy),
+  verifies the programs and switches the devel/lib symlink atomically; the
+  previous generation is kept for rollback
+
+The "remote" can be a local directory (--local-root), which makes the
+deploy testable without a Pi.
+
+Usage:
+    python3 artifact_deploy.py --source build-arm/devel   # Deploy changed artifacts
+    python3 artifact_deploy.py --dry-run                  # Only show what would be shipped
+    python3 artifact_deploy.py --local-root /tmp/pi_ws    # Deploy into a local directory
+    python3 artifact_deploy.py rollback                   # Restore the previous devel/lib
+"""
+
+import argparse
+import fnmatch
+import gzip
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tarfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, detect_project_binaries, get_cache_dir, get_project_root, get_ssh_args, get_target_id
+import delta_sync
+import ssh_session
+
+# Deployed hashes, stored inside devel/lib so that it is swapped (and rolled back) with the libraries
+REMOTE_MANIFEST_NAME = ".artifact_manifest.json"
+
+# Shared libraries shipped in addition to the debug programs
+LIBRARY_PATTERNS = ("*.so", "*.so.*")
+
+# ELF e_machine values accepted as Pi binaries
+ARM_MACHINES = {40: "arm", 183: "aarch64"}
+
+# ============================================================================
+# ARTIFACT COLLECTION
+# ============================================================================
+
+def get_source_devel_dir(source=None):
+    """devel/ directory of the ARM build (--source, artifact_devel_dir or the project's devel/)."""
+    source = source or REMOTE_CONFIG.get("artifact_devel_dir") or os.path.join(get_project_root(), "devel")
+    return os.path.abspath(os.path.expanduser(source))
+
+def get_elf_machine(path):
+    """Returns the ELF e_machine of a file (None if not ELF)."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(20)
+    except OSError:
+        return None
+    if len(header) < 20 or header[:4] != b"\x7fELF":
+        return None
+    return int.from_bytes(header[18:20], "little" if header[5] == 1 else "big")
+
+def collect_artifacts(devel_dir):
+    """Lists the artifacts relative to devel/lib: debug program binaries and shared libraries."""
+    lib_dir = os.path.join(devel_dir, "lib")
+    artifacts = set()
+    missing = []
+    for program in detect_project_binaries():
+        if os.path.isfile(os.path.join(lib_dir, program["path"])):
+            artifacts.add(program["path"])
+        else:
+            missing.append(program["name"])
+    if missing:
+        print(f"ℹ️  Not in build output ({len(missing)}): {', '.join(missing)}")
+    for dirpath, _, filenames in os.walk(lib_dir):
+        for name in filenames:
+            if any(fnmatch.fnmatch(name, pattern) for pattern in LIBRARY_PATTERNS):
+                full_path = os.path.join(dirpath, name)
+                if not os.path.islink(full_path):
+                    artifacts.add(os.path.relpath(full_path, lib_dir))
+    return sorted(artifacts)
+
+def check_architecture(lib_dir, artifacts):
+    """Returns the artifacts that are ELF files for a non-ARM machine."""
+    foreign = []
+    for path in artifacts:
+        machine = get_elf_machine(os.path.join(lib_dir, path))
+        if machine is not None and machine not in ARM_MACHINES:
+            foreign.append(path)
+    return foreign
+
+def hash_artifacts(lib_dir, artifacts, previous):
+    """Builds {path: [size, mtime_ns, hash]}, re-hashing only files with changed size/mtime."""
+    manifest = {}
+    for path in artifacts:
+        st = os.stat(os.path.join(lib_dir, path))
+        cached = previous.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            manifest[path] = cached
+        else:
+            manifest[path] = [st.st_size, st.st_mtime_ns, delta_sync.hash_file(os.path.join(lib_dir, path))]
+    return manifest
+
+# ============================================================================
+# TARGET ACCESS (SSH or local directory)
+# ============================================================================
+
+def get_target_workspace(local_root=None):
+    """Workspace path on the target."""
+    return os.path.abspath(local_root) if local_root else REMOTE_CONFIG["workspace"]
+
+def get_state_path(local_root=None):
+    """Local record of the deployed hashes for the target."""
+    state_dir = os.path.join(get_cache_dir(), "artifacts")
+    os.makedirs(state_dir, exist_ok=True)
+    name = "local-" + os.path.abspath(local_root).strip("/").replace("/", "_") if local_root else get_target_id()
+    return os.path.join(state_dir, name + ".json")
+
+def popen_target(script, local_root=None, **kwargs):
+    """Runs a bash script on the target (locally for --local-root)."""
+    if local_root:
+        return subprocess.Popen(["bash", "-c", script], **kwargs)
+    ssh_session.ensure_master(quiet=True)
+    return subprocess.Popen(["ssh"] + get_ssh_args() + [f"bash -c {shlex.quote(script)}"], **kwargs)
+
+def run_target(script, local_root=None):
+    """Runs a bash script on the target. Returns (returncode, output)."""
+    process = popen_target(script, local_root, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    output, _ = process.communicate()
+    return process.returncode, output
+
+def fetch_deployed_manifest(local_root=None):
+    """Reads the manifest of the currently deployed artifacts from the target."""
+    lib_dir = shlex.quote(get_target_workspace(local_root) + "/devel/lib")
+    returncode, output = run_target(f"cat {lib_dir}/{REMOTE_MANIFEST_NAME} 2>/dev/null || true", local_root)
+    try:
+        return json.loads(output) if returncode == 0 and output.strip() else {}
+    except ValueError:
+        return {}
+
+def get_generation_prelude(workspace):
+    """Remote shell prelude: paths of the devel/lib symlink and its generation directories."""
+    devel = shlex.quote(workspace + "/devel")
+    return f"""set -e
+shopt -s nullglob
+devel={devel}
+lib="$devel/lib"; gens="$devel/.lib-gen"; prev="$devel/.lib.prev"
+# Atomic switch of a symlink: rename(2) of a fresh link over the old one
+switch_link() {{ ln -sfn "$2" "$1.new" && mv -T "$1.new" "$1"; }}
+"""
+
+def get_swap_script(workspace, programs):
+    """
+    Remote script: unpacks the archive (stdin) into a staging dir, overlays it on a
+    hard-linked copy of the current generation, verifies the programs and switches
+    the devel/lib symlink to the new generation.
+    """
+    checks = "\n".join(f"check {shlex.quote(path)}" for path in programs)
+    return get_generation_prelude(workspace) + f"""stage="$devel/.artifact-stage"
+mkdir -p "$gens"
+next=0
+for dir in "$gens"/*; do
+    name="${{dir##*/}}"
+    [ "$name" -ge "$next" ] 2>/dev/null && next=$((name + 1))
+done
+if [ ! -L "$lib" ]; then
+    # One-time migration of a plain devel/lib directory into the first generation
+    mkdir -p "$lib"
+    mv "$lib" "$gens/$next"
+    ln -s ".lib-gen/$next" "$lib"
+    next=$((next + 1))
+fi
+# Leftovers of an interrupted run or of the former directory-rename layout
+rm -rf "$stage" "$lib.new" "$prev.new"
+[ -L "$prev" ] || rm -rf "$prev"
+current="$(readlink "$lib")"; new="$gens/$next"
+mkdir -p "$stage"
+tar xzf - -C "$stage"
+# Hard links: unchanged files cost no space, replaced files get new inodes (the live generation is untouched)
+cp -al "$devel/$current" "$new"
+(cd "$stage" && find . -type f -print0) | while IFS= read -r -d '' f; do
+    mkdir -p "$new/$(dirname "$f")"; mv -f "$stage/$f" "$new/$f"
+done
+rm -rf "$stage"
+check() {{
+    if [ ! -x "$new/$1" ]; then echo "@@VERIFY $1 missing or not executable"; rm -rf "$new"; exit 3; fi
+    if command -v ldd >/dev/null && LD_LIBRARY_PATH="$new:/opt/ros/noetic/lib" ldd "$new/$1" 2>/dev/null | grep -q 'not found'; then
+        echo "@@VERIFY $1 has unresolved libraries"; rm -rf "$new"; exit 3
+    fi
+}}
+{checks}
+switch_link "$prev" "$current"
+switch_link "$lib" ".lib-gen/$next"
+echo '@@SWAPPED'
+# Keep only the live and the previous generation
+for dir in "$gens"/*; do
+    case ".lib-gen/${{dir##*/}}" in ".lib-gen/$next"|"$current") ;; *) rm -rf "$dir" ;; esac
+done
+"""
+
+def get_rollback_script(workspace):
+    """Remote script switching devel/lib back to the previous generation."""
+    return get_generation_prelude(workspace) + """[ -L "$prev" ] && [ -d "$devel/$(readlink "$prev")" ] || { echo '@@ROLLBACK no previous generation'; exit 1; }
+failed="$(readlink "$lib")"
+switch_link "$lib" "$(readlink "$prev")"
+rm -f "$prev"
+rm -rf "${devel:?}/$failed"
+echo '@@ROLLBACK done'
+"""
+
+# ============================================================================
+# DEPLOY
+# ============================================================================
+
+def deploy(source=None, local_root=None, full=False, dry_run=False, any_arch=False):
+    """Deploys changed artifacts. Returns a statistics dict (None on failure)."""
+    start = time.monotonic()
+    devel_dir = get_source_devel_dir(source)
+    lib_dir = os.path.join(devel_dir, "lib")
+    if not os.path.isdir(lib_dir):
+        print(f"❌ No build output in {lib_dir}", file=sys.stderr)
+        return None
+
+    artifacts = collect_artifacts(devel_dir)
+    foreign = check_architecture(lib_dir, artifacts)
+    if foreign and not any_arch:
+        print(f"❌ Not built for the Pi (non-ARM ELF): {', '.join(foreign[:5])}", file=sys.stderr)
+        print("   Use the output of a cross/emulated ARM build (--source) or --any-arch", file=sys.stderr)
+        return None
+
+    state_path = get_state_path(local_root)
+    state = delta_sync.load_json(state_path, None)
+    deployed = {} if full else (state or {}).get("deployed")
+    if deployed is None:
+        deployed = fetch_deployed_manifest(local_root)
+    manifest = hash_artifacts(lib_dir, artifacts, (state or {}).get("source", {}))
+    changed = [path for path, entry in manifest.items() if deployed.get(path) != entry[2]]
+
+    stats = {
+        "artifacts": len(artifacts),
+        "changed": len(changed),
+        "raw_bytes": sum(manifest[path][0] for path in changed),
+        "sent_bytes": 0,
+        "seconds": 0.0,
+    }
+    print(f"📦 {len(artifacts)} artifacts, {len(changed)} changed "
+          f"({delta_sync.format_bytes(stats['raw_bytes'])})")
+    if dry_run:
+        for path in changed:
+            print(f"   M {path}")
+        return stats
+    if not changed:
+        print("✅ Deployed artifacts are up to date")
+        return stats
+
+    hashes = {path: entry[2] for path, entry in manifest.items()}
+    deployed_after = dict(deployed, **hashes)
+    programs = [p["path"] for p in detect_project_binaries() if p["path"] in manifest]
+    process = popen_target(get_swap_script(get_target_workspace(local_root), programs), local_root,
+                           stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    counter = delta_sync.CountingWriter(process.stdin)
+    try:
+        with gzip.GzipFile(fileobj=counter, mode="wb", compresslevel=6) as gz:
+            with tarfile.open(fileobj=gz, mode="w|") as tar:
+                for path in changed:
+                    tar.add(os.path.join(lib_dir, path), arcname=path, recursive=False)
+                delta_sync.add_bytes_to_tar(tar, REMOTE_MANIFEST_NAME, json.dumps(deployed_after).encode())
+        process.stdin.close()
+    except BrokenPipeError:
+        pass
+    output = process.stdout.read().decode(errors="replace")
+    process.wait()
+    stats["sent_bytes"] = counter.count
+    stats["seconds"] = round(time.monotonic() - start, 2)
+
+    for line in output.splitlines():
+        if line.startswith("@@VERIFY") or line.startswith("@@ROLLBACK"):
+            print(f"❌ {line[2:]}", file=sys.stderr)
+        elif not line.startswith("@@"):
+            print(f"   {line}")
+    if process.returncode != 0 or "@@SWAPPED" not in output:
+        print("❌ Artifact deploy failed - devel/lib on the target is unchanged", file=sys.stderr)
+        return None
+
+    delta_sync.save_json(state_path, {"deployed": deployed_after, "source": manifest, "time": time.time()})
+    print(f"📡 Sent {delta_sync.format_bytes(stats['sent_bytes'])} compressed, swapped devel/lib in {stats['seconds']:.2f}s")
+    return stats
+
+def rollback(local_root=None):
+    """Restores the previous devel/lib generation on the target."""
+    returncode, output = run_target(get_rollback_script(get_target_workspace(local_root)), local_root)
+    # The local record no longer matches - the next deploy reads the manifest from the target
+    if os.path.exists(get_state_path(local_root)):
+        state = delta_sync.load_json(get_state_path(local_root), {})
+        state.pop("deployed", None)
+        delta_sync.save_json(get_state_path(local_root), state)
+    if returncode != 0:
+        print(f"❌ {output.strip().lstrip('@')}", file=sys.stderr)
+        return False
+    print("↩️  Previous devel/lib restored")
+    return True
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower prebuilt artifact deploy")
+    parser.add_argument("action", nargs="?", choices=["deploy", "rollback"], default="deploy")
+    parser.add_argument("--source", help="devel/ directory of the ARM build")
+    parser.add_argument("--local-root", help="Local directory acting as the remote workspace")
+    parser.add_argument("--full", action="store_true", help="Ship all artifacts")
+    parser.add_argument("--dry-run", action="store_true", help="Only show changed artifacts")
+    parser.add_argument("--any-arch", action="store_true", help="Skip the ARM architecture check")
+    parser.add_argument("--json", action="store_true", help="Print statistics as JSON")
+    args = parser.parse_args()
+
+    if args.action == "rollback":
+        return 0 if rollback(args.local_root) else 1
+    stats = deploy(args.source, args.local_root, args.full, args.dry_run, args.any_arch)
+    if stats is None:
+        return 1
+    if args.json:
+        print(json.dumps(stats, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
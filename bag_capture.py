@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Rosbag Capture
+
+Records rosbags on the Pi during field sessions and pulls them over flaky Wi-Fi:
+- `start`/`stop` run an lz4-compressed, topic-filtered `rosbag record` in `bag_dir`
+- `pull` transfers a bag in fixed-size chunks addressed by their SHA-256; the
+  chunks land in a local store, so an interrupted transfer resumes with the
+  missing chunks only and chunks that exist locally are never sent again
+- the assembled bag is verified against the SHA-256 of the whole file on the Pi
+- throughput and ETA are shown while transferring
+
+The "Pi" can be a local directory (--local-root), which makes the transfer
+testable without a robot.
+
+Usage:
+    python3 bag_capture.py start                        # Record bag_topics (all if empty)
+    python3 bag_capture.py start --topics /odom /imu/data_raw --name rtk_drift
+    python3 bag_capture.py stop
+    python3 bag_capture.py list
+    python3 bag_capture.py pull rtk_drift.bag           # Resumable chunked transfer
+    python3 bag_capture.py pull --all --local-root /tmp/fake_pi_bags
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shlex
+import struct
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, get_cache_dir, get_ros_environment, get_ssh_args, get_target_id
+import ssh_session
+
+PID_FILE = ".recording.pid"
+# Chunks requested per SSH call; a lost connection costs at most one batch
+CHUNKS_PER_CALL = 64
+RETRY_DELAYS = [1, 2, 5, 10, 20]
+MAX_RETRIES = 20
+
+# ============================================================================
+# PI SIDE (shipped as script - keep free of module dependencies)
+# ============================================================================
+
+def chunk_manifest(path, chunk_size):
+    """Prints {size, sha256, chunks} of a file; cached next to it until size or mtime change."""
+    import hashlib
+    import json
+    import os
+    stat = os.stat(path)
+    cache = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".chunks.json")
+    try:
+        with open(cache) as f:
+            manifest = json.load(f)
+        if (manifest["size"], manifest["mtime"], manifest["chunk_size"]) == (stat.st_size, stat.st_mtime, chunk_size):
+            print(json.dumps(manifest))
+            return
+    except (OSError, ValueError, KeyError):
+        pass
+    whole = hashlib.sha256()
+    chunks = []
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            whole.update(block)
+            chunks.append(hashlib.sha256(block).hexdigest())
+    manifest = {"size": stat.st_size, "mtime": stat.st_mtime, "chunk_size": chunk_size,
+                "sha256": whole.hexdigest(), "chunks": chunks}
+    try:
+        with open(cache, "w") as f:
+            json.dump(manifest, f)
+    except OSError:
+        pass
+    print(json.dumps(manifest))
+
+def send_chunks(path, chunk_size, indices):
+    """Writes the requested chunks to stdout as (index, length, data) frames."""
+    import struct
+    import sys
+    out = sys.stdout.buffer
+    with open(path, "rb") as f:
+        for index in indices:
+            f.seek(index * chunk_size)
+            data = f.read(chunk_size)
+            out.write(struct.pack(">II", index, len(data)) + data)
+            out.flush()
+
+def get_pi_script(function, *args):
+    """Python script (for 'python3 - <path>') calling a Pi-side function with the path and `args`."""
+    return f"import sys\n\n{inspect.getsource(function)}\n{function.__name__}(sys.argv[1], *{list(args)!r})\n"
+
+# ============================================================================
+# TARGET ACCESS (SSH or local directory)
+# ============================================================================
+
+def get_bag_dir(local_root=None):
+    """Bag directory on the target as a shell word ($HOME expanded by the remote shell)."""
+    if local_root:
+        return shlex.quote(os.path.abspath(local_root))
+    bag_dir = REMOTE_CONFIG["bag_dir"]
+    if bag_dir.startswith("~/"):
+        return '"$HOME"/' + shlex.quote(bag_dir[2:])
+    return shlex.quote(bag_dir)
+
+def popen_target(script, local_root=None, **kwargs):
+    """Runs a bash script on the target (locally for --local-root)."""
+    if local_root:
+        return subprocess.Popen(["bash", "-c", script], **kwargs)
+    ssh_session.ensure_master(quiet=True)
+    return subprocess.Popen(["ssh"] + get_ssh_args() + [f"bash -c {shlex.quote(script)}"], **kwargs)
+
+def run_target(script, local_root=None, input=None):
+    """Runs a bash script on the target. Returns (returncode, stdout, stderr)."""
+    process = popen_target(script, local_root, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                           stderr=subprocess.PIPE, text=True)
+    stdout, stderr = process.communicate(input)
+    return process.returncode, stdout, stderr
+
+def get_local_bag_dir(local_root=None):
+    """Where pulled bags are assembled."""
+    name = "local-" + os.path.abspath(local_root).strip("/").replace("/", "_") if local_root else get_target_id()
+    path = os.path.join(get_cache_dir(), "bags", name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def get_chunk_path(digest):
+    """Path of a chunk in the content-addressed store (shared by all targets)."""
+    return os.path.join(get_cache_dir(), "bags", "chunks", digest[:2], digest)
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+
+def start(topics, name, split_mb, local_root=None):
+    """Starts rosbag record in the background on the Pi."""
+    topics = topics or REMOTE_CONFIG["bag_topics"]
+    name = name or time.strftime("field_%Y%m%d_%H%M%S")
+    bag_dir = get_bag_dir(local_root)
+    exports = "; ".join(f"export {k}={shlex.quote(v)}" for k, v in get_ros_environment().items())
+    topic_args = " ".join(shlex.quote(t) for t in topics) if topics else "-a -x '/rosout_agg|.*/image_raw.*'"
+    split = f" --split --size={split_mb}" if split_mb else ""
+    script = f"""
+mkdir -p {bag_dir} && cd {bag_dir} || exit 1
+if [ -f {PID_FILE} ] && kill -0 $(cat {PID_FILE}) 2>/dev/null; then echo "already recording (PID $(cat {PID_FILE}))" >&2; exit 2; fi
+source /opt/ros/noetic/setup.bash
+source {shlex.quote(REMOTE_CONFIG['workspace'])}/devel/setup.bash 2>/dev/null
+{exports}
+setsid nohup rosbag record --lz4{split} -O {shlex.quote(name)}.bag {topic_args} > {shlex.quote(name)}.log 2>&1 < /dev/null &
+echo $! > {PID_FILE}
+sleep 2
+kill -0 $(cat {PID_FILE}) 2>/dev/null || {{ cat {shlex.quote(name)}.log >&2; exit 3; }}
+"""
+    returncode, _, stderr = run_target(script, local_root)
+    if returncode != 0:
+        print(f"❌ Recording did not start: {stderr.strip()}", file=sys.stderr)
+        return 1
+    print(f"🔴 Recording {name}.bag ({', '.join(topics) if topics else 'all topics'})")
+    return 0
+
+def stop(local_root=None):
+    """Stops the recording (SIGINT lets rosbag finish the .active file)."""
+    bag_dir = get_bag_dir(local_root)
+    script = f"""
+cd {bag_dir} 2>/dev/null && [ -f {PID_FILE} ] || {{ echo "not recording" >&2; exit 1; }}
+pid=$(cat {PID_FILE})
+kill -INT -- -$pid 2>/dev/null
+for i in $(seq 60); do
+    if ! kill -0 $pid 2>/dev/null && ! ls *.active >/dev/null 2>&1; then break; fi
+    sleep 0.5
+done
+rm -f {PID_FILE}
+ls -1 *.bag.active 2>/dev/null && exit 2
+exit 0
+"""
+    returncode, stdout, stderr = run_target(script, local_root)
+    if returncode == 1:
+        print("ℹ️  No recording running")
+        return 0
+    if returncode == 2:
+        print(f"⚠️  Unfinished bags (rosbag reindex needed): {stdout.split()}")
+        return 1
+    if returncode != 0:
+        print(f"❌ Stopping the recording failed (exit code {returncode}) {stderr.strip()}".rstrip(), file=sys.stderr)
+        return 1
+    print("⏹️  Recording stopped")
+    return list_bags(local_root)
+
+def get_remote_bags(local_root=None):
+    """Finished bags on the Pi: list of (name, size). Raises RuntimeError if the listing fails."""
+    bag_dir = get_bag_dir(local_root)
+    returncode, stdout, stderr = run_target(
+        f"[ -d {bag_dir} ] || exit 0; cd {bag_dir} && find . -maxdepth 1 -name '*.bag' -type f -printf '%f %s\\n'",
+        local_root
+    )
+    if returncode != 0:
+        raise RuntimeError(f"listing the bags failed (exit code {returncode}) {stderr.strip()}".rstrip())
+    bags = []
+    for line in stdout.splitlines():
+        name, _, size = line.rpartition(" ")
+        bags.append((name, int(size)))
+    return sorted(bags)
+
+def list_bags(local_root=None):
+    """Lists the bags on the Pi and whether they were pulled already."""
+    local_dir = get_local_bag_dir(local_root)
+    try:
+        bags = get_remote_bags(local_root)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    for name, size in bags:
+        pulled = os.path.exists(os.path.join(local_dir, name))
+        print(f"   {'✅' if pulled else '  '} {name:40s} {size / 1e6:10.1f} MB")
+    if not bags:
+        print("   No bags on the Pi")
+    return 0
+
+# ============================================================================
+# CHUNKED TRANSFER
+# ============================================================================
+
+def get_manifest(name, local_root=None):
+    """Chunk manifest of a bag on the Pi."""
+    chunk_size = REMOTE_CONFIG["bag_chunk_mb"] * 1024 * 1024
+    path = f"{get_bag_dir(local_root)}/{shlex.quote(name)}"
+    returncode, stdout, stderr = run_target(f"python3 - {path}", local_root, input=get_pi_script(chunk_manifest, chunk_size))
+    if returncode != 0:
+        raise RuntimeError(f"manifest of {name} failed: {stderr.strip()}")
+    return json.loads(stdout)
+
+def print_progress(name, done, total, received, started):
+    """Single-line live throughput."""
+    elapsed = max(time.monotonic() - started, 1e-6)
+    rate = received / elapsed
+    eta = (total - done) / rate if rate > 0 else 0
+    sys.stdout.write(f"\r   {name}: {done / 1e6:8.1f}/{total / 1e6:.1f} MB  {rate / 1e6:6.2f} MB/s  ETA {eta:5.0f}s ")
+    sys.stdout.flush()
+
+def fetch_chunks(name, manifest, missing, local_root, progress):
+    """Fetches chunks until done or the connection breaks. Returns the indices still missing."""
+    chunk_size = manifest["chunk_size"]
+    path = f"{get_bag_dir(local_root)}/{shlex.quote(name)}"
+    missing = list(missing)
+    while missing:
+        batch = missing[:CHUNKS_PER_CALL]
+        script = get_pi_script(send_chunks, chunk_size, batch)
+        process = popen_target(f"python3 - {path}", local_root, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+        process.stdin.write(script.encode())
+        process.stdin.close()
+        while True:
+            header = process.stdout.read(8)
+            if len(header) < 8:
+                break
+            index, length = struct.unpack(">II", header)
+            data = process.stdout.read(length)
+            if len(data) < length:
+                break
+            digest = manifest["chunks"][index]
+            if hashlib.sha256(data).hexdigest() != digest:
+                # Corrupted in transit: stays missing and is requested again
+                continue
+            target = get_chunk_path(digest)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(target + ".tmp", target)
+            missing.remove(index)
+            progress(length)
+        if process.wait() != 0 or any(i in missing for i in batch):
+            return missing
+    return missing
+
+def assemble(name, manifest, local_root=None):
+    """Concatenates the chunks into the bag and verifies the whole-file SHA-256. Returns the path."""
+    target = os.path.join(get_local_bag_dir(local_root), name)
+    whole = hashlib.sha256()
+    with open(target + ".part", "wb") as out:
+        for digest in manifest["chunks"]:
+            with open(get_chunk_path(digest), "rb") as f:
+                data = f.read()
+            whole.update(data)
+            out.write(data)
+    if whole.hexdigest() != manifest["sha256"] or os.path.getsize(target + ".part") != manifest["size"]:
+        os.unlink(target + ".part")
+        raise RuntimeError(f"{name}: checksum mismatch after assembly")
+    os.replace(target + ".part", target)
+    return target
+
+def pull(name, local_root=None, keep_chunks=False):
+    """Transfers one bag resumably. Returns a statistics dict."""
+    started = time.monotonic()
+    manifest = get_manifest(name, local_root)
+    chunk_size = manifest["chunk_size"]
+    sizes = [min(chunk_size, manifest["size"] - i * chunk_size) for i in range(len(manifest["chunks"]))]
+    missing = [i for i, digest in enumerate(manifest["chunks"]) if not os.path.exists(get_chunk_path(digest))]
+    reused = sum(sizes[i] for i in range(len(sizes)) if i not in set(missing))
+    print(f"📦 {name}: {len(manifest['chunks'])} chunks of {chunk_size // (1024 * 1024)} MB, "
+          f"{len(manifest['chunks']) - len(missing)} already local ({reused / 1e6:.1f} MB)")
+
+    state = {"done": reused, "received": 0}
+    transfer_start = time.monotonic()
+
+    def progress(length):
+        state["done"] += length
+        state["received"] += length
+        print_progress(name, state["done"], manifest["size"], state["received"], transfer_start)
+
+    attempt = 0
+    reconnects = 0
+    while missing:
+        missing = fetch_chunks(name, manifest, missing, local_root, progress)
+        if not missing:
+            break
+        if attempt >= MAX_RETRIES:
+            print()
+            raise RuntimeError(f"{name}: giving up with {len(missing)} chunks missing (run pull again to resume)")
+        delay = RETRY_DELAYS[min(attempt, len(RETRY_DELAYS) - 1)]
+        attempt += 1
+        reconnects += 1
+        print(f"\n🔌 Connection lost, {len(missing)} chunks missing - retrying in {delay}s")
+        time.sleep(delay)
+    if state["received"]:
+        print()
+
+    path = assemble(name, manifest, local_root)
+    if not keep_chunks:
+        for digest in set(manifest["chunks"]):
+            os.unlink(get_chunk_path(digest))
+    stats = {"bag": name, "size": manifest["size"], "received_bytes": state["received"], "reused_bytes": reused,
+             "reconnects": reconnects, "seconds": round(time.monotonic() - started, 2), "path": path}
+    print(f"✅ {name} verified (sha256 {manifest['sha256'][:16]}…), {stats['received_bytes'] / 1e6:.1f} MB "
+          f"transferred in {stats['seconds']:.1f}s -> {path}")
+    return stats
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower rosbag capture and resumable transfer")
+    parser.add_argument("command", choices=["start", "stop", "list", "pull"])
+    parser.add_argument("bags", nargs="*", help="Bags to pull")
+    parser.add_argument("--topics", nargs="+", help="Topics to record (default: bag_topics)")
+    parser.add_argument("--name", help="Bag name (default: field_<date>_<time>)")
+    parser.add_argument("--split-mb", type=int, default=0, help="Split the recording into bags of N MB")
+    parser.add_argument("--all", action="store_true", help="pull: all bags not pulled yet")
+    parser.add_argument("--keep-chunks", action="store_true", help="Keep the chunk store after assembly")
+    parser.add_argument("--local-root", help="Local directory standing in for the Pi's bag_dir")
+    parser.add_argument("--json", action="store_true", help="pull: print statistics as JSON")
+    args = parser.parse_args()
+
+    if args.command == "start":
+        return start(args.topics, args.name, args.split_mb, args.local_root)
+    if args.command == "stop":
+        return stop(args.local_root)
+    if args.command == "list":
+        return list_bags(args.local_root)
+
+    names = args.bags
+    if args.all:
+        local_dir = get_local_bag_dir(args.local_root)
+        try:
+            remote_bags = get_remote_bags(args.local_root)
+        except RuntimeError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        names = [name for name, _ in remote_bags if not os.path.exists(os.path.join(local_dir, name))]
+    if not names:
+        print("ℹ️  Nothing to pull")
+        return 0
+    results = []
+    try:
+        for name in names:
+            results.append(pull(name, args.local_root, args.keep_chunks))
+    except (RuntimeError, KeyboardInterrupt) as e:
+        print(f"\n❌ {e or 'Interrupted'} - run pull again to resume", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
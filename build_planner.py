@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Incremental Build Planner
+
+Maps the change set of the last sync(s) to ROS packages, builds the package
+dependency graph from each package.xml under src/ and rebuilds on the Pi only
+the affected packages plus everything that depends on them.
+
+A full catkin_make is still used when the workspace layout changes
+(package.xml or top-level CMakeLists.txt touched, packages added/removed)
+or when the Pi has never been built.
+
+Usage:
+    python3 build_planner.py               # Build pending changes from delta_sync.py
+    python3 build_planner.py --dry-run     # Only show the build plan
+    python3 build_planner.py --files a b   # Plan for explicit paths (relative to project root)
+    python3 build_planner.py --all         # Full catkin_make
+    python3 build_planner.py history       # Recent builds with per-package timings
+"""
+
+import argparse
+import json
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, get_cache_dir, get_project_root, get_ssh_args, get_target_id, scan_ros_packages
+import compiler_cache
+import delta_sync
+import ssh_session
+
+# package.xml tags that make a package need a rebuild when the dependency changes
+BUILD_DEPENDENCY_TAGS = ("depend", "build_depend", "build_export_depend", "buildtool_depend")
+
+# ============================================================================
+# PACKAGE GRAPH
+# ============================================================================
+
+def parse_package_xml(path):
+    """Reads name and build dependencies from a package.xml."""
+    root = ET.parse(path).getroot()
+    name = (root.findtext("name") or "").strip()
+    deps = set()
+    for tag in BUILD_DEPENDENCY_TAGS:
+        for element in root.findall(tag):
+            if element.text:
+                deps.add(element.text.strip())
+    return name, deps
+
+def load_packages():
+    """
+    Scans the workspace packages.
+    Returns {name: {"dir": path relative to src/, "deps": set of workspace package names}}.
+    """
+    src_dir = os.path.join(get_project_root(), "src")
+    packages = {}
+    for package_dir in scan_ros_packages():
+        try:
+            name, deps = parse_package_xml(os.path.join(src_dir, package_dir, "package.xml"))
+        except (OSError, ET.ParseError):
+            continue
+        packages[name or os.path.basename(package_dir)] = {"dir": package_dir, "deps": deps}
+
+    # Only dependencies inside the workspace matter for rebuilds
+    for info in packages.values():
+        info["deps"] &= set(packages)
+    return packages
+
+def get_dependents(packages):
+    """Builds the reverse dependency graph {package: set of packages depending on it}."""
+    dependents = {name: set() for name in packages}
+    for name, info in packages.items():
+        for dep in info["deps"]:
+            dependents[dep].add(name)
+    return dependents
+
+def topological_order(packages, selection):
+    """Orders the selected packages so that dependencies are built first."""
+    ordered = []
+    visited = set()
+
+    def visit(name):
+        if name in visited:
+            return
+        visited.add(name)
+        for dep in sorted(packages[name]["deps"]):
+            visit(dep)
+        if name in selection:
+            ordered.append(name)
+
+    for name in sorted(selection):
+        visit(name)
+    return ordered
+
+# ============================================================================
+# PLANNING
+# ============================================================================
+
+def map_file_to_package(path, packages):
+    """Returns the package owning a project-relative path (or None)."""
+    parts = path.split(os.sep)
+    if len(parts) < 2 or parts[0] != "src":
+        return None
+    rel_path = os.sep.join(parts[1:])
+    best = None
+    for name, info in packages.items():
+        prefix = info["dir"] + os.sep
+        if rel_path.startswith(prefix) and (best is None or len(info["dir"]) > len(packages[best]["dir"])):
+            best = name
+    return best
+
+def plan_build(changed, deleted, packages):
+    """
+    Creates the build plan for a change set.
+    Returns {"full": bool, "reason": str, "build": [ordered packages], "skipped": [packages]}.
+    """
+    all_paths = list(changed) + list(deleted)
+    touched = set()
+    for path in all_paths:
+        parts = path.split(os.sep)
+        if parts[0] != "src":
+            # Files outside src/ (e.g. the debug tools) don't affect the build,
+            # except the top-level workspace CMakeLists.txt
+            if path == "CMakeLists.txt":
+                return {"full": True, "reason": "workspace CMakeLists.txt changed", "build": [], "skipped": []}
+            continue
+        if path == os.path.join("src", "CMakeLists.txt"):
+            return {"full": True, "reason": "src/CMakeLists.txt changed", "build": [], "skipped": []}
+        if os.path.basename(path) == "package.xml":
+            return {"full": True, "reason": f"{path} changed (package graph)", "build": [], "skipped": []}
+        package = map_file_to_package(path, packages)
+        if package:
+            touched.add(package)
+
+    affected = set(touched)
+    dependents = get_dependents(packages)
+    queue = list(touched)
+    while queue:
+        for dependent in dependents[queue.pop()]:
+            if dependent not in affected:
+                affected.add(dependent)
+                queue.append(dependent)
+
+    return {
+        "full": False,
+        "reason": f"{len(touched)} package(s) changed",
+        "build": topological_order(packages, affected),
+        "skipped": sorted(set(packages) - affected),
+    }
+
+def print_plan(plan):
+    """Prints a build plan."""
+    if plan["full"]:
+        print(f"🔨 Full build: {plan['reason']}")
+        return
+    print(f"🔨 Targeted build: {plan['reason']}")
+    if plan["build"]:
+        print(f"   Build ({len(plan['build'])}): {', '.join(plan['build'])}")
+    print(f"   Skipped ({len(plan['skipped'])}): {', '.join(plan['skipped']) or '-'}")
+
+# ============================================================================
+# REMOTE BUILD
+# ============================================================================
+
+def get_history_path():
+    """Determines the build history file of the current target."""
+    history_dir = os.path.join(get_cache_dir(), "builds")
+    os.makedirs(history_dir, exist_ok=True)
+    return os.path.join(history_dir, get_target_id() + ".jsonl")
+
+def get_remote_prelude():
+    """Remote preparation (workspace, ROS environment) - runs while the build script is still pending."""
+    workspace = shlex.quote(REMOTE_CONFIG["workspace"])
+    return "\n".join([f"cd {workspace} || exit 1", "source /opt/ros/noetic/setup.bash || exit 1",
+                      compiler_cache.get_remote_setup(), "echo \"@@PID $$\"", "echo '@@READY'"])
+
+def get_remote_build_script(plan):
+    """Creates the remote build commands for a build plan. Markers (@@) report progress."""
+    # stdin is the script itself - build tools must not read from it
+    # $CCACHE_CMAKE_ARGS is set by the prelude when the compiler cache is available
+    lines = []
+    if plan["full"]:
+        lines.append("echo '@@START catkin_make'; catkin_make $CCACHE_CMAKE_ARGS </dev/null || exit 1; echo '@@DONE catkin_make'")
+        return "\n".join(lines + ["exit 0"])
+    # Never built on the Pi - the targeted build needs a configured build directory
+    lines.append("if [ ! -f build/Makefile ]; then echo '@@FULL'; "
+                 "echo '@@START catkin_make'; catkin_make $CCACHE_CMAKE_ARGS </dev/null || exit 1; echo '@@DONE catkin_make'; exit 0; fi")
+    for package in plan["build"]:
+        lines.append(f"echo '@@START {package}'; catkin_make --pkg {shlex.quote(package)} $CCACHE_CMAKE_ARGS </dev/null || exit 1; "
+                     f"echo '@@DONE {package}'")
+    return "\n".join(lines + ["exit 0"])
+
+def open_remote_shell():
+    """
+    Starts a remote bash that prepares the workspace and then waits for the build script on stdin.
+    Output lines are collected with their arrival time by a reader thread.
+    """
+    ssh_session.ensure_master(quiet=True)
+    process = subprocess.Popen(
+        ["ssh"] + get_ssh_args() + ["bash -s"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1
+    )
+    process.stdin.write(get_remote_prelude() + "\n")
+    process.stdin.flush()
+    lines = queue.Queue()
+
+    def reader():
+        for line in process.stdout:
+            lines.put((time.monotonic(), line))
+        lines.put((time.monotonic(), None))
+
+    threading.Thread(target=reader, daemon=True).start()
+    return {"process": process, "lines": lines, "started": time.monotonic(), "ready_seconds": None,
+            "remote_pid": None, "ccache": None}
+
+def finish_remote_build(shell, plan):
+    """Sends the build plan to an opened remote shell and streams the output. Returns (ok, timings)."""
+    process = shell["process"]
+    try:
+        process.stdin.write(get_remote_build_script(plan) + "\n")
+        process.stdin.close()
+    except BrokenPipeError:
+        pass  # Prelude failed - the exit code tells
+
+    timings = {}
+    started = {}
+    cache_stats = {"CCACHE_BEFORE": [], "CCACHE_AFTER": []}
+    while True:
+        arrival, line = shell["lines"].get()
+        if line is None:
+            break
+        if line.startswith("@@"):
+            parts = line.split()
+            if parts[0] == "@@PID":
+                shell["remote_pid"] = int(parts[1])
+            elif parts[0] == "@@READY":
+                shell["ready_seconds"] = round(arrival - shell["started"], 2)
+            elif parts[0] == "@@START":
+                started[parts[1]] = arrival
+            elif parts[0] == "@@DONE" and parts[1] in started:
+                timings[parts[1]] = round(arrival - started[parts[1]], 2)
+            elif parts[0] == "@@FULL":
+                print("⚠️  Pi workspace not configured yet - running full catkin_make")
+            elif parts[0][2:] in cache_stats:
+                cache_stats[parts[0][2:]].append(line.split(None, 1)[1] if len(parts) > 1 else "")
+            elif parts[0] == "@@CCACHE_MISSING":
+                print("⚠️  ccache not installed on the Pi - building without compiler cache")
+            continue
+        sys.stdout.write(line)
+    shell["ccache"] = compiler_cache.get_build_stats(cache_stats["CCACHE_BEFORE"], cache_stats["CCACHE_AFTER"])
+    return process.wait() == 0, timings
+
+def build(changed, deleted, full=False, dry_run=False):
+    """Plans and runs a build. Returns True on success."""
+    packages = load_packages()
+    if full:
+        plan = {"full": True, "reason": "requested", "build": [], "skipped": []}
+    else:
+        plan = plan_build(changed, deleted, packages)
+    print_plan(plan)
+
+    if dry_run:
+        return True
+    if not plan["full"] and not plan["build"]:
+        print("✅ Nothing to build")
+        return True
+
+    start = time.monotonic()
+    shell = open_remote_shell()
+    ok, timings = finish_remote_build(shell, plan)
+    record_build(plan, ok, timings, round(time.monotonic() - start, 2), shell["ccache"])
+    return ok
+
+def load_history():
+    """Loads the recorded builds of the current target."""
+    if not os.path.exists(get_history_path()):
+        return []
+    with open(get_history_path()) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def record_build(plan, ok, timings, total, cache=None):
+    """Prints the build times (and compiler cache use) and appends the build to the history."""
+    print("\n⏱️  Build times:")
+    for name, seconds in timings.items():
+        print(f"   {name:35s} {seconds:8.2f}s")
+    for name in plan["skipped"]:
+        print(f"   {name:35s}  skipped")
+    print(f"   {'total':35s} {total:8.2f}s")
+    if cache:
+        cache = dict(cache, saved_seconds=compiler_cache.estimate_saved_seconds(cache, total, load_history()))
+        print(compiler_cache.format_build_stats(cache, cache["saved_seconds"]))
+
+    with open(get_history_path(), "a") as f:
+        f.write(json.dumps({
+            "time": time.time(), "ok": ok, "full": plan["full"], "reason": plan["reason"],
+            "timings": timings, "skipped": plan["skipped"], "total": total, "ccache": cache,
+        }) + "\n")
+
+    if not ok:
+        print("❌ Remote build failed", file=sys.stderr)
+
+def print_history(limit):
+    """Prints the most recent builds."""
+    entries = load_history()
+    if not entries:
+        print("ℹ️  No builds recorded yet")
+        return
+    for entry in entries[-limit:]:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["time"]))
+        kind = "full" if entry["full"] else f"{len(entry['timings'])} pkg"
+        status = "✅" if entry["ok"] else "❌"
+        print(f"{status} {when}  {kind:8s} {entry['total']:8.2f}s  skipped {len(entry['skipped'])}  ({entry['reason']})")
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower incremental remote build")
+    parser.add_argument("action", nargs="?", choices=["build", "history"], default="build")
+    parser.add_argument("--files", nargs="+", help="Changed paths relative to the project root")
+    parser.add_argument("--all", action="store_true", help="Full catkin_make")
+    parser.add_argument("--dry-run", action="store_true", help="Only show the build plan")
+    parser.add_argument("-n", "--limit", type=int, default=10, help="Number of history entries")
+    args = parser.parse_args()
+
+    if args.action == "history":
+        print_history(args.limit)
+        return 0
+
+    if args.files:
+        changed, deleted = args.files, []
+    else:
+        pending = delta_sync.get_pending_changes()
+        changed, deleted = pending["changed"], pending["deleted"]
+
+    ok = build(changed, deleted, full=args.all, dry_run=args.dry_run)
+    if ok and not args.files and not args.dry_run:
+        delta_sync.clear_pending_changes()
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Compiler Cache
+
+Manages ccache for the remote builds:
+- every build started by build_planner.py (tasks, deploy.sh, watch mode) runs
+  with ccache as compiler launcher; the cache lives in `ccache_dir` outside
+  the workspace, so a clean build (rm -rf build devel) hits the cache
+- paths are made relative to the workspace (CCACHE_BASEDIR) and the compiler
+  is checked by content, so entries are valid on every machine with the
+  identical toolchain
+- `pull`/`push` mirror the cache of one Pi to the local cache directory and
+  pre-seed other targets from it; mirrors are keyed by a toolchain
+  fingerprint (architecture, ccache version, compiler binary hash) and only
+  entries missing on the other side are transferred
+- hit rate and the estimated compile time saved are reported after each build
+
+Usage:
+    python3 compiler_cache.py stats                      # Remote cache size + hit rates of recent builds
+    python3 compiler_cache.py pull                       # Mirror the Pi's cache locally
+    OPENMOWER_TARGET=mower2 python3 compiler_cache.py push   # Pre-seed another target with the mirror
+    python3 compiler_cache.py push --from /path/to/ccache --force  # Seed from any ccache directory
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shlex
+import statistics
+import subprocess
+import sys
+import tarfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, get_cache_dir, get_ssh_args
+import ssh_session
+
+# Cache bookkeeping files that are per machine and never transferred
+LOCAL_ONLY_FILES = ("stats", "ccache.conf", "*.lock", "*.tmp*")
+
+# ccache --print-stats keys (ccache >= 3.7) and their `ccache -s` labels (older versions)
+HIT_KEYS = ("direct_cache_hit", "preprocessed_cache_hit", "cache hit (direct)", "cache hit (preprocessed)")
+MISS_KEYS = ("cache_miss", "cache miss")
+
+# Builds where misses dominate calibrate the compile time per translation unit
+CALIBRATION_MIN_MISSES = 5
+
+# ============================================================================
+# BUILD INTEGRATION
+# ============================================================================
+
+def is_enabled():
+    """Checks whether remote builds use the compiler cache."""
+    return bool(REMOTE_CONFIG.get("ccache", True))
+
+def get_remote_cache_dir():
+    """Cache directory on the target as a shell word ($HOME expanded by the remote shell)."""
+    cache_dir = REMOTE_CONFIG.get("ccache_dir", "~/.cache/ccache-openmower")
+    if cache_dir.startswith("~/"):
+        return '"$HOME"/' + shlex.quote(cache_dir[2:])
+    return shlex.quote(cache_dir)
+
+def get_remote_env():
+    """Shell exports configuring ccache (relative paths and content check make entries portable)."""
+    return (
+        f"export CCACHE_DIR={get_remote_cache_dir()} CCACHE_BASEDIR=\"$PWD\" CCACHE_NOHASHDIR=1 "
+        f"CCACHE_COMPILERCHECK=content CCACHE_MAXSIZE={shlex.quote(str(REMOTE_CONFIG.get('ccache_max_size', '2G')))}"
+    )
+
+def get_remote_setup():
+    """
+    Build shell lines (run in the workspace): enable ccache if installed and report
+    the statistics before and after the build as @@CCACHE_BEFORE/@@CCACHE_AFTER lines.
+    catkin_make is then called with $CCACHE_CMAKE_ARGS (empty without ccache).
+    """
+    if not is_enabled():
+        return ""
+    return "\n".join([
+        "if command -v ccache >/dev/null 2>&1; then",
+        f"  {get_remote_env()}",
+        "  CCACHE_CMAKE_ARGS='-DCMAKE_C_COMPILER_LAUNCHER=ccache -DCMAKE_CXX_COMPILER_LAUNCHER=ccache'",
+        "  ccache_stats() { { ccache --print-stats 2>/dev/null || ccache -s; } | sed \"s/^/@@$1 /\"; }",
+        "  ccache_stats CCACHE_BEFORE",
+        "  trap 'ccache_stats CCACHE_AFTER' EXIT",
+        "else",
+        "  echo '@@CCACHE_MISSING'",
+        "fi",
+    ])
+
+def parse_stats(lines):
+    """Parses ccache statistics (--print-stats or -s output). Returns {"hits", "misses"}."""
+    counters = {}
+    for line in lines:
+        match = re.match(r"\s*(.*?)\s+(\d+)\s*$", line)
+        if match:
+            counters[match.group(1).strip()] = int(match.group(2))
+    return {
+        "hits": sum(counters.get(key, 0) for key in HIT_KEYS),
+        "misses": sum(counters.get(key, 0) for key in MISS_KEYS),
+    }
+
+def get_build_stats(before, after):
+    """Computes the cache statistics of one build from the snapshots around it (or None)."""
+    if not after:
+        return None
+    start, end = parse_stats(before), parse_stats(after)
+    hits = max(0, end["hits"] - start["hits"])
+    misses = max(0, end["misses"] - start["misses"])
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": round(hits / total, 3) if total else None}
+
+def estimate_saved_seconds(stats, build_seconds, history):
+    """
+    Estimates the compile time saved by the cache hits of a build.
+    The time per compile is calibrated on builds dominated by misses (mostly cold builds).
+    Returns None until such a build has been recorded.
+    """
+    samples = [entry["total"] / entry["ccache"]["misses"] for entry in history
+               if entry.get("ccache") and entry["ccache"]["misses"] >= CALIBRATION_MIN_MISSES
+               and entry["ccache"]["misses"] >= entry["ccache"]["hits"]]
+    if stats["misses"] >= CALIBRATION_MIN_MISSES and stats["misses"] >= stats["hits"]:
+        samples.append(build_seconds / stats["misses"])
+    if not samples:
+        return None
+    return round(stats["hits"] * statistics.median(samples), 1)
+
+def format_build_stats(stats, saved):
+    """One-line report of the cache use of a build."""
+    if stats["hit_rate"] is None:
+        return "🗄️  ccache: no compilations"
+    line = f"🗄️  ccache: {stats['hits']}/{stats['hits'] + stats['misses']} hits ({stats['hit_rate'] * 100:.0f}%)"
+    if saved is None:
+        return line + ", time saved: n/a (no cold build recorded yet)"
+    return line + f", ≈{saved:.0f}s compile time saved"
+
+# ============================================================================
+# MIRROR (pull / push)
+# ============================================================================
+
+def is_local_only(name):
+    """Checks whether a cache file is machine-specific bookkeeping."""
+    return any(fnmatch.fnmatch(name, pattern) for pattern in LOCAL_ONLY_FILES)
+
+def get_remote_fingerprint():
+    """Fingerprint of the target's toolchain (architecture, ccache version, compiler binary)."""
+    result = ssh_session.run_remote(
+        "uname -m; ccache --version 2>/dev/null | head -1; "
+        "sha256sum \"$(readlink -f \"$(command -v c++)\")\" | cut -d' ' -f1"
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"toolchain check failed: {result.stderr.strip()}")
+    lines = result.stdout.split("\n")
+    if len(lines) < 3 or not lines[1].strip():
+        raise RuntimeError("ccache is not installed on the target")
+    return hashlib.sha256(result.stdout.encode()).hexdigest()[:16], lines[0].strip(), lines[1].strip()
+
+def get_mirror_dir(fingerprint):
+    """Local mirror of the cache for one toolchain."""
+    path = os.path.join(get_cache_dir(), "ccache", fingerprint)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def list_local_entries(root):
+    """Relative paths of the cache entries in a local cache directory."""
+    entries = set()
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if not is_local_only(name):
+                entries.add(os.path.relpath(os.path.join(dirpath, name), root))
+    return entries
+
+def list_remote_entries():
+    """Relative paths of the cache entries on the target."""
+    result = ssh_session.run_remote(f"cd {get_remote_cache_dir()} 2>/dev/null && find . -type f -printf '%P\\n' || true")
+    if result.returncode != 0:
+        raise RuntimeError(f"listing the remote cache failed: {result.stderr.strip()}")
+    return {path for path in result.stdout.split("\n") if path and not is_local_only(os.path.basename(path))}
+
+def pull():
+    """Copies the cache entries of the target missing in the local mirror. Returns 0 on success."""
+    fingerprint, arch, version = get_remote_fingerprint()
+    mirror = get_mirror_dir(fingerprint)
+    missing = sorted(list_remote_entries() - list_local_entries(mirror))
+    print(f"🗄️  Toolchain {fingerprint} ({arch}, {version})")
+    if not missing:
+        print("✅ Local mirror is up to date")
+        return 0
+
+    start = time.monotonic()
+    ssh_session.ensure_master(quiet=True)
+    process = subprocess.Popen(
+        ["ssh"] + get_ssh_args() + [f"cd {get_remote_cache_dir()} && tar czf - --null -T -"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+    process.stdin.write("\0".join(missing).encode())
+    process.stdin.close()
+    with tarfile.open(fileobj=process.stdout, mode="r|gz") as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(mirror, filter="data")
+        else:
+            tar.extractall(mirror)
+    if process.wait() != 0:
+        print(f"❌ Transfer failed (exit code {process.returncode}) - run pull again", file=sys.stderr)
+        return 1
+    print(f"📥 {len(missing)} entries pulled into {mirror} in {time.monotonic() - start:.1f}s")
+    return 0
+
+def push(source=None, force=False):
+    """Pre-seeds the target's cache with entries it does not have yet. Returns 0 on success."""
+    fingerprint, arch, version = get_remote_fingerprint()
+    print(f"🗄️  Toolchain {fingerprint} ({arch}, {version})")
+    if source is None:
+        source = os.path.join(get_cache_dir(), "ccache", fingerprint)
+        if not os.path.isdir(source):
+            print("ℹ️  No mirror for this toolchain - pull from a target with the identical toolchain first")
+            return 1
+    elif not force:
+        print("❌ The toolchain of --from cannot be verified - use --force if it is identical", file=sys.stderr)
+        return 1
+
+    missing = sorted(list_local_entries(source) - list_remote_entries())
+    if not missing:
+        print("✅ Target cache already contains all entries")
+        return 0
+
+    start = time.monotonic()
+    cache_dir = get_remote_cache_dir()
+    ssh_session.ensure_master(quiet=True)
+    # Cleanup enforces ccache_max_size after seeding
+    process = subprocess.Popen(
+        ["ssh"] + get_ssh_args() + [f"mkdir -p {cache_dir} && tar xzf - -C {cache_dir} && "
+                                    f"{{ {get_remote_env()}; ccache -c >/dev/null 2>&1 || true; }}"],
+        stdin=subprocess.PIPE
+    )
+    try:
+        with tarfile.open(fileobj=process.stdin, mode="w|gz") as tar:
+            for path in missing:
+                tar.add(os.path.join(source, path), arcname=path, recursive=False)
+        process.stdin.close()
+    except BrokenPipeError:
+        pass
+    if process.wait() != 0:
+        print(f"❌ Transfer failed (exit code {process.returncode})", file=sys.stderr)
+        return 1
+    print(f"📤 {len(missing)} entries seeded into {REMOTE_CONFIG['host']} in {time.monotonic() - start:.1f}s")
+    return 0
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def print_stats(history, limit):
+    """Prints the remote cache statistics and the hit rates of recent builds."""
+    result = ssh_session.run_remote(f"{get_remote_env()}; ccache -s 2>&1 || echo 'ccache is not installed'")
+    print(f"🗄️  Compiler cache on {REMOTE_CONFIG['host']}:")
+    for line in result.stdout.splitlines():
+        print(f"   {line}")
+
+    builds = [entry for entry in history if entry.get("ccache")][-limit:]
+    if not builds:
+        return 0
+    print("\n🔨 Recent builds:")
+    for entry in builds:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["time"]))
+        cache = entry["ccache"]
+        rate = "-" if cache["hit_rate"] is None else f"{cache['hit_rate'] * 100:.0f}%"
+        saved = f"≈{cache['saved_seconds']:.0f}s saved" if cache.get("saved_seconds") is not None else ""
+        print(f"   {when}  {entry['total']:8.2f}s  hits {cache['hits']:5d}  misses {cache['misses']:5d}  {rate:>4s}  {saved}")
+    return 0
+
+def main():
+    """Command line interface."""
+    import build_planner
+    parser = argparse.ArgumentParser(description="OpenMower compiler cache (ccache) management")
+    parser.add_argument("command", choices=["stats", "pull", "push"])
+    parser.add_argument("--from", dest="source", help="push: seed from this ccache directory instead of the mirror")
+    parser.add_argument("--force", action="store_true", help="push: skip the toolchain check for --from")
+    parser.add_argument("-n", "--limit", type=int, default=10, help="stats: number of recent builds")
+    parser.add_argument("--json", action="store_true", help="stats: print the build statistics as JSON")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "pull":
+            return pull()
+        if args.command == "push":
+            return push(args.source, args.force)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    history = build_planner.load_history()
+    if args.json:
+        print(json.dumps([entry["ccache"] for entry in history if entry.get("ccache")][-args.limit:], indent=2))
+        return 0
+    return print_stats(history, args.limit)
+
+if __name__ == "__main__":
+    sys.exit(main())
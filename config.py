@@ -9,9 +9,16 @@ Setup:
 1. Copy config_local.py.template to config_local.py
 2. Adapt config_local.py to your environment
 3. config_local.py is automatically ignored by Git
+
+Shell scripts read the configuration from a cached env file:
+    python3 config.py --export-env [PATH]
 """
 
 import os
+import shlex
+import subprocess
+import sys
+import time
 
 # ============================================================================
 # PROJECT-SPECIFIC CONFIGURATION (tracked in Git)
@@ -37,6 +44,9 @@ DEBUG_PROGRAMS = [
 # Packages without executable binaries (only launch files, etc.)
 EXCLUDED_PACKAGES = ["open_mower", "mower_msgs", "mower_utils", "mower_map"]
 
+# Directories never synced to the Pi (matched by name at any depth, like rsync --exclude)
+SYNC_EXCLUDES = ["build/", "devel/", ".git/"]
+
 # ============================================================================
 # DEFAULT VALUES (can be overridden in config_local.py)
 # ============================================================================
@@ -50,13 +60,62 @@ DEFAULT_CONFIG = {
     # SSH settings
     "ssh_key": "~/.ssh/id_rsa_openmower",
     "ssh_host": "",  # Optional: use SSH host from ~/.ssh/config
+    "ssh_multiplex": True,  # Reuse one persistent master session per target
+    "ssh_control_persist": 600,  # Idle timeout of the master session in seconds
     
     # ROS Configuration
     "ros_master_uri": "http://192.168.1.100:11311",
     "ros_pi_ip": "192.168.1.100",
     "ros_dev_ip": "192.168.1.200",
+    
+    # gdbserver debug mode (gdb runs locally, only gdbserver on the Pi)
+    "gdbserver_port": 1234,
+    "local_gdb": "/usr/bin/gdb-multiarch",
+    "tunnel_ports": [11311],  # Forwarded by tunnel.sh in addition to gdbserver_port (ROS master)
+    "symbol_cache_max_mb": 2048,  # Size cap of the local sysroot/symbol cache (LRU eviction)
+    
+    # Log stream (log_stream.py): aggregated rosout log of the latest roslaunch on the Pi
+    "log_stream_file": "~/.ros/log/latest/rosout.log",
+    
+    # Core dump capture (core_triage.py): directory on the Pi, local storage cap for compressed cores
+    "core_dir": "/var/lib/openmower/cores",
+    "core_max_local_mb": 4096,
+    
+    # Rosbag capture (bag_capture.py): directory on the Pi, recorded topics (empty = all), transfer chunk size
+    "bag_dir": "~/bags",
+    "bag_topics": [],
+    "bag_chunk_mb": 4,
+    
+    # Compiler cache (compiler_cache.py): ccache for remote builds, kept outside the workspace
+    "ccache": True,
+    "ccache_dir": "~/.cache/ccache-openmower",
+    "ccache_max_size": "2G",
+    
+    # Web UI telemetry (telemetry_bridge.py): mosquitto of start_web_ui.sh, topic prefix, publish rate cap
+    "mqtt_port": 1883,
+    "telemetry_topic": "openmower/debug",
+    "telemetry_rate_hz": 1.0,
+    "telemetry_keyframe_seconds": 30,
+    
+    # Watch mode (watch_mode.py): quiet time after the last save before a change burst is shipped
+    "watch_debounce_ms": 300,
+    
+    # Sampling profiler (profiler.py): e.g. "sudo -n perf" if perf_event_paranoid is restrictive
+    "perf_command": "perf",
+    "profile_seconds": 10,
+    "profile_frequency": 99,
+    
+    # Prebuilt artifact deploy: devel/ of an ARM (cross/emulated) build, empty = <project>/devel
+    "artifact_devel_dir": "",
+    
+    # Resource agent (resource_agent.py): sample rate and ring buffer length on the Pi
+    "resource_sample_hz": 2,
+    "resource_ring_seconds": 3600,
 }
 
+# Environment variable selecting a fleet target (see load_fleet)
+FLEET_TARGET_ENV = "OPENMOWER_TARGET"
+
 # ============================================================================
 # CONFIGURATION LOADING AND MERGING
 # ============================================================================
@@ -83,11 +142,44 @@ def load_config(verbose=False):
             print(f"❌ Error loading config_local.py: {e}")
             print("   Using default values")
     
+    # Fleet target selected by the fleet runner (or manually): OPENMOWER_TARGET=<name>
+    target_name = os.environ.get(FLEET_TARGET_ENV)
+    if target_name:
+        targets = {target["name"]: target for target in load_fleet()}
+        if target_name not in targets:
+            raise SystemExit(f"❌ Unknown fleet target '{target_name}' (known: {', '.join(targets) or '-'})")
+        apply_target(config, targets[target_name])
+    
     # Add debug programs
     config["debug_programs"] = DEBUG_PROGRAMS
     
     return config
 
+def load_fleet():
+    """
+    Loads the fleet inventory (LOCAL_FLEET in config_local.py).
+    Each target is a dict with a "name" and the settings it overrides (host, user, workspace, ROS IPs, ...).
+    """
+    try:
+        from config_local import LOCAL_FLEET
+    except ImportError:
+        return []
+    return [dict(target) for target in LOCAL_FLEET if target.get("name")]
+
+def apply_target(config, target):
+    """Applies a fleet target's overrides to a configuration dict."""
+    overrides = {k: v for k, v in target.items() if k != "name"}
+    if ("host" in overrides or "user" in overrides) and "ssh_host" not in overrides:
+        # A global ssh_host alias would win over the target's host/user - every target would reach the same Pi
+        config["ssh_host"] = ""
+    config.update(overrides)
+    config["target_name"] = target["name"]
+    return config
+
+def get_target_config(target):
+    """Full configuration of a fleet target (global configuration plus the target's overrides)."""
+    return apply_target(dict(REMOTE_CONFIG), target)
+
 # Load global configuration
 REMOTE_CONFIG = load_config()
 
@@ -113,6 +205,10 @@ def get_project_root():
     # Fallback: Parent directory of debug-tools folder
     return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+def get_tools_dir():
+    """Determines the directory of the debug tools (this repository)."""
+    return os.path.dirname(os.path.abspath(__file__))
+
 def get_vscode_dir():
     """Determines the .vscode directory."""
     return os.path.join(get_project_root(), ".vscode")
@@ -129,76 +225,128 @@ def get_temp_dir():
     os.makedirs(temp_dir, exist_ok=True)
     return temp_dir
 
-def get_ros_environment():
+def get_cache_dir():
+    """Determines persistent cache directory (survives 'Clean Build' and cleanup.sh)."""
+    cache_root = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    cache_dir = os.path.join(cache_root, "openmower-remote-debug")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+def get_target_id(config=None):
+    """Creates a file-name safe identifier of the current target (host + workspace)."""
+    config = config or REMOTE_CONFIG
+    target = config.get("ssh_host") or f"{config['user']}@{config['host']}"
+    raw = f"{target}_{config['workspace']}"
+    return "".join(c if c.isalnum() or c in "-_.@" else "_" for c in raw)
+
+def get_rsync_target():
+    """Creates the rsync/scp destination of the remote workspace."""
+    if "ssh_host" in REMOTE_CONFIG and REMOTE_CONFIG["ssh_host"]:
+        # When using SSH host, rsync should use the host name
+        return f"{REMOTE_CONFIG['ssh_host']}:{REMOTE_CONFIG['workspace']}/"
+    # Direct connection
+    return f"{REMOTE_CONFIG['user']}@{REMOTE_CONFIG['host']}:{REMOTE_CONFIG['workspace']}/"
+
+def get_ros_environment(config=None):
     """Determines ROS environment variables."""
+    config = config or REMOTE_CONFIG
     return {
-        "ROS_MASTER_URI": REMOTE_CONFIG["ros_master_uri"],
-        "ROS_IP": REMOTE_CONFIG["ros_pi_ip"],
-        "ROS_PACKAGE_PATH": f"{REMOTE_CONFIG['workspace']}/src:/opt/ros/noetic/share",
-        "LD_LIBRARY_PATH": f"{REMOTE_CONFIG['workspace']}/devel/lib:/opt/ros/noetic/lib",
-        "CMAKE_PREFIX_PATH": f"{REMOTE_CONFIG['workspace']}/devel:/opt/ros/noetic",
-        "PYTHONPATH": f"{REMOTE_CONFIG['workspace']}/devel/lib/python3/dist-packages:/opt/ros/noetic/lib/python3/dist-packages"
+        "ROS_MASTER_URI": config["ros_master_uri"],
+        "ROS_IP": config["ros_pi_ip"],
+        "ROS_PACKAGE_PATH": f"{config['workspace']}/src:/opt/ros/noetic/share",
+        "LD_LIBRARY_PATH": f"{config['workspace']}/devel/lib:/opt/ros/noetic/lib",
+        "CMAKE_PREFIX_PATH": f"{config['workspace']}/devel:/opt/ros/noetic",
+        "PYTHONPATH": f"{config['workspace']}/devel/lib/python3/dist-packages:/opt/ros/noetic/lib/python3/dist-packages"
     }
 
-def get_ssh_command():
-    """Creates SSH base command with SSH key."""
-    if "ssh_host" in REMOTE_CONFIG and REMOTE_CONFIG["ssh_host"]:
-        # Use SSH host from ~/.ssh/config
-        return f"ssh {REMOTE_CONFIG['ssh_host']}"
+def get_ssh_control_path():
+    """Determines the control socket path of the SSH master session."""
+    ssh_dir = os.path.expanduser("~/.ssh")
+    os.makedirs(ssh_dir, mode=0o700, exist_ok=True)
+    # %C is a hash of local host, remote host, port and user - one socket per target
+    return os.path.join(ssh_dir, "openmower-%C")
+
+def get_ssh_multiplex_args(config=None):
+    """Creates SSH options that reuse a persistent master session."""
+    config = config or REMOTE_CONFIG
+    if not config.get("ssh_multiplex", True):
+        return []
+    return [
+        "-o", "ControlMaster=auto",
+        "-o", f"ControlPath={get_ssh_control_path()}",
+        "-o", f"ControlPersist={config.get('ssh_control_persist', 600)}",
+    ]
+
+def get_ssh_args(config=None):
+    """Creates SSH arguments (without the ssh program itself) ending with the target."""
+    config = config or REMOTE_CONFIG
+    if "ssh_host" in config and config["ssh_host"]:
+        # Use SSH host from ~/.ssh/config - already includes user and host
+        return get_ssh_multiplex_args(config) + [config["ssh_host"]]
     else:
         # Direct SSH connection with key
-        ssh_key = REMOTE_CONFIG.get("ssh_key", "~/.ssh/id_rsa_openmower")
-        return f"ssh -i {ssh_key} -o StrictHostKeyChecking=no {REMOTE_CONFIG['user']}@{REMOTE_CONFIG['host']}"
+        ssh_key = config.get("ssh_key", "~/.ssh/id_rsa_openmower")
+        return ["-i", ssh_key, "-o", "StrictHostKeyChecking=no"] + get_ssh_multiplex_args(config) + [
+            f"{config['user']}@{config['host']}"
+        ]
+
+def get_ssh_command():
+    """Creates SSH base command with SSH key."""
+    return " ".join(["ssh"] + get_ssh_args())
 
 def get_ssh_full_command(extra_args=""):
     """Creates full SSH command for script usage."""
-    if "ssh_host" in REMOTE_CONFIG and REMOTE_CONFIG["ssh_host"]:
-        # Use SSH host from ~/.ssh/config - already includes user and host
-        return f"ssh {extra_args} {REMOTE_CONFIG['ssh_host']}" if extra_args else f"ssh {REMOTE_CONFIG['ssh_host']}"
-    else:
-        # Direct SSH connection with key
-        ssh_key = REMOTE_CONFIG.get("ssh_key", "~/.ssh/id_rsa_openmower")
-        base_cmd = f"ssh -i {ssh_key} -o StrictHostKeyChecking=no"
-        if extra_args:
-            base_cmd += f" {extra_args}"
-        return f"{base_cmd} {REMOTE_CONFIG['user']}@{REMOTE_CONFIG['host']}"
+    ssh_args = get_ssh_args()
+    if extra_args:
+        ssh_args = ssh_args[:-1] + [extra_args] + ssh_args[-1:]
+    return " ".join(["ssh"] + ssh_args)
 
 def get_rsync_command():
     """Creates rsync base command with SSH key."""
-    if "ssh_host" in REMOTE_CONFIG and REMOTE_CONFIG["ssh_host"]:
-        # Use SSH host from ~/.ssh/config - only need 'ssh' in -e parameter
-        return f"rsync -avz --exclude='build/' --exclude='devel/' --exclude='.git/' -e 'ssh'"
-    else:
-        # Direct SSH connection with key
-        ssh_key = REMOTE_CONFIG.get("ssh_key", "~/.ssh/id_rsa_openmower")
-        ssh_cmd = f"ssh -i {ssh_key} -o StrictHostKeyChecking=no"
-        return f"rsync -avz --exclude='build/' --exclude='devel/' --exclude='.git/' -e '{ssh_cmd}'"
+    # The target (host alias or user@host) is appended by the caller, only options go into -e
+    ssh_cmd = " ".join(["ssh"] + get_ssh_args()[:-1])
+    excludes = " ".join(f"--exclude='{pattern}'" for pattern in SYNC_EXCLUDES)
+    return f"rsync -avz {excludes} -e '{ssh_cmd}'"
 
 # ============================================================================
 # PROJECT-SPECIFIC DETECTION
 # ============================================================================
 
+def scan_ros_packages():
+    """
+    Finds all ROS packages (CMakeLists.txt + package.xml) below src/.
+    Returns their paths relative to src/, e.g. ["mower_logic", "lib/xbot_msgs"].
+    """
+    src_dir = os.path.join(get_project_root(), "src")
+    packages = []
+    
+    for dirpath, dirnames, filenames in os.walk(src_dir):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        if "CATKIN_IGNORE" in filenames:
+            dirnames[:] = []
+            continue
+        if dirpath != src_dir and "CMakeLists.txt" in filenames and "package.xml" in filenames:
+            packages.append(os.path.relpath(dirpath, src_dir))
+            # Packages cannot be nested - no need to descend further
+            dirnames[:] = []
+    
+    return packages
+
 def detect_project_binaries():
     """Detects available binaries in the project automatically."""
-    project_root = get_project_root()
-    src_dir = os.path.join(project_root, "src")
-    
     detected_programs = []
     
-    if os.path.exists(src_dir):
-        for item in os.listdir(src_dir):
-            item_path = os.path.join(src_dir, item)
-            if os.path.isdir(item_path) and not item.startswith('.') and item not in EXCLUDED_PACKAGES:
-                # Check if it's a ROS package (CMakeLists.txt + package.xml)
-                if (os.path.exists(os.path.join(item_path, "CMakeLists.txt")) and
-                    os.path.exists(os.path.join(item_path, "package.xml"))):
-                    
-                    # Add standard binary if not in config
-                    if not any(p["name"] == item for p in REMOTE_CONFIG["debug_programs"]):
-                        detected_programs.append({
-                            "name": item,
-                            "path": f"{item}/{item}"
-                        })
+    for package in scan_ros_packages():
+        # Only top-level packages follow the <name>/<name> binary convention
+        if "/" in package or package in EXCLUDED_PACKAGES:
+            continue
+        
+        # Add standard binary if not in config
+        if not any(p["name"] == package for p in REMOTE_CONFIG["debug_programs"]):
+            detected_programs.append({
+                "name": package,
+                "path": f"{package}/{package}"
+            })
     
     return REMOTE_CONFIG["debug_programs"] + detected_programs
 
@@ -221,8 +369,86 @@ def validate_config():
     if host and not (host.count(".") == 3 or ":" in host):
         errors.append(f"Host '{host}' doesn't seem to be a valid IP/hostname")
     
+    # Check fleet inventory
+    names = [target["name"] for target in load_fleet()]
+    for name in sorted(set(n for n in names if names.count(n) > 1)):
+        errors.append(f"Fleet target '{name}' is defined more than once")
+    
     return errors
 
+# ============================================================================
+# SHELL ENVIRONMENT EXPORT
+# ============================================================================
+
+def get_env_file():
+    """Determines the cached shell env file (next to the debug scripts)."""
+    return os.path.join(get_debug_scripts_dir(), "config.env")
+
+def get_shell_env():
+    """Creates the variables exported to shell scripts."""
+    env = {}
+    for key, value in REMOTE_CONFIG.items():
+        if isinstance(value, (str, int, float, bool)):
+            env[f"REMOTE_{key.upper()}"] = str(value)
+    env.update({
+        "SSH_CMD": get_ssh_command(),
+        "SSH_FULL_CMD": get_ssh_full_command(),
+        "SSH_HOST": REMOTE_CONFIG.get("ssh_host", ""),
+        "RSYNC_CMD": get_rsync_command(),
+        "RSYNC_TARGET": get_rsync_target(),
+        "TOOLS_DIR": get_tools_dir(),
+    })
+    return env
+
+def export_shell_env(path):
+    """
+    Writes the configuration as shell-sourceable env file.
+    The '# source:' lines list the files that invalidate the cache when they are newer.
+    """
+    sources = [os.path.join(get_tools_dir(), name) for name in ("config.py", "config_local.py")]
+    lines = ["# Generated by 'python3 config.py --export-env' - do not edit"]
+    lines += [f"# source: {source}" for source in sources]
+    lines += [f"{key}={shlex.quote(value)}" for key, value in sorted(get_shell_env().items())]
+    content = "\n".join(lines) + "\n"
+    
+    if os.path.exists(path):
+        with open(path) as f:
+            if f.read() == content:
+                # Unchanged - only mark as fresh again
+                os.utime(path)
+                return
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def measure_startup_saving(path, rounds=3):
+    """Measures the script startup cost of the Python config import vs. sourcing the env file (ms)."""
+    def best_of(argv):
+        best = None
+        for _ in range(rounds):
+            start = time.monotonic()
+            subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            elapsed = (time.monotonic() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+    
+    python_ms = best_of([sys.executable, "-c", f"import sys; sys.path.insert(0, {get_tools_dir()!r}); import config"])
+    source_ms = best_of(["bash", "-c", f"source {shlex.quote(path)}"]) - best_of(["bash", "-c", ":"])
+    return python_ms, max(source_ms, 0.0)
+
+if __name__ == "__main__" and "--export-env" in sys.argv:
+    # Export configuration for shell scripts
+    index = sys.argv.index("--export-env")
+    env_path = sys.argv[index + 1] if len(sys.argv) > index + 1 else get_env_file()
+    export_shell_env(env_path)
+    print(f"✅ Shell environment exported: {env_path}")
+    if "--quiet" not in sys.argv:
+        python_ms, source_ms = measure_startup_saving(env_path)
+        print(f"⚡ Startup per script: {python_ms:.0f} ms (Python import) -> {source_ms:.1f} ms (env file), "
+              f"saved {python_ms - source_ms:.0f} ms")
+    sys.exit(0)
+
 if __name__ == "__main__":
     # Test configuration when run directly
     REMOTE_CONFIG = load_config(verbose=True)
@@ -235,3 +461,6 @@ if __name__ == "__main__":
         print("✅ Configuration is valid")
         
     print(f"\nProject Root: {get_project_root()}")
+    fleet = load_fleet()
+    if fleet:
+        print(f"Fleet: {', '.join(target['name'] for target in fleet)}")
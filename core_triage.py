@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Core Dump Triage
+
+Keeps crashes of the DEBUG_PROGRAMS nodes that happen while nobody is attached:
+- `setup` makes the Pi write core dumps to `core_dir` (core_pattern, core ulimit)
+- `collect` ships new cores of the debug programs compressed to the dev machine,
+  one at a time, and removes them from the Pi once they arrived complete
+- each core is matched to its binary by the ELF build-id recorded in the core
+- gdb runs locally and in parallel over the new cores; crashes are grouped by
+  a stack signature, so a recurring crash shows up once with a count
+
+Usage:
+    python3 core_triage.py setup             # Configure core capture on the Pi (needs sudo)
+    python3 core_triage.py status            # core_pattern, pending cores on the Pi
+    python3 core_triage.py collect           # Fetch new cores and triage them
+    python3 core_triage.py report            # Crashes grouped by stack signature
+    python3 core_triage.py show <signature>  # Full backtrace of the latest core with that signature
+    python3 core_triage.py triage --all      # Re-run gdb on all local cores
+"""
+
+import argparse
+import concurrent.futures
+import gzip
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, DEBUG_PROGRAMS, get_cache_dir, get_ssh_args, get_target_id
+import ssh_session
+import symbol_cache
+
+# Core file name on the Pi: core.<comm>.<pid>.<time>
+CORE_PATTERN_TEMPLATE = "core.%e.%p.%t"
+# Cores younger than this may still be written
+CORE_SETTLE_SECONDS = 5
+
+SIGNATURE_FRAMES = 5
+# Frames of the abort/signal machinery, not part of a crash signature
+SKIPPED_FRAMES = {
+    "raise", "abort", "gsignal", "pthread_kill", "__GI_raise", "__GI_abort", "__pthread_kill_implementation",
+    "__pthread_kill_internal", "__libc_message", "__assert_fail", "__assert_fail_base", "__GI___assert_fail",
+    "__malloc_assert", "__restore_rt", "__kernel_rt_sigreturn", "<signal handler called>",
+    "__gnu_cxx::__verbose_terminate_handler", "std::terminate", "__cxxabiv1::__terminate",
+    "__cxa_throw", "__cxa_rethrow",
+}
+# "#3  0x0000aaaab1c2d3e4 in mower_logic::Foo::bar (this=0x...) at src/foo.cpp:42"
+FRAME_PATTERN = re.compile(r"^#(\d+)\s+(?:0x[0-9a-f]+ in )?(.+?) \(.*?\)(?: at (\S+))?(?: from (\S+))?\s*$")
+
+DEFAULT_JOBS = 4
+
+# ============================================================================
+# LOCAL STORE
+# ============================================================================
+
+def get_core_dir():
+    """Local directory with the cores and triage results of the current target."""
+    path = os.path.join(get_cache_dir(), "cores", get_target_id())
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def get_db_path():
+    """Triage database: one entry per collected core."""
+    return os.path.join(get_core_dir(), "cores.json")
+
+def load_db():
+    """Loads the triage database."""
+    try:
+        with open(get_db_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_db(db):
+    """Stores the triage database."""
+    with open(get_db_path() + ".tmp", "w") as f:
+        json.dump(db, f, indent=1)
+    os.replace(get_db_path() + ".tmp", get_db_path())
+
+def get_program_for_comm(comm):
+    """DEBUG_PROGRAMS name for a process name (the kernel truncates it to 15 characters)."""
+    for prog in DEBUG_PROGRAMS:
+        if prog["name"][:15] == comm[:15]:
+            return prog["name"]
+    return None
+
+def parse_core_name(name):
+    """(comm, pid, unix time) from core.<comm>.<pid>.<time>, None for other files."""
+    parts = name.split(".")
+    if len(parts) < 4 or parts[0] != "core" or not parts[-1].isdigit() or not parts[-2].isdigit():
+        return None
+    return ".".join(parts[1:-2]), int(parts[-2]), int(parts[-1])
+
+def enforce_local_cap(db):
+    """Deletes the oldest compressed cores beyond core_max_local_mb (triage results stay)."""
+    cap = REMOTE_CONFIG["core_max_local_mb"] * 1024 * 1024
+    stored = sorted((entry["crashed"], name) for name, entry in db.items() if entry.get("stored"))
+    total = sum(db[name]["compressed_bytes"] for _, name in stored)
+    for _, name in stored:
+        if total <= cap:
+            break
+        path = os.path.join(get_core_dir(), name + ".gz")
+        if os.path.exists(path):
+            os.unlink(path)
+        total -= db[name]["compressed_bytes"]
+        db[name]["stored"] = False
+
+# ============================================================================
+# REMOTE SETUP AND COLLECTION
+# ============================================================================
+
+def get_setup_script():
+    """Shell script configuring core capture on the Pi (sudo without password)."""
+    core_dir = shlex.quote(REMOTE_CONFIG["core_dir"])
+    pattern = f"{REMOTE_CONFIG['core_dir']}/{CORE_PATTERN_TEMPLATE}"
+    user = REMOTE_CONFIG["user"]
+    return f"""
+set -e
+sudo -n mkdir -p {core_dir}
+sudo -n chmod 1777 {core_dir}
+echo 'kernel.core_pattern={pattern}' | sudo -n tee /etc/sysctl.d/60-openmower-cores.conf >/dev/null
+sudo -n sysctl -q -p /etc/sysctl.d/60-openmower-cores.conf
+echo '{user} soft core unlimited' | sudo -n tee /etc/security/limits.d/60-openmower-cores.conf >/dev/null
+if systemctl is-active -q apport 2>/dev/null; then echo "WARN apport is active and may reset core_pattern"; fi
+echo "PATTERN $(cat /proc/sys/kernel/core_pattern)"
+"""
+
+def setup():
+    """Configures core capture on the Pi."""
+    result = ssh_session.run_remote(get_setup_script())
+    if result.returncode != 0:
+        print(f"❌ Setup failed: {result.stderr.strip()}", file=sys.stderr)
+        print("   Needs passwordless sudo; or run on the Pi as root:", file=sys.stderr)
+        print(f"   sysctl -w kernel.core_pattern={REMOTE_CONFIG['core_dir']}/{CORE_PATTERN_TEMPLATE}", file=sys.stderr)
+        return 1
+    for line in result.stdout.splitlines():
+        if line.startswith("WARN "):
+            print(f"⚠️  {line[5:]} (sudo systemctl disable --now apport)")
+        elif line.startswith("PATTERN "):
+            print(f"✅ core_pattern: {line[8:]}")
+    print("   'Launch OpenMower on Pi' raises the core size limit for the nodes (ulimit -c unlimited)")
+    return 0
+
+def list_remote_cores():
+    """Cores on the Pi: list of (name, size, mtime). Raises RuntimeError if the listing fails."""
+    core_dir = shlex.quote(REMOTE_CONFIG["core_dir"])
+    result = ssh_session.run_remote(
+        f"[ -d {core_dir} ] || exit 0; find {core_dir} -maxdepth 1 -type f -name 'core.*' -printf '%f %s %T@\\n'"
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"listing the cores failed (exit code {result.returncode}) {result.stderr.strip()}".rstrip())
+    cores = []
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) == 3:
+            cores.append((parts[0], int(parts[1]), float(parts[2])))
+    return cores
+
+def status():
+    """Shows the capture configuration and pending cores on the Pi."""
+    result = ssh_session.run_remote("cat /proc/sys/kernel/core_pattern; ulimit -c")
+    pattern, limit = (result.stdout.splitlines() + ["?", "?"])[:2]
+    expected = f"{REMOTE_CONFIG['core_dir']}/{CORE_PATTERN_TEMPLATE}"
+    icon = "✅" if pattern == expected else "❌"
+    print(f"{icon} core_pattern: {pattern}" + ("" if pattern == expected else f" (expected {expected}, run setup)"))
+    print(f"   core ulimit of a login shell: {limit}")
+    try:
+        cores = list_remote_cores()
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    relevant = [c for c in cores if parse_core_name(c[0]) and get_program_for_comm(parse_core_name(c[0])[0])]
+    print(f"📦 {len(relevant)} pending cores of debug programs on the Pi "
+          f"({sum(c[1] for c in relevant) / 1e6:.1f} MB), {len(cores) - len(relevant)} other")
+    db = load_db()
+    print(f"🗂️  {len(db)} cores collected, {len({e.get('signature') for e in db.values() if e.get('signature')})} "
+          f"distinct crashes in {get_core_dir()}")
+    return 0
+
+def fetch_core(name, size):
+    """Streams one core gzip-compressed from the Pi. Returns the compressed size (raises on failure)."""
+    remote = shlex.quote(f"{REMOTE_CONFIG['core_dir']}/{name}")
+    local = os.path.join(get_core_dir(), name + ".gz")
+    ssh_session.ensure_master(quiet=True)
+    with open(local + ".part", "wb") as f:
+        result = subprocess.run(["ssh"] + get_ssh_args() + [f"nice -n 10 gzip -1 -c {remote}"], stdout=f)
+    if result.returncode != 0:
+        os.unlink(local + ".part")
+        raise RuntimeError(f"transfer of {name} failed (exit code {result.returncode})")
+    # Complete only if the uncompressed size matches the core on the Pi
+    received = 0
+    with gzip.open(local + ".part") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            received += len(block)
+    if received != size:
+        os.unlink(local + ".part")
+        raise RuntimeError(f"{name}: received {received} of {size} bytes")
+    os.replace(local + ".part", local)
+    return os.path.getsize(local)
+
+def collect(keep_remote, verbose=True):
+    """Fetches new cores of the debug programs. Returns the names of the collected cores."""
+    db = load_db()
+    now = time.time()
+    collected = []
+    for name, size, mtime in sorted(list_remote_cores(), key=lambda c: c[2]):
+        parsed = parse_core_name(name)
+        program = get_program_for_comm(parsed[0]) if parsed else None
+        if not program or name in db or now - mtime < CORE_SETTLE_SECONDS:
+            continue
+        if not collected:
+            # Binaries as they are now - most likely the build that crashed
+            symbol_cache.sync(verbose=verbose)
+        start = time.monotonic()
+        try:
+            compressed = fetch_core(name, size)
+        except RuntimeError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            continue
+        if verbose:
+            print(f"📥 {name}: {size / 1e6:.1f} MB -> {compressed / 1e6:.1f} MB in {time.monotonic() - start:.1f}s")
+        db[name] = {"program": program, "pid": parsed[1], "crashed": parsed[2], "size": size,
+                    "compressed_bytes": compressed, "stored": True, "collected": now}
+        if not keep_remote:
+            ssh_session.run_remote(f"rm -f {shlex.quote(REMOTE_CONFIG['core_dir'] + '/' + name)}")
+        collected.append(name)
+        save_db(db)
+    enforce_local_cap(db)
+    save_db(db)
+    if verbose and not collected:
+        print("✅ No new cores on the Pi")
+    return collected
+
+# ============================================================================
+# CORE PARSING AND TRIAGE
+# ============================================================================
+
+def read_core_notes(path):
+    """Signal and mapped files {path: build-id} of an ELF core file."""
+    with open(path, "rb") as f:
+        def read(offset, size):
+            f.seek(offset)
+            return f.read(size)
+
+        ident = read(0, 64)
+        if ident[:4] != b"\x7fELF":
+            raise ValueError("not an ELF core")
+        is64 = ident[4] == 2
+        e = "<" if ident[5] == 1 else ">"
+        word = "Q" if is64 else "I"
+        if is64:
+            phoff = struct.unpack_from(e + "Q", ident, 32)[0]
+            phentsize, phnum = struct.unpack_from(e + "HH", ident, 54)
+        else:
+            phoff = struct.unpack_from(e + "I", ident, 28)[0]
+            phentsize, phnum = struct.unpack_from(e + "HH", ident, 42)
+
+        loads, notes = [], []
+        for i in range(phnum):
+            header = read(phoff + i * phentsize, phentsize)
+            p_type = struct.unpack_from(e + "I", header)[0]
+            if is64:
+                offset, vaddr, _, filesz = struct.unpack_from(e + "QQQQ", header, 8)
+            else:
+                offset, vaddr, _, filesz = struct.unpack_from(e + "IIII", header, 4)
+            if p_type == 1 and filesz:
+                loads.append((vaddr, offset, filesz))
+            elif p_type == 4:
+                notes.append(read(offset, filesz))
+
+        signo = None
+        mappings = []
+        for data in notes:
+            pos = 0
+            while pos + 12 <= len(data):
+                namesz, descsz, note_type = struct.unpack_from(e + "III", data, pos)
+                desc = pos + 12 + ((namesz + 3) & ~3)
+                if note_type == 1 and signo is None:  # NT_PRSTATUS: pr_info.si_signo
+                    signo = struct.unpack_from(e + "i", data, desc)[0]
+                elif note_type == 0x46494C45:  # NT_FILE
+                    size = struct.calcsize(word)
+                    count = struct.unpack_from(e + word, data, desc)[0]
+                    entries = [struct.unpack_from(e + word * 3, data, desc + size * (2 + 3 * i)) for i in range(count)]
+                    names = data[desc + size * (2 + 3 * count):desc + descsz].split(b"\0")
+                    mappings = [(start, file_offset, names[i].decode(errors="replace"))
+                                for i, (start, _, file_offset) in enumerate(entries)]
+                pos = desc + ((descsz + 3) & ~3)
+
+        # The first page of each mapped ELF is in the core: read its build-id from memory
+        files = {}
+        for start, file_offset, mapped in mappings:
+            if file_offset != 0 or mapped in files:
+                continue
+            segment = next(((vaddr, offset) for vaddr, offset, filesz in loads if vaddr <= start < vaddr + filesz), None)
+            if segment is None:
+                files[mapped] = None
+                continue
+            base = segment[1] + start - segment[0]
+            files[mapped] = symbol_cache.elf_build_id(lambda o, s, base=base: read(base + o, s))
+    return {"signal": signo, "files": files}
+
+def find_executable(program, files):
+    """(remote path, build-id) of the crashed program's executable among the mapped files."""
+    for mapped, build_id in files.items():
+        if os.path.basename(mapped) == program:
+            return mapped, build_id
+    return next(iter(files.items()), (None, None))
+
+def find_local_binary(remote_path, build_id):
+    """Sysroot copy of the binary if it has the build-id of the crashed one."""
+    index = symbol_cache.load_index()
+    for path, info in index.items():
+        if build_id and info.get("build_id") == build_id and os.path.exists(symbol_cache.get_local_path(path)):
+            return symbol_cache.get_local_path(path)
+    if not build_id and remote_path in index:
+        return symbol_cache.get_local_path(remote_path)
+    return None
+
+def parse_backtrace(output):
+    """Frames of a gdb backtrace: list of {"function", "file", "object"}."""
+    frames = []
+    for line in output.splitlines():
+        if line.startswith("#") and "<signal handler called>" in line:
+            frames.append({"function": "<signal handler called>", "file": None, "object": None})
+            continue
+        match = FRAME_PATTERN.match(line)
+        if match:
+            frames.append({"function": match.group(2), "file": match.group(3), "object": match.group(4)})
+    return frames
+
+def get_signature(program, signo, frames):
+    """Stack signature: program, signal and the top frames outside the abort/signal machinery."""
+    names = [f["function"] for f in frames if f["function"] not in SKIPPED_FRAMES]
+    names = [re.sub(r"\(anonymous namespace\)::", "", name) for name in names[:SIGNATURE_FRAMES]]
+    text = "|".join([program, str(signo)] + names)
+    return hashlib.sha1(text.encode()).hexdigest()[:12], names
+
+def run_gdb(binary, core_path, all_threads):
+    """Runs gdb in batch mode on a core. Returns its output."""
+    commands = ["set pagination off", "set print frame-arguments none"] + symbol_cache.get_gdb_setup_commands()
+    commands += [f"file {binary}", f"core-file {core_path}", "bt 40"]
+    if all_threads:
+        commands.append("thread apply all bt 15")
+    argv = [REMOTE_CONFIG["local_gdb"], "-batch", "-nx"]
+    for command in commands:
+        argv += ["-ex", command]
+    result = subprocess.run(argv, capture_output=True, text=True, timeout=300)
+    return result.stdout + result.stderr
+
+def triage_core(name, entry, all_threads):
+    """Analyzes one collected core. Returns the updated entry."""
+    entry = dict(entry)
+    compressed = os.path.join(get_core_dir(), name + ".gz")
+    core_path = os.path.join(get_core_dir(), name + ".core")
+    try:
+        with gzip.open(compressed) as source, open(core_path, "wb") as target:
+            shutil.copyfileobj(source, target, 1 << 20)
+        notes = read_core_notes(core_path)
+        remote_path, build_id = find_executable(entry["program"], notes["files"])
+        entry.update({"signal": notes["signal"], "executable": remote_path, "build_id": build_id})
+        binary = find_local_binary(remote_path, build_id)
+        if binary is None:
+            entry["status"] = "no-binary"
+            entry["detail"] = f"no cached binary with build-id {build_id} (rebuilt since the crash?)"
+            return entry
+        output = run_gdb(binary, core_path, all_threads)
+        with open(os.path.join(get_core_dir(), name + ".bt.txt"), "w") as f:
+            f.write(output)
+        frames = parse_backtrace(output.split("\nThread ", 1)[0])
+        entry["signature"], entry["frames"] = get_signature(entry["program"], notes["signal"], frames)
+        entry["location"] = next((f["file"] for f in frames if f["file"] and f["function"] not in SKIPPED_FRAMES), None)
+        entry["status"] = "ok" if frames else "no-frames"
+    except (OSError, ValueError, struct.error, subprocess.TimeoutExpired) as e:
+        entry["status"] = "error"
+        entry["detail"] = str(e)
+    finally:
+        if os.path.exists(core_path):
+            os.unlink(core_path)
+        entry["triaged"] = time.time()
+    return entry
+
+def triage(names, jobs, all_threads, verbose=True):
+    """Runs gdb over the given cores in parallel and records the results."""
+    db = load_db()
+    names = [name for name in names if db.get(name, {}).get("stored")]
+    if not names:
+        return
+    if not shutil.which(REMOTE_CONFIG["local_gdb"]):
+        print(f"❌ {REMOTE_CONFIG['local_gdb']} not found (sudo apt install gdb-multiarch)", file=sys.stderr)
+        return
+    start = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(triage_core, name, db[name], all_threads): name for name in names}
+        for future in concurrent.futures.as_completed(futures):
+            name = futures[future]
+            db[name] = future.result()
+            if verbose:
+                entry = db[name]
+                known = sum(1 for other in db.values() if other.get("signature") == entry.get("signature"))
+                tag = f"[{entry['signature']}] {'new' if known == 1 else f'seen {known}x'}" if entry.get("signature") \
+                    else entry.get("detail", entry["status"])
+                print(f"🔍 {name}: {get_signal_name(entry.get('signal'))} {tag}")
+    save_db(db)
+    if verbose:
+        print(f"✅ {len(names)} cores analyzed in {time.monotonic() - start:.1f}s")
+
+def get_signal_name(signo):
+    """SIGSEGV etc. for a signal number."""
+    try:
+        return signal.Signals(signo).name
+    except (TypeError, ValueError):
+        return f"signal {signo}"
+
+def group_crashes(db):
+    """Crashes grouped by signature, most frequent first."""
+    groups = {}
+    for name, entry in db.items():
+        key = entry.get("signature") or f"untriaged:{entry['program']}"
+        group = groups.setdefault(key, {"signature": key, "program": entry["program"], "count": 0, "cores": [],
+                                        "signal": get_signal_name(entry.get("signal")), "frames": entry.get("frames", []),
+                                        "location": entry.get("location"), "first": entry["crashed"],
+                                        "last": entry["crashed"]})
+        group["count"] += 1
+        group["cores"].append(name)
+        group["first"] = min(group["first"], entry["crashed"])
+        group["last"] = max(group["last"], entry["crashed"])
+    return sorted(groups.values(), key=lambda g: (-g["count"], -g["last"]))
+
+def report(as_json):
+    """Prints the crash groups."""
+    groups = group_crashes(load_db())
+    if as_json:
+        print(json.dumps(groups, indent=2))
+        return 0
+    if not groups:
+        print("✅ No crashes collected")
+        return 0
+    print(f"{'SIGNATURE':22s} {'COUNT':>5s}  {'PROGRAM':24s} {'SIGNAL':8s} {'LAST SEEN':16s} TOP FRAME")
+    for g in groups:
+        top = g["frames"][0] if g["frames"] else "-"
+        last = time.strftime("%Y-%m-%d %H:%M", time.localtime(g["last"]))
+        print(f"{g['signature']:22s} {g['count']:5d}  {g['program']:24s} {g['signal']:8s} {last:16s} {top[:60]}")
+    return 0
+
+def show(key):
+    """Prints the stack and full gdb output of the latest core of a signature (or a core name)."""
+    db = load_db()
+    names = [key] if key in db else sorted((n for n, e in db.items() if e.get("signature") == key),
+                                           key=lambda n: db[n]["crashed"])
+    if not names:
+        print(f"❌ Unknown signature or core: {key}", file=sys.stderr)
+        return 1
+    name = names[-1]
+    entry = db[name]
+    print(f"💥 {entry['program']} crashed with {get_signal_name(entry.get('signal'))} at "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['crashed']))} ({len(names)} cores with this stack)")
+    print(f"   build-id {entry.get('build_id')}, core {name}")
+    for i, frame in enumerate(entry.get("frames", [])):
+        print(f"   {i}: {frame}")
+    bt_path = os.path.join(get_core_dir(), name + ".bt.txt")
+    if os.path.exists(bt_path):
+        print()
+        with open(bt_path) as f:
+            print(f.read())
+    return 0
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower core dump capture and triage")
+    parser.add_argument("command", nargs="?", default="collect",
+                        choices=["setup", "status", "collect", "triage", "report", "show"])
+    parser.add_argument("key", nargs="?", help="Signature or core name for 'show'")
+    parser.add_argument("--keep-remote", action="store_true", help="Leave collected cores on the Pi")
+    parser.add_argument("--no-triage", action="store_true", help="Only collect")
+    parser.add_argument("--all", action="store_true", help="triage: re-run gdb on all stored cores")
+    parser.add_argument("--all-threads", action="store_true", help="Include backtraces of all threads")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS, help="Parallel gdb processes")
+    parser.add_argument("--json", action="store_true", help="report: print as JSON")
+    args = parser.parse_args()
+
+    if args.command == "setup":
+        return setup()
+    if args.command == "status":
+        return status()
+    if args.command == "report":
+        return report(args.json)
+    if args.command == "show":
+        return show(args.key) if args.key else parser.error("show needs a signature or core name")
+    if args.command == "collect":
+        try:
+            names = collect(args.keep_remote)
+        except RuntimeError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        if names and not args.no_triage:
+            triage(names, args.jobs, args.all_threads)
+            return report(False)
+        return 0
+    db = load_db()
+    names = [name for name, entry in db.items() if args.all or "triaged" not in entry]
+    triage(names, args.jobs, args.all_threads)
+    return report(False)
+
+if __name__ == "__main__":
+    sys.exit(main())
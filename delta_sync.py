@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Delta Sync
+
+Replaces the full-tree rsync with a manifest based delta transfer:
+- the local manifest (path, size, mtime, content hash) is cached, so only
+  files with a changed size/mtime are re-hashed
+- the remote manifest records what was last shipped to the Pi, so the
+  change set is computed locally without any remote stat calls
+- changed files go over the SSH master session as one compressed tar stream,
+  deletions are applied in the same remote invocation
+
+The change set is accumulated in a pending-changes file that the incremental
+build planner consumes.
+
+Usage:
+    python3 delta_sync.py               # Sync changed files
+    python3 delta_sync.py --dry-run     # Only show the change set
+    python3 delta_sync.py --full        # Ignore remote manifest, ship everything
+    python3 delta_sync.py --rsync       # Classic full rsync (fallback)
+    python3 delta_sync.py changes       # Show pending (not yet built) changes
+"""
+
+import argparse
+import fnmatch
+import gzip
+import hashlib
+import io
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tarfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import (REMOTE_CONFIG, SYNC_EXCLUDES, get_cache_dir, get_project_root, get_rsync_command,
+                    get_rsync_target, get_ssh_args, get_target_id)
+import ssh_session
+
+# Files written into the remote workspace by the sync engine
+REMOTE_MANIFEST_NAME = ".debug_sync_manifest.json"
+REMOTE_DELETIONS_NAME = ".debug_sync_deletions"
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# ============================================================================
+# MANIFESTS
+# ============================================================================
+
+def get_sync_dir():
+    """Determines the cache directory for sync manifests."""
+    sync_dir = os.path.join(get_cache_dir(), "sync")
+    os.makedirs(sync_dir, exist_ok=True)
+    return sync_dir
+
+def get_manifest_paths():
+    """Returns (local manifest, remote manifest, pending changes, stats) file paths of the current target."""
+    base = os.path.join(get_sync_dir(), get_target_id())
+    return base + ".local.json", base + ".remote.json", base + ".changes.json", base + ".stats.json"
+
+def load_json(path, default):
+    """Loads a JSON file, returns default if missing or broken."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def save_json(path, data):
+    """Writes a JSON file atomically."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def is_excluded(name):
+    """Checks a directory name against the sync excludes."""
+    return any(fnmatch.fnmatch(name, pattern.rstrip("/")) for pattern in SYNC_EXCLUDES)
+
+def hash_file(path):
+    """Computes the content hash of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def scan_tree(root, previous):
+    """
+    Builds the manifest {path: [size, mtime_ns, hash]} of the tree.
+    Hashes are reused from the previous manifest when size and mtime are unchanged.
+    Returns (manifest, number of re-hashed files).
+    """
+    manifest = {}
+    hashed = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        kept = []
+        for name in dirnames:
+            if is_excluded(name):
+                continue
+            if os.path.islink(os.path.join(dirpath, name)):
+                # Symlinked directories are shipped as links, not followed
+                filenames.append(name)
+                continue
+            kept.append(name)
+        dirnames[:] = kept
+
+        for name in filenames:
+            full_path = os.path.join(dirpath, name)
+            rel_path = name if rel_dir == "." else os.path.join(rel_dir, name)
+            if rel_path in (REMOTE_MANIFEST_NAME, REMOTE_DELETIONS_NAME):
+                continue
+            try:
+                st = os.lstat(full_path)
+            except OSError:
+                continue
+            if os.path.islink(full_path):
+                manifest[rel_path] = [0, st.st_mtime_ns, "link:" + os.readlink(full_path)]
+                continue
+            cached = previous.get(rel_path)
+            if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                manifest[rel_path] = cached
+            else:
+                manifest[rel_path] = [st.st_size, st.st_mtime_ns, hash_file(full_path)]
+                hashed += 1
+    return manifest, hashed
+
+def compute_changes(local, remote):
+    """Compares local and remote manifest. Returns (changed paths, deleted paths)."""
+    changed = sorted(path for path, entry in local.items()
+                     if path not in remote or remote[path][2] != entry[2])
+    deleted = sorted(path for path in remote if path not in local)
+    return changed, deleted
+
+def record_pending_changes(changes_path, changed, deleted):
+    """Adds a change set to the pending changes consumed by the build planner."""
+    pending = load_json(changes_path, {"changed": [], "deleted": []})
+    pending["changed"] = sorted((set(pending["changed"]) - set(deleted)) | set(changed))
+    pending["deleted"] = sorted((set(pending["deleted"]) - set(changed)) | set(deleted))
+    pending["updated"] = time.time()
+    save_json(changes_path, pending)
+
+def get_pending_changes():
+    """Returns the accumulated change set since the last successful build."""
+    return load_json(get_manifest_paths()[2], {"changed": [], "deleted": []})
+
+def clear_pending_changes():
+    """Resets the pending changes (after a successful build)."""
+    changes_path = get_manifest_paths()[2]
+    if os.path.exists(changes_path):
+        os.unlink(changes_path)
+
+# ============================================================================
+# TRANSFER
+# ============================================================================
+
+class CountingWriter(io.RawIOBase):
+    """File-like wrapper counting the bytes written to the underlying stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.stream.write(data)
+        self.count += len(data)
+        return len(data)
+
+def get_remote_apply_command():
+    """Remote command: unpack the stream, apply the deletion list and prune directories left empty."""
+    workspace = shlex.quote(REMOTE_CONFIG["workspace"])
+    return (
+        f"mkdir -p {workspace} && cd {workspace} && tar xzf - && "
+        f"if [ -f {REMOTE_DELETIONS_NAME} ]; then "
+        f"xargs -0 -r rm -f -- < {REMOTE_DELETIONS_NAME}; "
+        f"xargs -0 -r dirname -z -- < {REMOTE_DELETIONS_NAME} | sort -zu | "
+        f"xargs -0 -r rmdir -p --ignore-fail-on-non-empty -- 2>/dev/null; "
+        f"rm -f {REMOTE_DELETIONS_NAME}; fi"
+    )
+
+def add_bytes_to_tar(tar, name, data):
+    """Adds an in-memory file to the tar stream."""
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
+
+def transfer(root, changed, deleted, manifest):
+    """Ships changed files, deletion list and manifest as one compressed stream. Returns compressed bytes sent."""
+    ssh_session.ensure_master(quiet=True)
+    process = subprocess.Popen(["ssh"] + get_ssh_args() + [get_remote_apply_command()], stdin=subprocess.PIPE)
+    counter = CountingWriter(process.stdin)
+    try:
+        with gzip.GzipFile(fileobj=counter, mode="wb", compresslevel=6) as gz:
+            with tarfile.open(fileobj=gz, mode="w|") as tar:
+                for path in changed:
+                    tar.add(os.path.join(root, path), arcname=path, recursive=False)
+                if deleted:
+                    add_bytes_to_tar(tar, REMOTE_DELETIONS_NAME, "\0".join(deleted).encode())
+                add_bytes_to_tar(tar, REMOTE_MANIFEST_NAME, json.dumps(manifest).encode())
+        process.stdin.close()
+    except BrokenPipeError:
+        pass
+    if process.wait() != 0:
+        raise RuntimeError(f"remote unpack failed (exit code {process.returncode})")
+    return counter.count
+
+def fetch_remote_manifest():
+    """Loads the manifest stored in the remote workspace (used when the local copy is missing)."""
+    workspace = shlex.quote(REMOTE_CONFIG["workspace"])
+    result = ssh_session.run_remote(f"cat {workspace}/{REMOTE_MANIFEST_NAME} 2>/dev/null || true")
+    try:
+        return json.loads(result.stdout) if result.returncode == 0 and result.stdout.strip() else {}
+    except ValueError:
+        return {}
+
+# ============================================================================
+# SYNC
+# ============================================================================
+
+def format_bytes(count):
+    """Formats a byte count human-readable."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(count) < 1024 or unit == "GB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024.0
+
+def record_sync_stats(stats_path, stats, full_transfer):
+    """Adds a completed transfer to the sync statistics history. Returns the history."""
+    history = load_json(stats_path, {})
+    if full_transfer:
+        # Reference time for a full transfer of the workspace
+        history["full_sync_seconds"] = stats["seconds"]
+    history["last"] = {k: v for k, v in stats.items() if not k.endswith("_paths")}
+    save_json(stats_path, history)
+    return history
+
+def sync(full=False, dry_run=False, verbose=True):
+    """Runs a delta sync of the project root. Returns a statistics dict."""
+    root = get_project_root()
+    local_path, remote_path, changes_path, stats_path = get_manifest_paths()
+    start = time.monotonic()
+
+    local, hashed = scan_tree(root, load_json(local_path, {}))
+    save_json(local_path, local)
+    scan_seconds = time.monotonic() - start
+
+    remote = {} if full else load_json(remote_path, None)
+    if remote is None:
+        remote = fetch_remote_manifest()
+    changed, deleted = compute_changes(local, remote)
+
+    total_bytes = sum(entry[0] for entry in local.values())
+    changed_bytes = sum(local[path][0] for path in changed)
+    stats = {
+        "files": len(local),
+        "hashed": hashed,
+        "changed": len(changed),
+        "deleted": len(deleted),
+        "total_bytes": total_bytes,
+        "changed_bytes": changed_bytes,
+        "sent_bytes": 0,
+        "scan_seconds": round(scan_seconds, 3),
+        "seconds": 0.0,
+    }
+
+    if verbose:
+        print(f"🔍 {len(local)} files scanned ({hashed} re-hashed) in {scan_seconds:.2f}s")
+        print(f"📝 Change set: {len(changed)} changed, {len(deleted)} deleted")
+        if dry_run:
+            for path in changed:
+                print(f"   M {path}")
+            for path in deleted:
+                print(f"   D {path}")
+
+    if dry_run:
+        return stats
+    if not changed and not deleted and remote:
+        stats["seconds"] = round(time.monotonic() - start, 3)
+        if verbose:
+            print("✅ Remote workspace is up to date")
+        return stats
+
+    stats["sent_bytes"] = transfer(root, changed, deleted, local)
+    save_json(remote_path, local)
+    record_pending_changes(changes_path, changed, deleted)
+    stats["seconds"] = round(time.monotonic() - start, 3)
+
+    history = record_sync_stats(stats_path, stats, not remote or full)
+
+    if verbose:
+        print(f"📡 Sent {format_bytes(stats['sent_bytes'])} compressed "
+              f"({format_bytes(changed_bytes)} changed of {format_bytes(total_bytes)} total)")
+        print(f"💾 Saved {format_bytes(total_bytes - stats['sent_bytes'])} of transfer")
+        if "full_sync_seconds" in history and remote and not full:
+            saved = history["full_sync_seconds"] - stats["seconds"]
+            print(f"⏱️  {stats['seconds']:.2f}s (full sync: {history['full_sync_seconds']:.2f}s, saved {saved:.2f}s)")
+        else:
+            print(f"⏱️  {stats['seconds']:.2f}s")
+    return stats
+
+def sync_paths(paths, verbose=True):
+    """
+    Incremental sync of known changed paths (e.g. from file system events) without a tree scan.
+    Directories in paths are rescanned, vanished paths drop their manifest entries.
+    Falls back to a full-tree sync when no remote manifest is known yet. Returns a statistics dict.
+    """
+    root = get_project_root()
+    local_path, remote_path, changes_path, stats_path = get_manifest_paths()
+    local = load_json(local_path, None)
+    remote = load_json(remote_path, None)
+    if local is None or remote is None:
+        return sync(verbose=verbose)
+    start = time.monotonic()
+
+    touched = set()
+    hashed = 0
+    for path in sorted(set(paths)):
+        full_path = os.path.join(root, path)
+        prefix = path + os.sep
+        if os.path.isdir(full_path) and not os.path.islink(full_path):
+            previous = {p[len(prefix):]: e for p, e in local.items() if p.startswith(prefix)}
+            subtree, sub_hashed = scan_tree(full_path, previous)
+            hashed += sub_hashed
+            for sub_path in previous:
+                if sub_path not in subtree:
+                    del local[prefix + sub_path]
+                    touched.add(prefix + sub_path)
+            for sub_path, entry in subtree.items():
+                local[prefix + sub_path] = entry
+                touched.add(prefix + sub_path)
+            continue
+        try:
+            st = os.lstat(full_path)
+        except OSError:
+            # Vanished file or directory
+            for known in [p for p in local if p == path or p.startswith(prefix)]:
+                del local[known]
+                touched.add(known)
+            touched.update(p for p in remote if p == path or p.startswith(prefix))
+            continue
+        touched.add(path)
+        if os.path.islink(full_path):
+            local[path] = [0, st.st_mtime_ns, "link:" + os.readlink(full_path)]
+            continue
+        cached = local.get(path)
+        if not (cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns):
+            local[path] = [st.st_size, st.st_mtime_ns, hash_file(full_path)]
+            hashed += 1
+
+    changed = sorted(p for p in touched if p in local and (p not in remote or remote[p][2] != local[p][2]))
+    deleted = sorted(p for p in touched if p in remote and p not in local)
+    save_json(local_path, local)
+    stats = {
+        "files": len(local),
+        "hashed": hashed,
+        "changed": len(changed),
+        "deleted": len(deleted),
+        "changed_paths": changed,
+        "deleted_paths": deleted,
+        "total_bytes": sum(entry[0] for entry in local.values()),
+        "changed_bytes": sum(local[p][0] for p in changed),
+        "sent_bytes": 0,
+        "seconds": 0.0,
+    }
+    if changed or deleted:
+        stats["sent_bytes"] = transfer(root, changed, deleted, local)
+        save_json(remote_path, local)
+        record_pending_changes(changes_path, changed, deleted)
+    stats["seconds"] = round(time.monotonic() - start, 3)
+    if changed or deleted:
+        record_sync_stats(stats_path, stats, False)
+
+    if verbose:
+        print(f"📡 {len(changed)} changed, {len(deleted)} deleted: sent {format_bytes(stats['sent_bytes'])} "
+              f"in {stats['seconds']:.2f}s")
+    return stats
+
+def rsync_full(quiet=False):
+    """Classic full-tree rsync (fallback, e.g. if the remote manifest is out of sync). Returns the exit code."""
+    command = f"{get_rsync_command()} {shlex.quote(get_project_root())}/ {get_rsync_target()}"
+    return subprocess.call(command, shell=True, stdout=subprocess.DEVNULL if quiet else None)
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower delta sync to the Pi")
+    parser.add_argument("action", nargs="?", choices=["sync", "changes"], default="sync")
+    parser.add_argument("--full", action="store_true", help="Ignore remote manifest and ship all files")
+    parser.add_argument("--dry-run", action="store_true", help="Only show the change set")
+    parser.add_argument("--rsync", action="store_true", help="Use classic full rsync instead")
+    parser.add_argument("--json", action="store_true", help="Print statistics as JSON")
+    args = parser.parse_args()
+
+    if args.action == "changes":
+        print(json.dumps(get_pending_changes(), indent=2))
+        return 0
+    if args.rsync:
+        return rsync_full()
+
+    try:
+        stats = sync(full=args.full, dry_run=args.dry_run, verbose=not args.json)
+    except RuntimeError as e:
+        print(f"❌ Sync failed: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(stats, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
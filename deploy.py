@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Deploy Pipeline
+
+Replaces the serial stages of deploy.sh (local catkin_make, full rsync,
+remote catkin_make) with a pipeline:
+- the remote shell is opened and the ROS environment sourced while the
+  local change set is scanned and shipped (delta_sync.py)
+- the build plan (build_planner.py) is sent to the already prepared shell
+- the optional local build runs in the background (the remote build does not need it)
+
+Each deploy records per-stage wall time in a history file; the summary
+command shows trends and flags regressions.
+
+Usage:
+    python3 deploy.py                   # Sync + incremental remote build
+    python3 deploy.py --local-build     # Additionally run catkin_make locally (in parallel)
+    python3 deploy.py --full            # Full sync and full remote build
+    python3 deploy.py summary           # Stage times across recent deploys (exit 1 on regression)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, get_cache_dir, get_project_root, get_target_id
+import build_planner
+import delta_sync
+import ssh_session
+
+# Stages in display order
+STAGES = ("remote_warmup", "sync", "plan", "remote_build", "local_build", "total")
+
+# A stage regressed if it is this much slower than the median of earlier deploys ...
+REGRESSION_FACTOR = 1.25
+# ... and at least this many seconds slower (ignores noise on short stages)
+REGRESSION_MIN_SECONDS = 0.5
+
+# ============================================================================
+# HISTORY
+# ============================================================================
+
+def get_history_path():
+    """Determines the deploy history file of the current target."""
+    history_dir = os.path.join(get_cache_dir(), "deploys")
+    os.makedirs(history_dir, exist_ok=True)
+    return os.path.join(history_dir, get_target_id() + ".jsonl")
+
+def load_history():
+    """Loads all recorded deploys (oldest first)."""
+    if not os.path.exists(get_history_path()):
+        return []
+    with open(get_history_path()) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def record_deploy(entry):
+    """Appends a deploy to the history."""
+    with open(get_history_path(), "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+def start_local_build():
+    """Starts catkin_make in the local workspace in the background (output goes to a log file)."""
+    log_path = os.path.join(get_cache_dir(), "local_build.log")
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        ["bash", "-c", "source /opt/ros/noetic/setup.bash && catkin_make"],
+        cwd=get_project_root(), stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT
+    )
+    log.close()
+    return process, log_path
+
+def deploy(full=False, local_build=False):
+    """Runs the deploy pipeline. Returns the history entry."""
+    print(f"🚀 Deploying OpenMower to {REMOTE_CONFIG['user']}@{REMOTE_CONFIG['host']}")
+    start = time.monotonic()
+    stages = {}
+    entry = {"time": time.time(), "ok": False, "full": full, "stages": stages}
+
+    local = start_local_build() if local_build else None
+    if local:
+        print(f"🔨 Local build running in background (log: {local[1]})")
+
+    # Master session first: sync and remote shell would otherwise both start one on a cold start
+    ssh_session.ensure_master(quiet=True)
+    # Remote shell warms up (SSH, ROS environment) while the change set is scanned and shipped
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        shell_future = executor.submit(build_planner.open_remote_shell)
+        print("📡 Syncing to Pi...")
+        sync_start = time.monotonic()
+        try:
+            sync_stats = delta_sync.sync(full=full)
+        except RuntimeError as e:
+            print(f"❌ Sync failed: {e}", file=sys.stderr)
+            sync_stats = None
+        stages["sync"] = round(time.monotonic() - sync_start, 2)
+        shell = shell_future.result()
+
+    if sync_stats is None:
+        shell["process"].kill()
+        return finish_deploy(entry, start, local)
+    entry["sent_bytes"] = sync_stats["sent_bytes"]
+    entry["changed"] = sync_stats["changed"] + sync_stats["deleted"]
+
+    plan_start = time.monotonic()
+    if full:
+        plan = {"full": True, "reason": "requested", "build": [], "skipped": []}
+    else:
+        pending = delta_sync.get_pending_changes()
+        plan = build_planner.plan_build(pending["changed"], pending["deleted"], build_planner.load_packages())
+    stages["plan"] = round(time.monotonic() - plan_start, 2)
+    build_planner.print_plan(plan)
+
+    print("🔨 Building on Pi...")
+    build_start = time.monotonic()
+    ok, timings = build_planner.finish_remote_build(shell, plan)
+    stages["remote_build"] = round(time.monotonic() - build_start, 2)
+    stages["remote_warmup"] = shell["ready_seconds"]
+    entry["packages"] = timings
+    if plan["full"] or plan["build"]:
+        build_planner.record_build(plan, ok, timings, stages["remote_build"], shell["ccache"])
+    if ok:
+        delta_sync.clear_pending_changes()
+    entry["ok"] = ok
+    return finish_deploy(entry, start, local)
+
+def finish_deploy(entry, start, local):
+    """Waits for the local build, records the deploy and prints the stage times."""
+    stages = entry["stages"]
+    if local:
+        process, log_path = local
+        local_start = time.monotonic()
+        if process.poll() is None:
+            print("⏳ Waiting for local build...")
+        local_ok = process.wait() == 0
+        # Only the time the pipeline actually waited counts
+        stages["local_build"] = round(time.monotonic() - local_start, 2)
+        if not local_ok:
+            print(f"❌ Local build failed (see {log_path})", file=sys.stderr)
+            entry["ok"] = False
+    stages["total"] = round(time.monotonic() - start, 2)
+    record_deploy(entry)
+
+    print("\n⏱️  Stage times:")
+    for name in STAGES:
+        if stages.get(name) is not None:
+            print(f"   {name:15s} {stages[name]:8.2f}s")
+    print("✅ Deployment complete!" if entry["ok"] else "❌ Deployment failed")
+    return entry
+
+# ============================================================================
+# SUMMARY
+# ============================================================================
+
+def summarize(history, limit):
+    """Computes per-stage statistics. The last deploy is compared with the median of the ones before."""
+    recent = history[-limit:]
+    summary = {}
+    for name in STAGES:
+        values = [e["stages"][name] for e in recent if e["stages"].get(name) is not None]
+        if not values:
+            continue
+        last = values[-1]
+        baseline = statistics.median(values[:-1]) if len(values) > 1 else last
+        summary[name] = {
+            "last": last,
+            "median": baseline,
+            "min": min(values),
+            "max": max(values),
+            "trend": values,
+            "regression": last > baseline * REGRESSION_FACTOR and last - baseline >= REGRESSION_MIN_SECONDS,
+        }
+    return summary
+
+def format_trend(values):
+    """Renders values as a small bar chart."""
+    bars = "▁▂▃▄▅▆▇█"
+    low, high = min(values), max(values)
+    if high - low < 1e-9:
+        return bars[0] * len(values)
+    return "".join(bars[int((v - low) / (high - low) * (len(bars) - 1))] for v in values)
+
+def print_summary(limit):
+    """Prints stage trends and regressions of the recent deploys."""
+    history = load_history()
+    if not history:
+        print("ℹ️  No deploys recorded yet")
+        return 0
+    recent = history[-limit:]
+    failed = sum(1 for e in recent if not e["ok"])
+    print(f"📊 Last {len(recent)} deploys ({failed} failed)")
+    print(f"   {'stage':15s} {'last':>8s} {'median':>8s} {'min':>8s} {'max':>8s}  trend")
+    regressions = []
+    for name, s in summarize(history, limit).items():
+        flag = "  ⚠️  regression" if s["regression"] else ""
+        print(f"   {name:15s} {s['last']:7.2f}s {s['median']:7.2f}s {s['min']:7.2f}s {s['max']:7.2f}s  "
+              f"{format_trend(s['trend'])}{flag}")
+        if s["regression"]:
+            regressions.append(name)
+
+    last = history[-1]
+    # Stages run one after another would take the sum of their times
+    sequential = sum(v for k, v in last["stages"].items() if k != "total" and v)
+    if sequential > last["stages"]["total"]:
+        print(f"⚡ Last deploy: {sequential - last['stages']['total']:.2f}s saved by running stages concurrently")
+    if regressions:
+        print(f"⚠️  Regressed stages: {', '.join(regressions)}")
+    return 1 if regressions else 0
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower deploy pipeline")
+    parser.add_argument("action", nargs="?", choices=["deploy", "summary"], default="deploy")
+    parser.add_argument("--full", action="store_true", help="Full sync and full remote build")
+    parser.add_argument("--local-build", action="store_true", help="Also run catkin_make locally (in parallel)")
+    parser.add_argument("-n", "--limit", type=int, default=20, help="Number of deploys in the summary")
+    args = parser.parse_args()
+
+    if args.action == "summary":
+        return print_summary(args.limit)
+    entry = deploy(full=args.full, local_build=args.local_build)
+    return 0 if entry["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Connection Diagnostics
+
+Runs the connection probes of test-connection.sh concurrently:
+local probes (SSH key, ping) and the SSH connection start in parallel,
+all remote file/command checks are batched into a single remote invocation.
+
+Usage:
+    python3 diagnostics.py            # Human-readable output with timings
+    python3 diagnostics.py --quiet    # Only errors, exit code 0 = OK, 1 = failed
+    python3 diagnostics.py --json     # Machine-readable JSON result
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, get_ssh_args
+import ssh_session
+
+CONNECT_TIMEOUT = 5
+
+# ============================================================================
+# PROBE DEFINITIONS
+# ============================================================================
+
+def get_remote_checks():
+    """Remote checks as (name, description, shell test, required) - run in one SSH invocation."""
+    workspace = REMOTE_CONFIG["workspace"]
+    return [
+        ("workspace", "Remote workspace", f"test -d {shlex.quote(workspace)}", True),
+        ("ros", "ROS installation", "test -f /opt/ros/noetic/setup.bash", True),
+        ("gdb", "GDB available", "command -v gdb", True),
+        ("catkin", "Catkin workspace", f"test -f {shlex.quote(workspace)}/src/CMakeLists.txt", False),
+        ("devel", "Build directories", f"test -d {shlex.quote(workspace)}/devel", False),
+    ]
+
+# Hints for failed probes
+FAILURE_HINTS = {
+    "ssh_key": "SSH key not found: {ssh_key}",
+    "ping": "Host {host} is not reachable",
+    "ssh": "SSH connection failed. Check user name and SSH key.",
+    "workspace": "Workspace {workspace} does not exist on the remote host",
+    "ros": "ROS Noetic is not installed on the remote host",
+    "gdb": "GDB is not installed on the remote host",
+    "catkin": "Catkin workspace not initialized (normal on first setup)",
+    "devel": "Project not built yet (normal on first setup)",
+}
+
+def make_result(name, description, ok, seconds, required=True, batched=False, detail="", skipped=False):
+    """Creates a probe result entry."""
+    return {
+        "name": name,
+        "description": description,
+        "ok": ok,
+        "skipped": skipped,
+        "required": required,
+        "ms": round(seconds * 1000, 1),
+        "batched": batched,
+        "detail": detail,
+    }
+
+async def run_process(*argv, timeout):
+    """Runs a process and returns (returncode, stdout). Returncode is None on timeout."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *argv, stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+    except OSError:
+        # Program not installed (e.g. no ping on minimal systems)
+        return None, ""
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None, ""
+    return process.returncode, stdout.decode(errors="replace")
+
+# ============================================================================
+# PROBES
+# ============================================================================
+
+async def probe_ssh_key():
+    """Checks that the configured SSH key exists locally."""
+    start = time.monotonic()
+    ssh_key = os.path.expanduser(REMOTE_CONFIG.get("ssh_key", "~/.ssh/id_rsa_openmower"))
+    return make_result("ssh_key", "SSH key available", os.path.isfile(ssh_key), time.monotonic() - start)
+
+async def probe_ping():
+    """Checks that the host answers to ping."""
+    start = time.monotonic()
+    returncode, _ = await run_process("ping", "-c", "1", "-W", "3", REMOTE_CONFIG["host"], timeout=CONNECT_TIMEOUT)
+    return make_result("ping", "Host reachable (ping)", returncode == 0, time.monotonic() - start)
+
+async def probe_ssh():
+    """Checks the SSH connection (opens the shared master session if multiplexing is enabled)."""
+    start = time.monotonic()
+    if REMOTE_CONFIG.get("ssh_multiplex", True):
+        ok = await asyncio.to_thread(ssh_session.ensure_master, CONNECT_TIMEOUT, True)
+    else:
+        args = get_ssh_args()
+        returncode, _ = await run_process(
+            "ssh", *args[:-1], "-o", f"ConnectTimeout={CONNECT_TIMEOUT}", "-o", "BatchMode=yes", args[-1], "echo ok",
+            timeout=CONNECT_TIMEOUT * 2
+        )
+        ok = returncode == 0
+    description = "SSH host configuration" if REMOTE_CONFIG.get("ssh_host") else "SSH connection"
+    return make_result("ssh", description, ok, time.monotonic() - start)
+
+async def probe_remote_batch(ssh_probe):
+    """Runs all remote checks in one SSH invocation once the connection probe succeeded."""
+    checks = get_remote_checks()
+    ssh_result = await ssh_probe
+    if not ssh_result["ok"]:
+        return ssh_result, [
+            make_result(name, description, False, 0.0, required, batched=True, skipped=True)
+            for name, description, _, required in checks
+        ]
+
+    script = "; ".join(
+        f"if {test} >/dev/null 2>&1; then echo '@@ {name} 0'; else echo '@@ {name} 1'; fi"
+        for name, _, test, _ in checks
+    )
+    args = get_ssh_args()
+    start = time.monotonic()
+    returncode, stdout = await run_process(
+        "ssh", *args[:-1], "-o", f"ConnectTimeout={CONNECT_TIMEOUT}", "-o", "BatchMode=yes", args[-1], script,
+        timeout=CONNECT_TIMEOUT * 2
+    )
+    elapsed = time.monotonic() - start
+    if returncode is None or returncode == 255:
+        # ssh itself failed (connection lost, timeout) - the checks never ran
+        detail = "timeout" if returncode is None else "ssh failed"
+        return ssh_result, [
+            make_result(name, description, False, elapsed, required, batched=True, detail=detail)
+            for name, description, _, required in checks
+        ]
+
+    status = {}
+    for line in stdout.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[0] == "@@":
+            status[parts[1]] = parts[2] == "0"
+    results = [
+        make_result(name, description, status.get(name, False), elapsed, required, batched=True,
+                    detail="" if name in status else "no answer")
+        for name, description, _, required in checks
+    ]
+    return ssh_result, results
+
+async def run_diagnostics():
+    """Runs all probes concurrently and returns the list of results in display order."""
+    local_probes = [probe_ping()]
+    if not REMOTE_CONFIG.get("ssh_host"):
+        local_probes.insert(0, probe_ssh_key())
+
+    ssh_probe = asyncio.ensure_future(probe_ssh())
+    gathered = await asyncio.gather(*local_probes, probe_remote_batch(ssh_probe))
+    ssh_result, remote_results = gathered[-1]
+    return list(gathered[:-1]) + [ssh_result] + remote_results
+
+# ============================================================================
+# OUTPUT
+# ============================================================================
+
+def print_results(results, total_seconds, quiet):
+    """Prints probe results with timings; errors always go to stderr."""
+    def log(message=""):
+        if not quiet:
+            print(message)
+
+    log("🚀 OpenMower Remote Connection Test")
+    log(f"Target: {REMOTE_CONFIG['user']}@{REMOTE_CONFIG['host']}")
+    hint_values = {
+        "ssh_key": REMOTE_CONFIG.get("ssh_key", "~/.ssh/id_rsa_openmower"),
+        "host": REMOTE_CONFIG["host"],
+        "workspace": REMOTE_CONFIG["workspace"],
+    }
+    for result in results:
+        timing = f"{result['ms']:.0f} ms" + (" batched" if result["batched"] else "")
+        if result["ok"]:
+            log(f"✅ {result['description']}: OK ({timing})")
+        elif result["skipped"]:
+            log(f"⏭️  {result['description']}: skipped (no SSH connection)")
+        elif result["required"]:
+            print(f"❌ {result['description']}: FAILED ({timing}) {result['detail']}".rstrip(), file=sys.stderr)
+            if not result["detail"]:
+                # With a detail (ssh failed, timeout, no answer) the check itself never ran
+                print(f"❌ {FAILURE_HINTS[result['name']].format(**hint_values)}", file=sys.stderr)
+        elif result["detail"]:
+            log(f"⚠️  {result['description']}: {result['detail']} ({timing})")
+        else:
+            log(f"⚠️  {FAILURE_HINTS[result['name']].format(**hint_values)} ({timing})")
+    log(f"⏱️  Total: {total_seconds * 1000:.0f} ms")
+
+    errors = sum(1 for r in results if r["required"] and not r["ok"] and not r["skipped"])
+    if errors == 0:
+        log("")
+        log("🎉 All tests passed!")
+        log("✅ Remote debugging should work")
+    else:
+        log("")
+        print(f"❌ 💥 {errors} test(s) failed", file=sys.stderr)
+        log("")
+        log("🔧 Troubleshooting:")
+        log("   1. Use SSH keys instead of passwords")
+        log("   2. Check firewall settings")
+        log("   3. Install ROS on the remote host")
+        log("   4. Install GDB: sudo apt install gdb")
+        log("   5. Check configuration: python3 config.py")
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower remote connection diagnostics")
+    parser.add_argument("--quiet", action="store_true", help="Only print errors, exit code signals the result")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON result")
+    args = parser.parse_args()
+
+    start = time.monotonic()
+    results = asyncio.run(run_diagnostics())
+    total_seconds = time.monotonic() - start
+    ok = all(r["ok"] for r in results if r["required"])
+
+    if args.json:
+        print(json.dumps({
+            "target": f"{REMOTE_CONFIG['user']}@{REMOTE_CONFIG['host']}",
+            "ok": ok,
+            "total_ms": round(total_seconds * 1000, 1),
+            "probes": results,
+        }, indent=2))
+    else:
+        print_results(results, total_seconds, args.quiet)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
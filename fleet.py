@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Fleet Runner
+
+Runs connection tests, sync, build and deploy against all mowers of the
+fleet inventory (LOCAL_FLEET in config_local.py) in parallel:
+- each target runs the regular tool in its own process with
+  OPENMOWER_TARGET=<name>, so caches, SSH sessions and histories stay per target
+- at most --jobs targets run at the same time, each with its own timeout
+- the output of each target goes to a log file, the results are aggregated in a table
+
+Usage:
+    python3 fleet.py list                     # Show the inventory
+    python3 fleet.py test                     # Connection test on all targets
+    python3 fleet.py deploy -j 2 --timeout 900
+    python3 fleet.py sync --targets mower1 mower3
+    python3 fleet.py artifacts -- --source build-arm/devel   # Extra arguments for the tool
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import FLEET_TARGET_ENV, get_cache_dir, get_target_config, get_target_id, get_tools_dir, load_fleet
+
+# Fleet actions: tool and arguments (tools with --json report structured results)
+ACTIONS = {
+    "test": ["diagnostics.py", "--json"],
+    "sync": ["delta_sync.py", "--json"],
+    "build": ["build_planner.py"],
+    "deploy": ["deploy.py"],
+    "artifacts": ["artifact_deploy.py", "--json"],
+}
+
+DEFAULT_JOBS = 4
+DEFAULT_TIMEOUT = 600
+
+# ============================================================================
+# RESULT DETAILS
+# ============================================================================
+
+def parse_json_output(output):
+    """Extracts the trailing JSON object of a tool's output (None if there is none)."""
+    lines = output.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith("{"):
+            try:
+                return json.loads("\n".join(lines[i:]))
+            except ValueError:
+                continue
+    return None
+
+def get_detail(action, output):
+    """Short result description of a target run."""
+    data = parse_json_output(output)
+    if action == "test" and data:
+        failed = [p["description"] for p in data["probes"] if p["required"] and not p["ok"]]
+        return f"failed: {', '.join(failed)}" if failed else f"{data['total_ms']:.0f} ms"
+    if action in ("sync", "artifacts") and data:
+        return f"{data['changed']} changed, {data['sent_bytes']} B sent"
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    return lines[-1] if lines else ""
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def get_log_dir(action):
+    """Directory with the per-target logs of the latest run of an action."""
+    log_dir = os.path.join(get_cache_dir(), "fleet", action)
+    os.makedirs(log_dir, exist_ok=True)
+    return log_dir
+
+async def run_target(target, action, extra_args, semaphore, timeout, verbose=True):
+    """Runs the action for one target. Returns its result entry."""
+    config = get_target_config(target)
+    result = {"target": target["name"], "host": config.get("ssh_host") or config["host"],
+              "status": "failed", "seconds": 0.0, "detail": ""}
+    argv = [sys.executable, os.path.join(get_tools_dir(), ACTIONS[action][0])] + ACTIONS[action][1:] + extra_args
+    env = dict(os.environ, **{FLEET_TARGET_ENV: target["name"]})
+
+    async with semaphore:
+        start = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            *argv, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT, env=env, start_new_session=True
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+            output = stdout.decode(errors="replace")
+            result["status"] = "ok" if process.returncode == 0 else "failed"
+            result["detail"] = get_detail(action, output)
+        except asyncio.TimeoutError:
+            # Kill the whole process group (ssh children included)
+            os.killpg(process.pid, signal.SIGKILL)
+            await process.wait()
+            output = ""
+            result["status"] = "timeout"
+            result["detail"] = f"no result after {timeout}s"
+        result["seconds"] = round(time.monotonic() - start, 2)
+
+    result["log"] = os.path.join(get_log_dir(action), f"{target['name']}.log")
+    with open(result["log"], "w") as f:
+        f.write(output)
+    status_icon = {"ok": "✅", "failed": "❌", "timeout": "⏰"}[result["status"]]
+    if verbose:
+        print(f"{status_icon} {target['name']}: {result['status']} ({result['seconds']:.1f}s)", flush=True)
+    return result
+
+async def run_fleet(targets, action, extra_args, jobs, timeout, verbose=True):
+    """Runs the action on all targets with at most `jobs` in parallel."""
+    semaphore = asyncio.Semaphore(jobs)
+    return await asyncio.gather(*(run_target(t, action, extra_args, semaphore, timeout, verbose) for t in targets))
+
+def print_table(results, total_seconds):
+    """Prints the aggregated result table."""
+    width = max([len(r["target"]) for r in results] + [6])
+    host_width = max([len(r["host"]) for r in results] + [4])
+    print(f"\n{'TARGET':{width}s}  {'HOST':{host_width}s}  {'STATUS':8s} {'TIME':>8s}  DETAIL")
+    for r in results:
+        print(f"{r['target']:{width}s}  {r['host']:{host_width}s}  {r['status']:8s} {r['seconds']:7.1f}s  {r['detail']}")
+    ok = sum(1 for r in results if r["status"] == "ok")
+    sequential = sum(r["seconds"] for r in results)
+    print(f"\n{ok}/{len(results)} ok in {total_seconds:.1f}s (sequential: {sequential:.1f}s)")
+
+def find_colliding_targets(fleet):
+    """Pairs of targets with the same target id (same Pi and workspace - caches and histories would collide)."""
+    seen = {}
+    collisions = []
+    for target in fleet:
+        target_id = get_target_id(get_target_config(target))
+        if target_id in seen:
+            collisions.append((seen[target_id], target["name"]))
+        seen.setdefault(target_id, target["name"])
+    return collisions
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower fleet runner")
+    parser.add_argument("action", choices=["list"] + list(ACTIONS))
+    parser.add_argument("--targets", nargs="+", help="Target names (default: whole fleet)")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS, help="Maximum targets in parallel")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="Timeout per target in seconds")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    # Arguments after -- are passed to the tool
+    argv = sys.argv[1:]
+    extra = argv[argv.index("--") + 1:] if "--" in argv else []
+    args = parser.parse_args(argv[:argv.index("--")] if "--" in argv else argv)
+
+    fleet = load_fleet()
+    if not fleet:
+        print("❌ No fleet targets defined (LOCAL_FLEET in config_local.py)", file=sys.stderr)
+        return 1
+    if args.targets:
+        known = {t["name"] for t in fleet}
+        unknown = [name for name in args.targets if name not in known]
+        if unknown:
+            print(f"❌ Unknown targets: {', '.join(unknown)}", file=sys.stderr)
+            return 1
+        fleet = [t for t in fleet if t["name"] in args.targets]
+    collisions = find_colliding_targets(fleet)
+    if collisions:
+        for first, second in collisions:
+            print(f"❌ Targets {first} and {second} resolve to the same Pi and workspace - give each its own host or ssh_host",
+                  file=sys.stderr)
+        return 1
+
+    if args.action == "list":
+        for target in fleet:
+            config = get_target_config(target)
+            print(f"{target['name']:15s} {config.get('ssh_host') or config['user'] + '@' + config['host']:30s} "
+                  f"{config['workspace']}")
+        return 0
+
+    start = time.monotonic()
+    results = asyncio.run(run_fleet(fleet, args.action, extra, max(1, args.jobs), args.timeout, not args.json))
+    total_seconds = time.monotonic() - start
+    if args.json:
+        print(json.dumps({"action": args.action, "total_seconds": round(total_seconds, 2), "results": results}, indent=2))
+    else:
+        print_table(results, total_seconds)
+        print(f"📄 Logs: {get_log_dir(args.action)}")
+    return 0 if all(r["status"] == "ok" for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
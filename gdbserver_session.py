@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - gdbserver Mode
+
+Runs only gdbserver on the Pi and the full debugger (gdb-multiarch) on the
+dev machine, so symbol loading, DWARF parsing and pretty-printing no longer
+use the Pi's CPU and RAM. gdbserver listens on localhost of the Pi and is
+reached through the SSH tunnel (scripts/tunnel.sh or a forward added to the
+SSH master session).
+
+Usage:
+    python3 gdbserver_session.py fetch <program>     # Update the symbol cache for local gdb
+    python3 gdbserver_session.py start <program>     # Start gdbserver (used as preLaunchTask)
+    python3 gdbserver_session.py stop                # Stop gdbserver on the Pi
+    python3 gdbserver_session.py compare <program>   # Attach/step latency: pipeTransport vs. gdbserver
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, detect_project_binaries, get_ros_environment, get_ssh_args
+import ssh_session
+import symbol_cache
+import tunnel_supervisor
+
+# Printed by gdbserver when ready - also the endsPattern of the VS Code background task
+READY_PATTERN = "Listening on port"
+
+# PID file on the Pi (the launching shell execs into gdbserver, so $$ is the gdbserver PID)
+REMOTE_PID_FILE = "/tmp/openmower-gdbserver.pid"
+
+# ============================================================================
+# PATHS
+# ============================================================================
+
+def get_gdbserver_port():
+    """Determines the gdbserver port (forwarded by the tunnel)."""
+    return int(REMOTE_CONFIG.get("gdbserver_port", 1234))
+
+def get_program(name):
+    """Looks up a debug program by name."""
+    for program in detect_project_binaries():
+        if program["name"] == name:
+            return program
+    raise SystemExit(f"❌ Unknown debug program: {name}")
+
+def get_remote_binary(program):
+    """Remote path of a debug program binary."""
+    return f"{REMOTE_CONFIG['workspace']}/devel/lib/{program['path']}"
+
+def get_local_binary(program):
+    """Local copy of a remote binary inside the symbol cache sysroot."""
+    return symbol_cache.get_local_path(get_remote_binary(program))
+
+# ============================================================================
+# BINARY MIRROR
+# ============================================================================
+
+def fetch_binary(program):
+    """Updates the symbol cache (binary and shared libraries) for a program. Returns the local path."""
+    try:
+        symbol_cache.sync([program["name"]])
+    except RuntimeError as e:
+        raise SystemExit(f"❌ {e}")
+    local_path = get_local_binary(program)
+    if not os.path.exists(local_path):
+        raise SystemExit(f"❌ Binary not found on the Pi: {get_remote_binary(program)} (run the remote build first)")
+    return local_path
+
+# ============================================================================
+# GDBSERVER
+# ============================================================================
+
+def is_port_forwarded(port):
+    """Checks whether the local end of the tunnel is listening (connecting would consume the --once session)."""
+    return tunnel_supervisor.is_local_listening(port)
+
+def get_gdbserver_command(program):
+    """Remote command starting gdbserver with the ROS environment."""
+    port = get_gdbserver_port()
+    exports = " && ".join(f"export {k}={shlex.quote(v)}" for k, v in get_ros_environment().items())
+    return (
+        f"{get_kill_command()}; echo $$ > {REMOTE_PID_FILE} && "
+        f"cd {shlex.quote(REMOTE_CONFIG['workspace'])} && source devel/setup.bash && {exports} && "
+        f"exec gdbserver --once localhost:{port} {shlex.quote(get_remote_binary(program))}"
+    )
+
+def get_kill_command():
+    """Remote command stopping a previously started gdbserver."""
+    return f"[ -f {REMOTE_PID_FILE} ] && kill $(cat {REMOTE_PID_FILE}) 2>/dev/null; rm -f {REMOTE_PID_FILE}"
+
+def popen_gdbserver(program):
+    """Starts gdbserver on the Pi (adding the port forward if no tunnel is up)."""
+    port = get_gdbserver_port()
+    ssh_session.ensure_master(quiet=True)
+    ssh_args = get_ssh_args()
+    if not is_port_forwarded(port):
+        ssh_args = ssh_args[:-1] + ["-L", f"{port}:localhost:{port}"] + ssh_args[-1:]
+    return subprocess.Popen(
+        ["ssh"] + ssh_args + [f"bash -c {shlex.quote(get_gdbserver_command(program))}"],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1
+    )
+
+def start_gdbserver(program):
+    """Fetches the binary, starts gdbserver and streams its output (blocking until the session ends)."""
+    fetch_binary(program)
+    print(f"🐛 Starting gdbserver for {program['name']} on port {get_gdbserver_port()}...")
+    process = popen_gdbserver(program)
+    for line in process.stdout:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+    return process.wait()
+
+def stop_gdbserver():
+    """Stops gdbserver on the Pi."""
+    ssh_session.run_remote(get_kill_command())
+
+# ============================================================================
+# LATENCY COMPARISON
+# ============================================================================
+
+def get_gdb_commands(start_commands, steps):
+    """gdb batch commands: stop at main and step; markers report the progress."""
+    commands = ["echo @@LOADED\\n", "break main"] + start_commands + ["echo @@ATTACHED\\n"]
+    for _ in range(steps):
+        commands += ["next", "echo @@STEP\\n"]
+    return [arg for command in commands + ["kill"] for arg in ("-ex", command)]
+
+def measure_markers(argv, start):
+    """Runs a gdb session and records the arrival time of each marker (seconds since start)."""
+    process = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True, bufsize=1)
+    marks = {"steps": []}
+    for line in process.stdout:
+        now = time.monotonic() - start
+        if line.startswith("@@LOADED"):
+            marks["loaded"] = now
+        elif line.startswith("@@ATTACHED"):
+            marks["attached"] = now
+        elif line.startswith("@@STEP"):
+            marks["steps"].append(now)
+    process.wait()
+    return marks
+
+def summarize_marks(marks):
+    """Converts marker times into latencies (ms)."""
+    summary = {
+        "symbols_ms": round(marks.get("loaded", 0) * 1000),
+        "attach_ms": round(marks.get("attached", 0) * 1000),
+    }
+    steps = marks["steps"]
+    if steps and "attached" in marks:
+        deltas = [b - a for a, b in zip([marks["attached"]] + steps[:-1], steps)]
+        summary["step_ms"] = round(sum(deltas) / len(deltas) * 1000)
+    return summary
+
+def compare_modes(program, steps=5):
+    """Measures symbol load, attach and step latency of both debug modes."""
+    remote_binary = get_remote_binary(program)
+    results = {}
+
+    # 1. gdb on the Pi via SSH (pipeTransport mode)
+    ros_env = " ".join(f"{k}={shlex.quote(v)}" for k, v in get_ros_environment().items())
+    remote_gdb = " ".join(["env", ros_env, "gdb", "-q", "-nx", "-batch", "-ex", shlex.quote(f"file {remote_binary}")] +
+                          [shlex.quote(arg) for arg in get_gdb_commands(["run"], steps)])
+    ssh_session.ensure_master(quiet=True)
+    start = time.monotonic()
+    results["pipeTransport"] = summarize_marks(measure_markers(["ssh"] + get_ssh_args() + [remote_gdb], start))
+
+    # 2. gdbserver on the Pi, gdb-multiarch locally
+    local_binary = fetch_binary(program)
+    port = get_gdbserver_port()
+    start = time.monotonic()
+    server = popen_gdbserver(program)
+    for line in server.stdout:
+        if READY_PATTERN in line:
+            break
+    local_gdb = REMOTE_CONFIG.get("local_gdb", "/usr/bin/gdb-multiarch")
+    setup = [arg for command in symbol_cache.get_gdb_setup_commands() for arg in ("-ex", command)]
+    argv = [local_gdb, "-q", "-nx", "-batch"] + setup + ["-ex", f"file {local_binary}"] + get_gdb_commands(
+        [f"target remote localhost:{port}", "continue"], steps)
+    results["gdbserver"] = summarize_marks(measure_markers(argv, start))
+    server.terminate()
+    return results
+
+def print_comparison(results):
+    """Prints the latency comparison table."""
+    print(f"{'':18s} {'pipeTransport':>15s} {'gdbserver':>15s}")
+    for key, label in (("symbols_ms", "symbols loaded"), ("attach_ms", "stopped at main"), ("step_ms", "per step")):
+        values = [results[mode].get(key) for mode in ("pipeTransport", "gdbserver")]
+        print(f"{label:18s} " + " ".join(f"{v:>12} ms" if v is not None else f"{'-':>15s}" for v in values))
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower gdbserver debug mode")
+    sub = parser.add_subparsers(dest="action", required=True)
+    for action in ("fetch", "start"):
+        sub.add_parser(action).add_argument("program")
+    sub.add_parser("stop")
+    compare_parser = sub.add_parser("compare")
+    compare_parser.add_argument("program")
+    compare_parser.add_argument("--steps", type=int, default=5)
+    compare_parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.action == "fetch":
+        print(f"✅ {fetch_binary(get_program(args.program))}")
+        return 0
+    if args.action == "start":
+        return start_gdbserver(get_program(args.program))
+    if args.action == "stop":
+        stop_gdbserver()
+        return 0
+    if args.action == "compare":
+        results = compare_modes(get_program(args.program), args.steps)
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            print_comparison(results)
+        return 0
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
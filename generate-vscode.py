@@ -3,40 +3,44 @@
 VS Code Konfigurationsgenerator für OpenMower Remote Debug
 
 Generiert launch.json und tasks.json basierend auf der zentralen Konfiguration.
+
+Ein persistenter Scan-Index (Verzeichnis-mtimes + Konfigurations-Fingerprint)
+vermeidet unnötige Scans und Schreibvorgänge, wenn sich nichts geändert hat.
+
+Aufruf:
+    python3 generate-vscode.py            # Generieren (nur bei Änderungen)
+    python3 generate-vscode.py --force    # Immer neu generieren
+    python3 generate-vscode.py --check    # Nur prüfen: Exit 0 = aktuell, 1 = veraltet
 """
 
+import argparse
+import filecmp
+import hashlib
 import json
 import os
 import sys
 
 # Config importieren
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from config import REMOTE_CONFIG, get_project_root, get_vscode_dir, get_ros_environment, get_ssh_command, get_ssh_full_command, get_rsync_command, detect_project_binaries, get_debug_scripts_dir
+from config import REMOTE_CONFIG, EXCLUDED_PACKAGES, get_cache_dir, get_project_root, get_vscode_dir, get_ros_environment, get_ssh_command, get_ssh_full_command, detect_project_binaries, get_debug_scripts_dir, get_ssh_args, get_tools_dir, export_shell_env, get_env_file, load_fleet, get_target_config
+from symbol_cache import get_gdb_setup_commands, get_sysroot
 
-def get_ssh_pipe_args():
-    """Erstellt SSH pipe args für VS Code Remote Debug."""
-    if "ssh_host" in REMOTE_CONFIG and REMOTE_CONFIG["ssh_host"]:
-        # Verwende SSH Host aus ~/.ssh/config
-        return [REMOTE_CONFIG["ssh_host"]]
-    else:
-        # Direkte SSH-Verbindung mit Key
-        ssh_key = REMOTE_CONFIG.get("ssh_key", "~/.ssh/id_rsa_openmower")
-        return [
-            "-i", ssh_key,
-            "-o", "StrictHostKeyChecking=no",
-            f"{REMOTE_CONFIG['user']}@{REMOTE_CONFIG['host']}"
-        ]
+def get_ssh_pipe_args(config=None):
+    """Erstellt SSH pipe args für VS Code Remote Debug (nutzt die gemeinsame Master-Session)."""
+    return get_ssh_args(config)
 
-def generate_remote_debug_config(name, program_path):
-    """Generiert eine Remote-Debug-Konfiguration."""
-    ros_env = get_ros_environment()
+def generate_remote_debug_config(name, program_path, config=None):
+    """Generiert eine Remote-Debug-Konfiguration (optional für ein Fleet-Ziel)."""
+    target = config or REMOTE_CONFIG
+    ros_env = get_ros_environment(target)
+    label = f"Remote Debug - {name}" + (f" @ {target['target_name']}" if config else "")
     
     return {
-        "name": f"Remote Debug - {name}",
+        "name": label,
         "type": "cppdbg",
         "request": "launch",
-        "program": f"{REMOTE_CONFIG['workspace']}/devel/lib/{program_path}",
-        "cwd": REMOTE_CONFIG['workspace'],
+        "program": f"{target['workspace']}/devel/lib/{program_path}",
+        "cwd": target['workspace'],
         "environment": [
             {"name": k, "value": v} for k, v in ros_env.items()
         ],
@@ -45,11 +49,11 @@ def generate_remote_debug_config(name, program_path):
         "pipeTransport": {
             "pipeCwd": "${workspaceFolder}",
             "pipeProgram": "ssh",
-            "pipeArgs": get_ssh_pipe_args(),
+            "pipeArgs": get_ssh_pipe_args(config),
             "debuggerPath": "/usr/bin/gdb"
         },
         "sourceFileMap": {
-            REMOTE_CONFIG['workspace']: "${workspaceFolder}"
+            target['workspace']: "${workspaceFolder}"
         },
         "setupCommands": [
             {
@@ -60,9 +64,95 @@ def generate_remote_debug_config(name, program_path):
         ]
     }
 
-def generate_launch_json():
+def generate_gdbserver_debug_config(name, program_path):
+    """Generiert eine gdbserver-Konfiguration (gdb lokal, nur gdbserver auf dem Pi)."""
+    remote_program = f"{REMOTE_CONFIG['workspace']}/devel/lib/{program_path}"
+    
+    return {
+        "name": f"Remote gdbserver - {name}",
+        "type": "cppdbg",
+        "request": "launch",
+        # Lokale Kopie des Pi-Binaries im Symbol-Cache (wird vom preLaunchTask aktualisiert)
+        "program": get_sysroot() + remote_program,
+        "cwd": "${workspaceFolder}",
+        "MIMode": "gdb",
+        "miDebuggerPath": REMOTE_CONFIG.get("local_gdb", "/usr/bin/gdb-multiarch"),
+        "miDebuggerServerAddress": f"localhost:{REMOTE_CONFIG.get('gdbserver_port', 1234)}",
+        "sourceFileMap": {
+            REMOTE_CONFIG['workspace']: "${workspaceFolder}"
+        },
+        "setupCommands": [
+            {
+                "description": "Enable pretty-printing for gdb",
+                "text": "-enable-pretty-printing",
+                "ignoreFailures": True
+            }
+        ] + [
+            # Shared Libraries und Debug-Symbole aus dem Build-ID-Cache laden
+            {"description": "Symbol cache", "text": command, "ignoreFailures": False}
+            for command in get_gdb_setup_commands()
+        ],
+        "preLaunchTask": f"Start gdbserver - {name}",
+        "postDebugTask": "Stop gdbserver on Pi"
+    }
+
+def generate_gdbserver_tasks(programs):
+    """Generiert die preLaunchTasks für den gdbserver-Modus."""
+    tools_dir = get_tools_dir()
+    tasks = [
+        {
+            "label": f"Start gdbserver - {prog['name']}",
+            "type": "shell",
+            "command": f"python3 {tools_dir}/gdbserver_session.py start {prog['name']}",
+            "group": "test",
+            "isBackground": True,
+            "problemMatcher": {
+                "owner": "gdbserver",
+                "pattern": {"regexp": "^(gdbserver): (error.*)$", "file": 1, "message": 2},
+                "background": {
+                    "activatesImmediately": True,
+                    "beginsPattern": "Starting gdbserver",
+                    "endsPattern": "Listening on port"
+                }
+            }
+        }
+        for prog in programs
+    ]
+    tasks.append({
+        "label": "Stop gdbserver on Pi",
+        "type": "shell",
+        "command": f"python3 {tools_dir}/gdbserver_session.py stop",
+        "group": "test"
+    })
+    return tasks
+
+def generate_profile_tasks(programs):
+    """Generiert die Profiling-Tasks (perf auf dem Pi, Auswertung lokal) pro Programm."""
+    tools_dir = get_tools_dir()
+    tasks = [
+        {
+            "label": f"Profile {prog['name']} on Pi",
+            "type": "shell",
+            "command": f"python3 {tools_dir}/profiler.py record {prog['name']}",
+            "group": "test"
+        }
+        for prog in programs
+    ]
+    tasks += [
+        {
+            "label": f"Profile Diff - {prog['name']} (last two captures)",
+            "type": "shell",
+            "command": f"python3 {tools_dir}/profiler.py diff {prog['name']}",
+            "group": "test"
+        }
+        for prog in programs
+    ]
+    return tasks
+
+def generate_launch_json(programs=None):
     """Generiert die komplette launch.json."""
-    programs = detect_project_binaries()
+    if programs is None:
+        programs = detect_project_binaries()
     
     # Remote Debug Konfigurationen
     remote_configs = [
@@ -70,6 +160,19 @@ def generate_launch_json():
         for prog in programs
     ]
     
+    # Remote Debug Konfigurationen je Fleet-Ziel (LOCAL_FLEET in config_local.py)
+    fleet_configs = [
+        generate_remote_debug_config(prog["name"], prog["path"], get_target_config(target))
+        for target in load_fleet()
+        for prog in programs
+    ]
+    
+    # gdbserver Konfigurationen (gdb lokal)
+    gdbserver_configs = [
+        generate_gdbserver_debug_config(prog["name"], prog["path"])
+        for prog in programs
+    ]
+    
     # Lokale Debug Konfiguration
     local_config = {
         "name": "Local Debug - Build and Debug",
@@ -115,21 +218,19 @@ def generate_launch_json():
     
     return {
         "version": "0.2.0",
-        "configurations": remote_configs + [local_config, remote_env_config]
+        "configurations": remote_configs + fleet_configs + gdbserver_configs + [local_config, remote_env_config]
     }
 
-def generate_tasks_json():
+def generate_tasks_json(programs=None):
     """Generiert die komplette tasks.json."""
+    if programs is None:
+        programs = detect_project_binaries()
     ssh_full_cmd = get_ssh_full_command()
-    rsync_cmd = get_rsync_command()
-    
-    # Determine the correct rsync target
-    if "ssh_host" in REMOTE_CONFIG and REMOTE_CONFIG["ssh_host"]:
-        # When using SSH host, rsync should use the host name
-        rsync_target = f"{REMOTE_CONFIG['ssh_host']}:{REMOTE_CONFIG['workspace']}/"
-    else:
-        # Direct connection
-        rsync_target = f"{REMOTE_CONFIG['user']}@{REMOTE_CONFIG['host']}:{REMOTE_CONFIG['workspace']}/"
+    tools_dir = get_tools_dir()
+    sync_cmd = f"python3 {tools_dir}/delta_sync.py"
+    # Lokaler ccache (falls installiert) - der Cache liegt außerhalb von build/ und übersteht "Clean Build"
+    local_catkin = ("source /opt/ros/noetic/setup.bash && catkin_make $(command -v ccache >/dev/null && "
+                    "echo -DCMAKE_C_COMPILER_LAUNCHER=ccache -DCMAKE_CXX_COMPILER_LAUNCHER=ccache)")
     
     return {
         "version": "2.0.0",
@@ -137,52 +238,102 @@ def generate_tasks_json():
             {
                 "label": "Build OpenMower Workspace",
                 "type": "shell",
-                "command": "source /opt/ros/noetic/setup.bash && catkin_make",
+                "command": local_catkin,
                 "group": {"kind": "build", "isDefault": True},
                 "options": {"cwd": "${workspaceFolder}"}
             },
             {
                 "label": "Clean Build",
                 "type": "shell",
-                "command": "rm -rf build devel && source /opt/ros/noetic/setup.bash && catkin_make",
+                "command": f"rm -rf build devel && {local_catkin}",
                 "group": "build",
                 "options": {"cwd": "${workspaceFolder}"}
             },
             {
                 "label": "Sync Source to Pi",
                 "type": "shell",
-                "command": f"{rsync_cmd} ${{workspaceFolder}}/ {rsync_target}",
+                "command": sync_cmd,
+                "group": "build",
+                "options": {"cwd": "${workspaceFolder}"}
+            },
+            {
+                "label": "Full Sync Source to Pi (rsync)",
+                "type": "shell",
+                "command": f"{sync_cmd} --rsync",
                 "group": "build",
                 "options": {"cwd": "${workspaceFolder}"}
             },
             {
                 "label": "Sync + Setup Submodules on Pi",
                 "type": "shell",
-                "command": f"{rsync_cmd} ${{workspaceFolder}}/ {rsync_target} && {ssh_full_cmd} 'cd {REMOTE_CONFIG['workspace']} && git submodule update --init --recursive'",
+                "command": f"{sync_cmd} && {ssh_full_cmd} 'cd {REMOTE_CONFIG['workspace']} && git submodule update --init --recursive'",
                 "group": "build",
                 "options": {"cwd": "${workspaceFolder}"}
             },
             {
                 "label": "Remote Build on Pi",
                 "type": "shell",
-                "command": f"{ssh_full_cmd} 'cd {REMOTE_CONFIG['workspace']} && source /opt/ros/noetic/setup.bash && catkin_make'",
+                "command": f"python3 {tools_dir}/build_planner.py --all",
                 "group": "build",
                 "dependsOn": "Sync + Setup Submodules on Pi"
             },
             {
                 "label": "Quick Remote Build on Pi",
                 "type": "shell",
-                "command": f"{ssh_full_cmd} 'cd {REMOTE_CONFIG['workspace']} && source /opt/ros/noetic/setup.bash && catkin_make'",
+                "command": f"python3 {tools_dir}/build_planner.py --all",
+                "group": "build",
+                "dependsOn": "Sync Source to Pi"
+            },
+            {
+                "label": "Clean Remote Build on Pi",
+                "type": "shell",
+                "command": f"{ssh_full_cmd} 'cd {REMOTE_CONFIG['workspace']} && rm -rf build devel' && python3 {tools_dir}/build_planner.py --all",
+                "group": "build",
+                "dependsOn": "Sync Source to Pi"
+            },
+            {
+                "label": "Compiler Cache Stats (Pi)",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/compiler_cache.py stats",
+                "group": "build"
+            },
+            {
+                "label": "Incremental Remote Build on Pi",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/build_planner.py",
                 "group": "build",
                 "dependsOn": "Sync Source to Pi"
             },
+            {
+                "label": "Watch Mode: Sync + Rebuild on Save",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/watch_mode.py",
+                "group": "build"
+            },
             {
                 "label": "Deploy to Raspberry Pi",
                 "type": "shell",
                 "command": f"{get_debug_scripts_dir()}/deploy.sh",
                 "group": "build",
-                "options": {"cwd": "${workspaceFolder}"},
-                "dependsOn": "Build OpenMower Workspace"
+                "options": {"cwd": "${workspaceFolder}"}
+            },
+            {
+                "label": "Deploy Prebuilt Artifacts to Pi",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/artifact_deploy.py",
+                "group": "build"
+            },
+            {
+                "label": "Rollback Artifact Deploy",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/artifact_deploy.py rollback",
+                "group": "build"
+            },
+            {
+                "label": "Deploy Summary",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/deploy.py summary",
+                "group": "test"
             },
             {
                 "label": "Start ROS Master on Pi",
@@ -194,14 +345,21 @@ def generate_tasks_json():
             {
                 "label": "Launch OpenMower on Pi",
                 "type": "shell",
-                "command": f"{ssh_full_cmd} 'cd {REMOTE_CONFIG['workspace']} && source devel/setup.bash && source ~/mower_config.sh && export ROS_MASTER_URI=http://{REMOTE_CONFIG['host']}:11311 && export ROS_IP={REMOTE_CONFIG['host']} && roslaunch open_mower open_mower.launch'",
+                "command": f"{ssh_full_cmd} 'ulimit -c unlimited 2>/dev/null; cd {REMOTE_CONFIG['workspace']} && source devel/setup.bash && source ~/mower_config.sh && export ROS_MASTER_URI=http://{REMOTE_CONFIG['host']}:11311 && export ROS_IP={REMOTE_CONFIG['host']} && roslaunch open_mower open_mower.launch'",
                 "group": "test",
                 "isBackground": True
             },
             {
                 "label": "Monitor ROS Topics",
                 "type": "shell",
-                "command": f"export ROS_MASTER_URI=http://{REMOTE_CONFIG['host']}:11311 && export ROS_IP={REMOTE_CONFIG['ros_dev_ip']} && rostopic list",
+                "command": f"python3 {tools_dir}/topic_sampler.py",
+                # Vordergrund-Task: der Sampler meldet kein "bereit", ein Background-Task würde nie fertig
+                "group": "test"
+            },
+            {
+                "label": "Web UI Telemetry Bridge",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/telemetry_bridge.py",
                 "group": "test"
             },
             {
@@ -217,6 +375,66 @@ def generate_tasks_json():
                 "group": "test",
                 "options": {"cwd": "${workspaceFolder}"}
             },
+            {
+                "label": "SSH Tunnel Status",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/tunnel_supervisor.py status",
+                "group": "test"
+            },
+            {
+                "label": "Stream ROS Log from Pi",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/log_stream.py --resume",
+                "group": "test"
+            },
+            {
+                "label": "Stream ROS Warnings/Errors from Pi",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/log_stream.py --level WARN",
+                "group": "test"
+            },
+            {
+                "label": "Start Rosbag Recording on Pi",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/bag_capture.py start",
+                "group": "test"
+            },
+            {
+                "label": "Stop Rosbag Recording on Pi",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/bag_capture.py stop",
+                "group": "test"
+            },
+            {
+                "label": "Pull Rosbags from Pi",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/bag_capture.py pull --all",
+                "group": "test"
+            },
+            {
+                "label": "Setup Core Capture on Pi",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/core_triage.py setup",
+                "group": "test"
+            },
+            {
+                "label": "Collect and Triage Core Dumps",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/core_triage.py collect",
+                "group": "test"
+            },
+            {
+                "label": "Start Resource Agent on Pi",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/resource_agent.py start",
+                "group": "test"
+            },
+            {
+                "label": "Resource Profile Summary",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/resource_agent.py pull",
+                "group": "test"
+            },
             {
                 "label": "Cleanup Remote Debug",
                 "type": "shell",
@@ -224,6 +442,24 @@ def generate_tasks_json():
                 "group": "test",
                 "options": {"cwd": "${workspaceFolder}"}
             },
+            {
+                "label": "Open SSH Master Session",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/ssh_session.py start",
+                "group": "test"
+            },
+            {
+                "label": "SSH Session Latency",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/ssh_session.py latency && python3 {tools_dir}/ssh_session.py bench",
+                "group": "test"
+            },
+            {
+                "label": "Sync Symbol Cache",
+                "type": "shell",
+                "command": f"python3 {tools_dir}/symbol_cache.py sync",
+                "group": "test"
+            },
             {
                 "label": "Test Remote Connection",
                 "type": "shell",
@@ -231,9 +467,114 @@ def generate_tasks_json():
                 "group": "test",
                 "options": {"cwd": "${workspaceFolder}"}
             }
-        ]
+        ] + generate_gdbserver_tasks(programs) + generate_profile_tasks(programs) + generate_fleet_tasks()
     }
 
+def generate_fleet_tasks():
+    """Generiert die Fleet-Tasks (nur wenn ein Fleet-Inventar existiert)."""
+    if not load_fleet():
+        return []
+    tools_dir = get_tools_dir()
+    return [
+        {
+            "label": f"Fleet: {label}",
+            "type": "shell",
+            "command": f"python3 {tools_dir}/fleet.py {action}",
+            "group": group
+        }
+        for label, action, group in (
+            ("Test Connections", "test", "test"),
+            ("Sync Source", "sync", "build"),
+            ("Incremental Build", "build", "build"),
+            ("Deploy", "deploy", "build"),
+        )
+    ]
+
+# ============================================================================
+# SCAN-INDEX UND ÄNDERUNGSERKENNUNG
+# ============================================================================
+
+def get_scan_index_path():
+    """Ermittelt die Datei des Scan-Index für dieses Projekt."""
+    project_hash = hashlib.sha1(get_project_root().encode()).hexdigest()[:12]
+    return os.path.join(get_cache_dir(), f"scan_index_{project_hash}.json")
+
+def load_scan_index():
+    """Lädt den Scan-Index (leer, falls nicht vorhanden oder defekt)."""
+    try:
+        with open(get_scan_index_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_scan_index(index):
+    """Speichert den Scan-Index."""
+    with open(get_scan_index_path(), 'w') as f:
+        json.dump(index, f)
+
+def get_config_fingerprint():
+    """Fingerprint aus Konfiguration und Generator-Code (ändert sich mit jeder Eingabe außer src/)."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([REMOTE_CONFIG, EXCLUDED_PACKAGES, load_fleet()], sort_keys=True).encode())
+    # Alle lokalen Module, die der Generator importiert (symbol_cache: Sysroot-Pfade in launch.json)
+    for source in ("config.py", "symbol_cache.py", "ssh_session.py", "generate-vscode.py"):
+        with open(os.path.join(get_tools_dir(), source), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def get_src_mtimes():
+    """mtimes von src/ und allen Paket-Verzeichnissen der obersten Ebene."""
+    src_dir = os.path.join(get_project_root(), "src")
+    try:
+        mtimes = {".": os.stat(src_dir).st_mtime_ns}
+        with os.scandir(src_dir) as entries:
+            for entry in entries:
+                if entry.is_dir() and not entry.name.startswith('.'):
+                    mtimes[entry.name] = entry.stat().st_mtime_ns
+    except OSError:
+        return {}
+    return mtimes
+
+def get_script_source_dir():
+    """Ermittelt das Quell-Verzeichnis der Debug-Skripte."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts")
+
+def get_output_files():
+    """Alle generierten bzw. kopierten Dateien (ohne Verzeichnisse anzulegen)."""
+    debug_dir = os.path.join(get_project_root(), "devel", "debug")
+    outputs = [os.path.join(get_vscode_dir(), "launch.json"), os.path.join(get_vscode_dir(), "tasks.json")]
+    if os.path.exists(get_script_source_dir()):
+        outputs += [os.path.join(debug_dir, f) for f in sorted(os.listdir(get_script_source_dir())) if f.endswith('.sh')]
+    return outputs
+
+def get_input_stamp():
+    """Stempel über alle Eingaben und den Zustand der Ausgaben."""
+    stamp = {"config": get_config_fingerprint(), "src": get_src_mtimes(), "files": {}}
+    script_sources = []
+    if os.path.exists(get_script_source_dir()):
+        script_sources = [os.path.join(get_script_source_dir(), f) for f in sorted(os.listdir(get_script_source_dir()))]
+    for path in script_sources + get_output_files():
+        try:
+            st = os.stat(path)
+            stamp["files"][path] = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            stamp["files"][path] = None
+    return stamp
+
+def detect_programs_cached(index):
+    """detect_project_binaries() mit Scan-Index: neuer Scan nur bei geänderten Verzeichnis-mtimes."""
+    scan_key = {"config": get_config_fingerprint(), "src": get_src_mtimes()}
+    if index.get("scan_key") == scan_key and "programs" in index:
+        return index["programs"]
+    programs = detect_project_binaries()
+    index["scan_key"] = scan_key
+    index["programs"] = programs
+    return programs
+
+# ============================================================================
+# AUSGABE
+# ============================================================================
+
 def copy_debug_scripts():
     """Kopiert Debug-Skripte in den devel/debug Ordner."""
     import shutil
@@ -246,24 +587,34 @@ def copy_debug_scripts():
         print(f"⚠️  Script-Verzeichnis nicht gefunden: {script_source_dir}")
         return False
     
-    # Skripte kopieren
+    # Skripte kopieren (nur bei geändertem Inhalt)
     scripts_copied = 0
+    scripts_unchanged = 0
     for script_file in os.listdir(script_source_dir):
         if script_file.endswith('.sh'):
             src = os.path.join(script_source_dir, script_file)
             dst = os.path.join(debug_dir, script_file)
+            if os.path.exists(dst) and filecmp.cmp(src, dst, shallow=False):
+                scripts_unchanged += 1
+                continue
             shutil.copy2(src, dst)
             os.chmod(dst, 0o755)  # Ausführbar machen
             scripts_copied += 1
     
-    print(f"📁 {scripts_copied} Debug-Skripte nach {debug_dir} kopiert")
+    print(f"📁 {scripts_copied} Debug-Skripte nach {debug_dir} kopiert ({scripts_unchanged} unverändert)")
     return True
 
 def write_json_file(filepath, data, description):
-    """Schreibt JSON-Daten in eine Datei."""
+    """Schreibt JSON-Daten in eine Datei (nur wenn sich der Inhalt ändert)."""
     try:
+        content = json.dumps(data, indent=4)
+        if os.path.exists(filepath):
+            with open(filepath) as f:
+                if f.read() == content:
+                    print(f"✅ {description}: unverändert")
+                    return True
         with open(filepath, 'w') as f:
-            json.dump(data, f, indent=4)
+            f.write(content)
         print(f"✅ {description}: {filepath}")
         return True
     except Exception as e:
@@ -272,6 +623,23 @@ def write_json_file(filepath, data, description):
 
 def main():
     """Hauptfunktion."""
+    parser = argparse.ArgumentParser(description="VS Code Konfigurationsgenerator für OpenMower Remote Debug")
+    parser.add_argument("--check", action="store_true", help="Nur prüfen, ob die Konfiguration aktuell ist (Exit 0/1)")
+    parser.add_argument("--force", action="store_true", help="Immer neu generieren")
+    args = parser.parse_args()
+    
+    index = load_scan_index()
+    if args.check:
+        if index.get("stamp") == get_input_stamp():
+            print("✅ VS Code Konfigurationen sind aktuell")
+            sys.exit(0)
+        print("⚠️  VS Code Konfigurationen sind veraltet - ./generate-vscode.sh ausführen")
+        sys.exit(1)
+    
+    if not args.force and index.get("stamp") == get_input_stamp():
+        print("✅ VS Code Konfigurationen sind aktuell - nichts zu tun")
+        return
+    
     print("🔧 Generiere VS Code Konfigurationen...")
     
     vscode_dir = get_vscode_dir()
@@ -280,9 +648,13 @@ def main():
     # Debug-Skripte in devel/ kopieren
     copy_debug_scripts()
     
+    # Konfiguration für die Shell-Skripte vorab exportieren (spart den Python-Start pro Skript)
+    export_shell_env(get_env_file())
+    
     # Konfigurationen generieren
-    launch_config = generate_launch_json()
-    tasks_config = generate_tasks_json()
+    programs = detect_programs_cached(index)
+    launch_config = generate_launch_json(programs)
+    tasks_config = generate_tasks_json(programs)
     
     # Dateien schreiben
     success = True
@@ -304,10 +676,13 @@ def main():
         print(f"  User: {REMOTE_CONFIG['user']}")
         print(f"  Workspace: {REMOTE_CONFIG['workspace']}")
         
-        programs = detect_project_binaries()
         print(f"\nVerfügbare Debug-Programme ({len(programs)}):")
         for prog in programs:
             print(f"  - {prog['name']}")
+        
+        # Stempel erst nach erfolgreichem Schreiben speichern
+        index["stamp"] = get_input_stamp()
+        save_scan_index(index)
             
     else:
         print("\n❌ Fehler beim Generieren der Konfigurationen!")
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - ROS Log Stream
+
+Tails the ROS log on the Pi and sends only what passes the filters:
+- node, minimum severity, regex and a lines-per-second rate limit are
+  applied on the Pi, before anything crosses the link
+- matching lines are batched and sent as one zlib stream (shared dictionary)
+- every batch carries the byte offset of the log file, so a reconnect resumes
+  exactly where the stream stopped (also across log rotation)
+- the received lines are kept in a bounded local scrollback file
+- lines and bytes sent / filtered / dropped per second are reported
+
+Usage:
+    python3 log_stream.py                                 # Everything from now on
+    python3 log_stream.py --level WARN                    # Warnings and errors only
+    python3 log_stream.py --nodes mower_logic --grep "state|GPS"
+    python3 log_stream.py --rate-limit 50                 # At most 50 lines/s
+    python3 log_stream.py --resume                        # Continue after the last received line
+    python3 log_stream.py scrollback -n 200 --grep ERROR  # Search the local scrollback
+"""
+
+import argparse
+import collections
+import inspect
+import json
+import os
+import re
+import struct
+import subprocess
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, get_cache_dir, get_target_id, get_ssh_args
+import ssh_session
+
+LEVELS = {"DEBUG": 0, "INFO": 1, "WARN": 2, "ERROR": 3, "FATAL": 4}
+LEVEL_COLORS = {"WARN": "\033[33m", "ERROR": "\033[31m", "FATAL": "\033[1;31m", "DEBUG": "\033[2m"}
+
+DEFAULT_BATCH_INTERVAL = 0.5
+DEFAULT_SCROLLBACK = 5000
+STATS_INTERVAL = 5.0
+RECONNECT_DELAYS = [1, 2, 5, 10]
+
+# ============================================================================
+# STREAMER (runs on the Pi - keep free of module dependencies)
+# ============================================================================
+
+def stream_log(path, offset, inode, nodes, min_level, pattern, rate, interval, duration):
+    """Follows the log file and writes length-prefixed zlib frames of filtered batches to stdout."""
+    import json
+    import os
+    import re
+    import struct
+    import sys
+    import zlib
+    path = os.path.expanduser(path)
+    regex = re.compile(pattern) if pattern else None
+    nodes = {node.strip("/") for node in nodes}
+    out = sys.stdout.buffer
+    compressor = zlib.compressobj(6)
+    counters = {"n": 0, "f": 0, "d": 0, "b": 0}
+    batch = []
+    state = {"keep": False, "tokens": float(rate or 0), "refill": time.monotonic()}
+
+    def keep_line(line):
+        parts = line.split(" ", 3)
+        # rosout.log record: "<stamp> <LEVEL> <node> [file:line(func)] [topics: ...] message"
+        if len(parts) >= 3 and parts[1] in LEVELS:
+            keep = LEVELS[parts[1]] >= min_level and (not nodes or parts[2].strip("/") in nodes)
+            keep = keep and (not regex or regex.search(line) is not None)
+            if keep and rate:
+                now = time.monotonic()
+                state["tokens"] = min(float(rate), state["tokens"] + (now - state["refill"]) * rate)
+                state["refill"] = now
+                if state["tokens"] < 1:
+                    counters["d"] += 1
+                    state["keep"] = False
+                    return False
+                state["tokens"] -= 1
+            elif not keep:
+                counters["f"] += 1
+            state["keep"] = keep
+            return keep
+        # Continuation of a multi-line message: same decision as its record
+        return state["keep"]
+
+    def open_current():
+        try:
+            handle = open(os.path.realpath(path), "rb")
+        except OSError:
+            return None, None
+        return handle, os.fstat(handle.fileno()).st_ino
+
+    def emit(position, current_inode):
+        payload = json.dumps({"o": position, "i": current_inode, "l": batch, **counters}).encode()
+        chunk = compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        out.write(struct.pack(">I", len(chunk)) + chunk)
+        out.flush()
+        del batch[:]
+        for key in counters:
+            counters[key] = 0
+
+    handle, current_inode = open_current()
+    queue = []
+    if handle and inode and inode != current_inode:
+        # Rotated since the last connection: finish the old file first
+        rotated = path + ".1"
+        if os.path.exists(rotated) and os.stat(rotated).st_ino == inode:
+            queue.append((open(rotated, "rb"), inode, offset))
+            offset = 0
+        else:
+            offset = 0
+    if handle:
+        size = os.fstat(handle.fileno()).st_size
+        handle.seek(size if offset < 0 or offset > size else offset)
+    if queue:
+        queue.append((handle, current_inode, 0))
+        handle, current_inode, start = queue.pop(0)
+        handle.seek(start)
+
+    pending = b""
+    started = time.monotonic()
+    next_emit = started + interval
+    last_emit = started
+    try:
+        while not duration or time.monotonic() - started < duration:
+            data = handle.read(262144) if handle else b""
+            if data:
+                pending += data
+                counters["b"] += len(data)
+                lines = pending.split(b"\n")
+                pending = lines.pop()
+                for raw in lines:
+                    counters["n"] += 1
+                    line = raw.decode("utf-8", "replace")
+                    if keep_line(line):
+                        batch.append(line)
+            else:
+                if queue:
+                    handle.close()
+                    handle, current_inode, start = queue.pop(0)
+                    handle.seek(start)
+                    pending = b""
+                    continue
+                # New roslaunch (latest symlink), rotation or truncation: reopen from the start
+                new_handle, new_inode = open_current()
+                if new_handle and (handle is None or new_inode != current_inode
+                                   or os.fstat(new_handle.fileno()).st_size < handle.tell()):
+                    if handle:
+                        handle.close()
+                    handle, current_inode, pending = new_handle, new_inode, b""
+                    continue
+                if new_handle:
+                    new_handle.close()
+                time.sleep(min(0.2, interval))
+            now = time.monotonic()
+            if now >= next_emit:
+                # Heartbeat every 5s even without lines, so a dead link is noticed
+                if batch or any(counters.values()) or now - last_emit >= 5:
+                    emit(handle.tell() - len(pending) if handle else 0, current_inode)
+                    last_emit = now
+                next_emit = now + interval
+        emit(handle.tell() - len(pending) if handle else 0, current_inode)
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+
+def get_stream_script(path, offset, inode, args):
+    """Python script (for 'python3 -') running the streamer with the given filters."""
+    min_level = LEVELS[args.level]
+    call = (f"stream_log({path!r}, {offset!r}, {inode!r}, {args.nodes!r}, {min_level!r}, {args.grep!r}, "
+            f"{args.rate_limit!r}, {args.batch_interval!r}, {args.duration!r})")
+    return f"import time\n\nLEVELS = {LEVELS!r}\n\n" + inspect.getsource(stream_log) + f"\n{call}\n"
+
+# ============================================================================
+# LOCAL SIDE
+# ============================================================================
+
+def get_state_path():
+    """Resume state (file, inode, offset) of the current target."""
+    return os.path.join(get_log_dir(), f"{get_target_id()}.json")
+
+def get_scrollback_path():
+    """Local scrollback file of the current target."""
+    return os.path.join(get_log_dir(), f"{get_target_id()}.log")
+
+def get_log_dir():
+    """Directory for stream state and scrollback."""
+    path = os.path.join(get_cache_dir(), "logs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def load_state():
+    """Last resume state ({} if none)."""
+    try:
+        with open(get_state_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state):
+    """Stores the resume state."""
+    with open(get_state_path(), "w") as f:
+        json.dump(state, f)
+
+class Scrollback:
+    """Bounded local ring buffer of received lines, mirrored to a file that survives sessions."""
+
+    def __init__(self, size):
+        self.size = size
+        self.path = get_scrollback_path()
+        self.ring = collections.deque(maxlen=size)
+        try:
+            with open(self.path, errors="replace") as f:
+                self.ring.extend(line.rstrip("\n") for line in f)
+        except OSError:
+            pass
+        self.file_lines = len(self.ring)
+
+    def extend(self, lines):
+        """Adds lines; the file is trimmed back to `size` lines once it grew by a quarter."""
+        self.ring.extend(lines)
+        with open(self.path, "a") as f:
+            f.writelines(line + "\n" for line in lines)
+        self.file_lines += len(lines)
+        if self.file_lines > self.size * 1.25:
+            with open(self.path + ".tmp", "w") as f:
+                f.writelines(line + "\n" for line in self.ring)
+            os.replace(self.path + ".tmp", self.path)
+            self.file_lines = len(self.ring)
+
+def format_line(line, color):
+    """Shortens a rosout record to 'time LEVEL node: message' (other lines unchanged)."""
+    parts = line.split(" ", 3)
+    if len(parts) < 4 or parts[1] not in LEVELS:
+        return line
+    stamp, level, node, rest = parts
+    # Drop "[file:line(func)] [topics: ...]"
+    message = re.sub(r"^\[[^\]]*\] \[topics: [^\]]*\] ", "", rest)
+    try:
+        clock = time.strftime("%H:%M:%S", time.localtime(float(stamp))) + f".{stamp.split('.')[1][:3]}"
+    except (ValueError, IndexError):
+        clock = stamp
+    text = f"{clock} {level:5s} {node}: {message}"
+    return f"{LEVEL_COLORS[level]}{text}\033[0m" if color and level in LEVEL_COLORS else text
+
+def get_stream_command(local):
+    """Command running the streamer script from stdin (on the Pi or locally)."""
+    if local:
+        return [sys.executable, "-u", "-"]
+    ssh_session.ensure_master(quiet=True)
+    return ["ssh"] + get_ssh_args() + ["python3 -u -"]
+
+class StreamStats:
+    """Per-second counters of the stream, printed every STATS_INTERVAL seconds."""
+
+    def __init__(self):
+        self.totals = collections.Counter()
+        self.window = collections.Counter()
+        self.window_start = time.monotonic()
+
+    def add(self, frame, wire_bytes):
+        """Adds the counters of one frame."""
+        values = {"sent": len(frame["l"]), "read": frame["n"], "filtered": frame["f"], "dropped": frame["d"],
+                  "raw_bytes": frame["b"], "wire_bytes": wire_bytes,
+                  "sent_bytes": sum(len(line) + 1 for line in frame["l"])}
+        self.totals.update(values)
+        self.window.update(values)
+
+    def report(self, force=False):
+        """Prints the rates of the last window (to stderr, so stdout stays pipeable)."""
+        elapsed = time.monotonic() - self.window_start
+        if not force and elapsed < STATS_INTERVAL:
+            return
+        w = self.window
+        print(f"📈 {w['sent'] / elapsed:.1f} lines/s sent ({w['wire_bytes'] / elapsed / 1024:.2f} KB/s on the wire), "
+              f"{w['filtered'] / elapsed:.1f}/s filtered, {w['dropped'] / elapsed:.1f}/s rate-dropped, "
+              f"log grows {w['raw_bytes'] / elapsed / 1024:.2f} KB/s", file=sys.stderr, flush=True)
+        self.window = collections.Counter()
+        self.window_start = time.monotonic()
+
+    def summary(self):
+        """Totals of the session."""
+        t = self.totals
+        ratio = t["sent_bytes"] / t["wire_bytes"] if t["wire_bytes"] else 0
+        return {"lines_read": t["read"], "lines_sent": t["sent"], "lines_filtered": t["filtered"],
+                "lines_dropped": t["dropped"], "log_bytes": t["raw_bytes"], "wire_bytes": t["wire_bytes"],
+                "compression_ratio": round(ratio, 2)}
+
+def read_frames(stream):
+    """Yields (frame, wire bytes) from a streamer's stdout."""
+    decompressor = zlib.decompressobj()
+    while True:
+        header = stream.read(4)
+        if len(header) < 4:
+            return
+        size = struct.unpack(">I", header)[0]
+        chunk = stream.read(size)
+        if len(chunk) < size:
+            return
+        yield json.loads(decompressor.decompress(chunk)), size + 4
+
+def tail(args):
+    """Streams the log with reconnects; resumes from the last received offset."""
+    state = load_state() if args.resume else {}
+    if state.get("path") != args.file:
+        state = {}
+    offset, inode = state.get("offset", -1), state.get("inode")
+    ring = Scrollback(args.scrollback)
+    stats = StreamStats()
+    color = sys.stdout.isatty() and not args.raw
+    attempt = 0
+    process = None
+
+    print(f"📜 Streaming {args.file} (level >= {args.level}"
+          f"{', nodes ' + ','.join(args.nodes) if args.nodes else ''}"
+          f"{', grep ' + repr(args.grep) if args.grep else ''}"
+          f"{', max %d lines/s' % args.rate_limit if args.rate_limit else ''})", file=sys.stderr)
+    try:
+        while True:
+            process = subprocess.Popen(get_stream_command(args.local), stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            process.stdin.write(get_stream_script(args.file, offset, inode, args).encode())
+            process.stdin.close()
+            for frame, wire_bytes in read_frames(process.stdout):
+                attempt = 0
+                offset, inode = frame["o"], frame["i"]
+                save_state({"path": args.file, "offset": offset, "inode": inode})
+                stats.add(frame, wire_bytes)
+                if frame["l"]:
+                    ring.extend(frame["l"])
+                    for line in frame["l"]:
+                        print(line if args.raw else format_line(line, color))
+                    sys.stdout.flush()
+                if frame["d"]:
+                    print(f"   … {frame['d']} lines dropped by the rate limit", file=sys.stderr)
+                stats.report()
+            returncode = process.wait()
+            if args.duration and returncode == 0:
+                break
+            delay = RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)]
+            attempt += 1
+            print(f"🔌 Stream lost (exit {returncode}) - resuming at offset {offset} in {delay}s", file=sys.stderr)
+            time.sleep(delay)
+    except KeyboardInterrupt:
+        if process:
+            process.kill()
+    stats.report(force=True)
+    summary = stats.summary()
+    print(f"✅ {summary['lines_sent']}/{summary['lines_read']} lines sent, {summary['wire_bytes'] / 1024:.1f} KB on the "
+          f"wire (compression {summary['compression_ratio']}x); scrollback: {get_scrollback_path()}", file=sys.stderr)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    return 0
+
+def scrollback(args):
+    """Prints the last lines of the local scrollback (optionally filtered)."""
+    regex = re.compile(args.grep) if args.grep else None
+    lines = [line for line in Scrollback(args.scrollback).ring if not regex or regex.search(line)]
+    color = sys.stdout.isatty() and not args.raw
+    for line in lines[-args.lines:]:
+        print(line if args.raw else format_line(line, color))
+    return 0
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower filtered ROS log stream")
+    parser.add_argument("command", nargs="?", default="tail", choices=["tail", "scrollback"])
+    parser.add_argument("--file", default=REMOTE_CONFIG["log_stream_file"], help="Log file on the Pi")
+    parser.add_argument("--nodes", nargs="+", default=[], help="Only these nodes")
+    parser.add_argument("--level", default="DEBUG", choices=list(LEVELS), help="Minimum severity")
+    parser.add_argument("--grep", help="Regular expression the line must match")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Maximum lines per second (0 = unlimited)")
+    parser.add_argument("--batch-interval", type=float, default=DEFAULT_BATCH_INTERVAL, help="Seconds per batch")
+    parser.add_argument("--resume", action="store_true", help="Continue at the offset of the last session")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after N seconds (0 = until Ctrl+C)")
+    parser.add_argument("--scrollback", type=int, default=DEFAULT_SCROLLBACK, help="Lines kept locally")
+    parser.add_argument("-n", "--lines", type=int, default=100, help="Lines shown by 'scrollback'")
+    parser.add_argument("--raw", action="store_true", help="Print the log lines unchanged")
+    parser.add_argument("--local", action="store_true", help="Read a local file instead of the Pi's")
+    parser.add_argument("--json", action="store_true", help="Print the session totals as JSON")
+    args = parser.parse_args()
+    return {"tail": tail, "scrollback": scrollback}[args.command](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
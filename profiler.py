@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Sampling Profiler
+
+Records a `perf` sampling profile of a running node on the Pi and analyzes it
+on the dev machine:
+- the Pi only records and dumps raw addresses (no symbol lookup on the Pi)
+- the capture (call stacks + process memory map) is transferred once, compressed
+- symbols are resolved locally from the binaries in the symbol cache sysroot
+- output: flamegraph SVG, top-N hot functions, diff between two captures
+
+Usage:
+    python3 profiler.py record mower_logic              # 10s profile at 99 Hz
+    python3 profiler.py record slic3r_coverage_planner --seconds 30
+    python3 profiler.py list                            # Stored captures
+    python3 profiler.py report <capture>                # Re-analyze a capture
+    python3 profiler.py diff mower_logic                # Compare the last two captures
+    python3 profiler.py diff <capture-a> <capture-b>
+"""
+
+import argparse
+import bisect
+import os
+import re
+import shlex
+import shutil
+import struct
+import subprocess
+import sys
+import tarfile
+import time
+import zlib
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, get_cache_dir, get_target_id
+import ssh_session
+import symbol_cache
+
+DEFAULT_TOP = 20
+
+# perf script -F ip,dso callchain frame: "\t    aaaab1c2d3e4 (/path/to/dso)"
+FRAME_PATTERN = re.compile(r"^\s+([0-9a-f]+)\s+\((.*)\)\s*$")
+# /proc/<pid>/maps: "aaaab1c00000-aaaab1c80000 r-xp 00010000 b3:02 1234   /path"
+MAPS_PATTERN = re.compile(r"^([0-9a-f]+)-([0-9a-f]+)\s+\S+\s+([0-9a-f]+)\s+\S+\s+\d+\s+(/\S.*)$")
+
+FLAMEGRAPH_WIDTH = 1200
+FLAMEGRAPH_ROW = 16
+
+# ============================================================================
+# CAPTURE
+# ============================================================================
+
+def get_profile_dir():
+    """Directory with the captures of the current target."""
+    path = os.path.join(get_cache_dir(), "profiles", get_target_id())
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def get_capture_script(program, seconds, frequency):
+    """Shell script recording the program on the Pi; writes a tar.gz (maps, stacks, log) to stdout."""
+    perf = REMOTE_CONFIG["perf_command"]
+    return f"""
+program={shlex.quote(program)}
+pid=$(pidof -s "$program") || {{ echo "$program is not running" >&2; exit 3; }}
+tmp=$(mktemp -d) && trap 'rm -rf "$tmp" 2>/dev/null' EXIT
+cat /proc/$pid/maps > "$tmp/maps"
+{perf} record -F {frequency} -g -p $pid -o "$tmp/perf.data" -- sleep {seconds} > "$tmp/record.log" 2>&1 \\
+    || {{ cat "$tmp/record.log" >&2; exit 4; }}
+{perf} script -i "$tmp/perf.data" -F ip,dso > "$tmp/stacks" 2>> "$tmp/record.log"
+tar czf - -C "$tmp" maps stacks record.log
+"""
+
+def record(program, seconds, frequency, sync_symbols=True):
+    """Records a profile on the Pi. Returns the path of the stored capture."""
+    if sync_symbols:
+        # Binaries and libraries by build-id, so the capture can be symbolized offline
+        symbol_cache.sync([program])
+    print(f"🔥 Recording {program} for {seconds}s at {frequency} Hz...")
+    start = time.monotonic()
+    result = ssh_session.run_remote(get_capture_script(program, seconds, frequency), text=False)
+    if result.returncode != 0:
+        message = result.stderr.decode(errors="replace").strip()
+        if result.returncode == 4:
+            message += "\n   Tip: sudo sysctl kernel.perf_event_paranoid=1 or set perf_command to 'sudo -n perf'"
+        raise RuntimeError(message)
+    path = os.path.join(get_profile_dir(), f"{program}-{time.strftime('%Y%m%d-%H%M%S')}.tar.gz")
+    with open(path, "wb") as f:
+        f.write(result.stdout)
+    print(f"📦 Capture: {len(result.stdout) / 1024:.1f} KB in {time.monotonic() - start:.1f}s -> {path}")
+    return path
+
+def read_capture(path):
+    """Returns (maps text, stacks text) of a capture."""
+    with tarfile.open(path, "r:gz") as tar:
+        return tuple(tar.extractfile(name).read().decode(errors="replace") for name in ("maps", "stacks"))
+
+# ============================================================================
+# LOCAL SYMBOLIZATION
+# ============================================================================
+
+def read_elf_symbols(path):
+    """Returns (PT_LOAD segments [(offset, vaddr, filesz)], sorted function symbols [(addr, size, name)])."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != b"\x7fELF":
+        return [], []
+    is64 = data[4] == 2
+    e = "<" if data[5] == 1 else ">"
+    if is64:
+        phoff, shoff = struct.unpack_from(e + "QQ", data, 32)
+        phentsize, phnum, shentsize, shnum = struct.unpack_from(e + "HHHH", data, 54)
+    else:
+        phoff, shoff = struct.unpack_from(e + "II", data, 28)
+        phentsize, phnum, shentsize, shnum = struct.unpack_from(e + "HHHH", data, 42)
+
+    segments = []
+    for i in range(phnum):
+        base = phoff + i * phentsize
+        if struct.unpack_from(e + "I", data, base)[0] != 1:  # PT_LOAD
+            continue
+        if is64:
+            offset, vaddr, _, filesz = struct.unpack_from(e + "QQQQ", data, base + 8)
+        else:
+            offset, vaddr, _, filesz = struct.unpack_from(e + "IIII", data, base + 4)
+        segments.append((offset, vaddr, filesz))
+
+    sections = []
+    for i in range(shnum):
+        base = shoff + i * shentsize
+        if is64:
+            sh_type, = struct.unpack_from(e + "I", data, base + 4)
+            sh_offset, sh_size = struct.unpack_from(e + "QQ", data, base + 24)
+            sh_link, = struct.unpack_from(e + "I", data, base + 40)
+        else:
+            sh_type, = struct.unpack_from(e + "I", data, base + 4)
+            sh_offset, sh_size, sh_link = struct.unpack_from(e + "III", data, base + 16)
+        sections.append((sh_type, sh_offset, sh_size, sh_link))
+
+    symbols = {}
+    # .symtab (2) if not stripped, .dynsym (11) for exported functions
+    for sh_type, sh_offset, sh_size, sh_link in sections:
+        if sh_type not in (2, 11):
+            continue
+        strtab_offset = sections[sh_link][1]
+        entry_size = 24 if is64 else 16
+        for pos in range(sh_offset, sh_offset + sh_size - entry_size + 1, entry_size):
+            if is64:
+                name_offset, info, _, shndx, value, size = struct.unpack_from(e + "IBBHQQ", data, pos)
+            else:
+                name_offset, value, size, info, _, shndx = struct.unpack_from(e + "IIIBBH", data, pos)
+            if info & 0xf != 2 or value == 0 or shndx == 0:  # STT_FUNC, defined
+                continue
+            end = data.index(b"\0", strtab_offset + name_offset)
+            # ARM Thumb functions have bit 0 set
+            symbols.setdefault(value & ~1, (size, data[strtab_offset + name_offset:end].decode(errors="replace")))
+    return segments, sorted((addr, size, name) for addr, (size, name) in symbols.items())
+
+def parse_maps(text):
+    """Executable-relevant mappings from /proc/<pid>/maps: sorted [(start, end, offset, path)]."""
+    mappings = []
+    for line in text.splitlines():
+        match = MAPS_PATTERN.match(line)
+        if match:
+            start, end, offset, path = match.groups()
+            mappings.append((int(start, 16), int(end, 16), int(offset, 16), path.strip()))
+    return sorted(mappings)
+
+def parse_stacks(text):
+    """Call stacks of `perf script -F ip,dso`: list of [(ip, dso)], leaf first."""
+    stacks = []
+    current = []
+    for line in text.splitlines():
+        match = FRAME_PATTERN.match(line)
+        if match:
+            current.append((int(match.group(1), 16), match.group(2)))
+        elif not line.strip() and current:
+            stacks.append(current)
+            current = []
+    if current:
+        stacks.append(current)
+    return stacks
+
+def find_local_object(remote_path):
+    """Sysroot copy of a mapped file; /usr/lib and /lib are the same on merged-/usr systems."""
+    candidates = [remote_path]
+    if remote_path.startswith("/usr/"):
+        candidates.append(remote_path[4:])
+    else:
+        candidates.append("/usr" + remote_path)
+    for candidate in candidates:
+        local = symbol_cache.get_local_path(candidate)
+        if os.path.isfile(local):
+            return local
+    return None
+
+def symbolize(maps_text, stacks_text):
+    """Resolves the stacks with the local binaries. Returns folded stacks {"root;...;leaf": count}."""
+    mappings = parse_maps(maps_text)
+    starts = [m[0] for m in mappings]
+    elf_cache = {}
+    frame_cache = {}
+
+    def lookup(ip, dso):
+        index = bisect.bisect_right(starts, ip) - 1
+        if index < 0 or ip >= mappings[index][1]:
+            return "[kernel]" if "kernel" in dso else f"[{os.path.basename(dso.strip('[]')) or 'unknown'}]"
+        start, _, offset, path = mappings[index]
+        file_offset = ip - start + offset
+        if path not in elf_cache:
+            local = find_local_object(path)
+            elf_cache[path] = read_elf_symbols(local) if local else ([], [])
+        segments, symbols = elf_cache[path]
+        vaddr = next((file_offset - seg_offset + seg_vaddr for seg_offset, seg_vaddr, filesz in segments
+                      if seg_offset <= file_offset < seg_offset + filesz), file_offset)
+        position = bisect.bisect_right(symbols, (vaddr, float("inf"), "")) - 1
+        if position >= 0:
+            addr, size, name = symbols[position]
+            if size == 0 or vaddr < addr + size:
+                return name
+        return f"{os.path.basename(path)}+0x{vaddr:x}"
+
+    folded = {}
+    for stack in parse_stacks(stacks_text):
+        frames = []
+        for ip, dso in reversed(stack):
+            if (ip, dso) not in frame_cache:
+                frame_cache[(ip, dso)] = lookup(ip, dso)
+            frames.append(frame_cache[(ip, dso)])
+        key = ";".join(frames)
+        folded[key] = folded.get(key, 0) + 1
+    return demangle_folded(folded)
+
+def demangle_folded(folded):
+    """Demangles C++ names with one c++filt call (unchanged if c++filt is missing)."""
+    names = sorted({frame for stack in folded for frame in stack.split(";") if frame.startswith("_Z")})
+    if not names or not shutil.which("c++filt"):
+        return folded
+    output = subprocess.run(["c++filt"], input="\n".join(names), capture_output=True, text=True).stdout
+    mapping = dict(zip(names, output.splitlines()))
+    result = {}
+    for stack, count in folded.items():
+        key = ";".join(mapping.get(frame, frame).replace(";", ",") for frame in stack.split(";"))
+        result[key] = result.get(key, 0) + count
+    return result
+
+def save_folded(folded, path):
+    """Writes folded stacks (flamegraph.pl format)."""
+    with open(path, "w") as f:
+        for stack, count in sorted(folded.items()):
+            f.write(f"{stack} {count}\n")
+
+def load_folded(path):
+    """Reads folded stacks."""
+    folded = {}
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                folded[stack] = folded.get(stack, 0) + int(count)
+    return folded
+
+# ============================================================================
+# ANALYSIS AND RENDERING
+# ============================================================================
+
+def function_stats(folded):
+    """Per function: (self samples, total samples) and the sample count."""
+    stats = {}
+    total = 0
+    for stack, count in folded.items():
+        frames = stack.split(";")
+        total += count
+        for frame in set(frames):
+            stats.setdefault(frame, [0, 0])[1] += count
+        stats.setdefault(frames[-1], [0, 0])[0] += count
+    return stats, total
+
+def print_top(folded, top):
+    """Prints the hottest functions by self time."""
+    stats, total = function_stats(folded)
+    print(f"\n🔥 Top {top} functions ({total} samples)")
+    print(f"   {'SELF%':>6s} {'TOTAL%':>7s}  FUNCTION")
+    for frame, (self_count, total_count) in sorted(stats.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"   {100 * self_count / total:6.1f} {100 * total_count / total:7.1f}  {frame[:100]}")
+
+def frame_color(name):
+    """Stable warm color per function name."""
+    value = zlib.crc32(name.encode())
+    return f"rgb({205 + value % 50},{(value >> 8) % 180},{(value >> 16) % 55})"
+
+def render_flamegraph(folded, path, title):
+    """Writes a self-contained flamegraph SVG (hover shows name and share)."""
+    root = {"value": 0, "children": {}}
+    for stack, count in folded.items():
+        node = root
+        node["value"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"value": 0, "children": {}})
+            node["value"] += count
+    total = max(root["value"], 1)
+
+    rects = []
+    stack = [("all", root, 0.0, 0)]
+    while stack:
+        name, node, x, depth = stack.pop()
+        width = node["value"] / total * FLAMEGRAPH_WIDTH
+        if width < 0.3:
+            continue
+        rects.append((name, node["value"], x, depth, width))
+        child_x = x
+        for child_name, child in sorted(node["children"].items()):
+            stack.append((child_name, child, child_x, depth + 1))
+            child_x += child["value"] / total * FLAMEGRAPH_WIDTH
+
+    depth_max = max((r[3] for r in rects), default=0) + 1
+    height = (depth_max + 2) * FLAMEGRAPH_ROW
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{FLAMEGRAPH_WIDTH}" height="{height}" '
+        f'font-family="monospace" font-size="11">',
+        f'<text x="4" y="12">{escape(title)} - {total} samples</text>',
+    ]
+    for name, value, x, depth, width in rects:
+        y = height - (depth + 1) * FLAMEGRAPH_ROW
+        label = escape(name)
+        lines.append(f'<g><title>{label} ({value} samples, {100 * value / total:.2f}%)</title>'
+                     f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FLAMEGRAPH_ROW - 1}" '
+                     f'fill="{frame_color(name)}"/>')
+        chars = int(width / 7)
+        if chars >= 3:
+            text = name if len(name) <= chars else name[:chars - 2] + ".."
+            lines.append(f'<text x="{x + 2:.1f}" y="{y + 11}">{escape(text)}</text>')
+        lines.append("</g>")
+    lines.append("</svg>")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+def analyze(capture, top):
+    """Symbolizes a capture, writes .folded and .svg next to it and prints the top functions."""
+    base = capture[:-len(".tar.gz")]
+    start = time.monotonic()
+    folded = symbolize(*read_capture(capture))
+    if not folded:
+        raise RuntimeError("capture contains no samples")
+    save_folded(folded, base + ".folded")
+    render_flamegraph(folded, base + ".svg", os.path.basename(base))
+    print_top(folded, top)
+    print(f"\n✅ Symbolized locally in {time.monotonic() - start:.2f}s")
+    print(f"   Flamegraph: {base}.svg")
+    return folded
+
+def get_folded(capture):
+    """Folded stacks of a capture (symbolized on first use)."""
+    base = capture[:-len(".tar.gz")] if capture.endswith(".tar.gz") else capture
+    if not os.path.exists(base + ".folded"):
+        save_folded(symbolize(*read_capture(base + ".tar.gz")), base + ".folded")
+    return load_folded(base + ".folded")
+
+def diff(capture_a, capture_b, top):
+    """Prints the functions whose share of samples changed most from capture A to B."""
+    stats_a, total_a = function_stats(get_folded(capture_a))
+    stats_b, total_b = function_stats(get_folded(capture_b))
+    rows = []
+    for frame in set(stats_a) | set(stats_b):
+        self_a = 100 * stats_a.get(frame, [0, 0])[0] / max(total_a, 1)
+        self_b = 100 * stats_b.get(frame, [0, 0])[0] / max(total_b, 1)
+        total_share_b = 100 * stats_b.get(frame, [0, 0])[1] / max(total_b, 1)
+        rows.append((self_b - self_a, self_a, self_b, total_share_b, frame))
+    rows.sort(key=lambda row: -abs(row[0]))
+    print(f"🔀 {os.path.basename(capture_a)} ({total_a} samples) -> {os.path.basename(capture_b)} ({total_b} samples)")
+    print(f"   {'SELF% A':>8s} {'SELF% B':>8s} {'DELTA':>7s} {'TOTAL% B':>9s}  FUNCTION")
+    for delta, self_a, self_b, total_share_b, frame in rows[:top]:
+        icon = "🔺" if delta > 0 else "🔻" if delta < 0 else "  "
+        print(f"   {self_a:8.1f} {self_b:8.1f} {delta:+7.1f} {total_share_b:9.1f}  {icon} {frame[:90]}")
+
+def list_captures(program=None):
+    """Stored captures (oldest first), optionally of one program."""
+    names = sorted(name for name in os.listdir(get_profile_dir()) if name.endswith(".tar.gz"))
+    if program:
+        names = [name for name in names if name.rsplit("-", 2)[0] == program]
+    return [os.path.join(get_profile_dir(), name) for name in names]
+
+def resolve_capture(name):
+    """Capture path from a path or file name in the profile directory."""
+    if os.path.exists(name):
+        return name
+    for candidate in (name, name + ".tar.gz"):
+        path = os.path.join(get_profile_dir(), candidate)
+        if os.path.exists(path):
+            return path
+    raise RuntimeError(f"capture not found: {name}")
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower sampling profiler")
+    sub = parser.add_subparsers(dest="action", required=True)
+    record_parser = sub.add_parser("record", help="Record a profile of a running program on the Pi")
+    record_parser.add_argument("program")
+    record_parser.add_argument("--seconds", type=int, default=REMOTE_CONFIG["profile_seconds"])
+    record_parser.add_argument("--frequency", type=int, default=REMOTE_CONFIG["profile_frequency"])
+    record_parser.add_argument("--no-sync", action="store_true", help="Skip the symbol cache sync")
+    report_parser = sub.add_parser("report", help="Symbolize and render a stored capture")
+    report_parser.add_argument("capture")
+    diff_parser = sub.add_parser("diff", help="Compare two captures (or the last two of a program)")
+    diff_parser.add_argument("captures", nargs="+")
+    list_parser = sub.add_parser("list", help="List stored captures")
+    list_parser.add_argument("program", nargs="?")
+    for p in (record_parser, report_parser, diff_parser):
+        p.add_argument("--top", type=int, default=DEFAULT_TOP, help="Number of functions to show")
+    args = parser.parse_args()
+
+    try:
+        if args.action == "record":
+            analyze(record(args.program, args.seconds, args.frequency, not args.no_sync), args.top)
+        elif args.action == "report":
+            analyze(resolve_capture(args.capture), args.top)
+        elif args.action == "diff":
+            if len(args.captures) == 1:
+                captures = list_captures(args.captures[0])
+                if len(captures) < 2:
+                    raise RuntimeError(f"need two captures of {args.captures[0]}, found {len(captures)}")
+                captures = captures[-2:]
+            else:
+                captures = [resolve_capture(name) for name in args.captures[:2]]
+            diff(captures[0], captures[1], args.top)
+        else:
+            for capture in list_captures(args.program):
+                print(f"{os.path.basename(capture):50s} {os.path.getsize(capture) / 1024:8.1f} KB")
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Resource Agent
+
+Tracks CPU, memory, threads and disk I/O of the DEBUG_PROGRAMS nodes on the Pi:
+- a small agent on the Pi resolves the node processes and samples
+  /proc/<pid>/stat, status and io at `resource_sample_hz`
+- deltas are stored as fixed-size binary records in a ring buffer in /dev/shm
+  (no text logs, no SD card writes)
+- `pull` fetches the ring once and summarizes it locally (percentiles, peak RSS)
+- `bench` measures the CPU cost of the agent itself
+
+Usage:
+    python3 resource_agent.py start              # Start the agent on the Pi
+    python3 resource_agent.py pull               # Fetch and summarize the ring buffer
+    python3 resource_agent.py pull --json        # Same, as JSON
+    python3 resource_agent.py status             # Agent alive, own CPU usage, ring fill
+    python3 resource_agent.py stop
+    python3 resource_agent.py bench --seconds 60 # CPU cost of the agent on the Pi
+    python3 resource_agent.py bench --local      # Same on the dev machine
+"""
+
+import argparse
+import gzip
+import inspect
+import json
+import os
+import struct
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import DEBUG_PROGRAMS, REMOTE_CONFIG
+import ssh_session
+
+# Ring buffer on the Pi (tmpfs: no SD card wear)
+REMOTE_DIR = "/dev/shm"
+REMOTE_RING = f"{REMOTE_DIR}/openmower-resources.ring"
+REMOTE_SCRIPT = f"{REMOTE_DIR}/openmower-resource-agent.py"
+REMOTE_PID = f"{REMOTE_DIR}/openmower-resource-agent.pid"
+
+RING_MAGIC = b"OMRA"
+# Header: magic, version, record size, capacity, records written, start time; JSON metadata follows
+HEADER = struct.Struct("<4sHHIQd")
+WRITTEN_OFFSET = 12
+HEADER_SIZE = 1024
+# Record: time, program index, pid, CPU ticks, RSS kB, read kB, written kB, threads
+RECORD = struct.Struct("<dHIIIIIH")
+
+# Processes are looked up again after this many seconds (restarted nodes get new PIDs)
+RESOLVE_INTERVAL = 5.0
+# Agent budget: share of one core
+CPU_BUDGET_PERCENT = 1.0
+
+# ============================================================================
+# AGENT (runs on the Pi - keep free of module dependencies)
+# ============================================================================
+
+def read_proc(path):
+    """Reads a small /proc file with a single syscall ('' if the process is gone)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return ""
+    try:
+        return os.read(fd, 4096).decode(errors="replace")
+    except OSError:
+        return ""
+    finally:
+        os.close(fd)
+
+def resolve_pids(names):
+    """Maps program index -> PID of the first process whose executable name matches."""
+    wanted = {name[:15]: index for index, name in enumerate(names)}
+    pids = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        index = wanted.get(read_proc(f"/proc/{entry}/comm").strip())
+        if index is not None and index not in pids:
+            pids[index] = int(entry)
+    return pids
+
+def sample_process(pid):
+    """Returns (cpu ticks, rss kB, read bytes, written bytes, threads) of a process, None if gone."""
+    stat = read_proc(f"/proc/{pid}/stat")
+    if not stat:
+        return None
+    fields = stat[stat.rfind(")") + 2:].split()
+    ticks = int(fields[11]) + int(fields[12])
+    rss = threads = 0
+    for line in read_proc(f"/proc/{pid}/status").splitlines():
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1])
+        elif line.startswith("Threads:"):
+            threads = int(line.split()[1])
+    read_bytes = written_bytes = 0
+    # io is only readable for own processes (or root)
+    for line in read_proc(f"/proc/{pid}/io").splitlines():
+        if line.startswith("read_bytes:"):
+            read_bytes = int(line.split()[1])
+        elif line.startswith("write_bytes:"):
+            written_bytes = int(line.split()[1])
+    return ticks, rss, read_bytes, written_bytes, threads
+
+def pack_metadata(names, hz):
+    """Ring metadata (JSON behind the fixed header). Raises ValueError if it does not fit into HEADER_SIZE."""
+    import json
+    metadata = json.dumps({"programs": names, "hz": hz, "clk_tck": os.sysconf("SC_CLK_TCK"),
+                           "cpus": os.cpu_count()}).encode()
+    if HEADER.size + len(metadata) > HEADER_SIZE:
+        raise ValueError(f"metadata of {len(names)} programs needs {len(metadata)} bytes, "
+                         f"the ring header has room for {HEADER_SIZE - HEADER.size} - select fewer programs")
+    return metadata
+
+def run_agent(names, ring_path, hz, capacity, duration):
+    """Samples the programs into the ring file until killed or `duration` seconds passed."""
+    import mmap
+    metadata = pack_metadata(names, hz)
+    size = HEADER_SIZE + capacity * RECORD.size
+    with open(ring_path, "wb") as f:
+        f.truncate(size)
+    with open(ring_path, "r+b") as f:
+        ring = mmap.mmap(f.fileno(), size)
+    ring[:HEADER.size] = HEADER.pack(RING_MAGIC, 1, RECORD.size, capacity, 0, time.time())
+    ring[HEADER.size:HEADER.size + len(metadata)] = metadata
+
+    interval = 1.0 / hz
+    written = 0
+    previous = {}
+    pids = {}
+    next_resolve = 0.0
+    started = time.monotonic()
+    next_sample = started
+    while not duration or next_sample - started < duration:
+        now = time.monotonic()
+        if now >= next_resolve:
+            pids = resolve_pids(names)
+            next_resolve = now + RESOLVE_INTERVAL
+        timestamp = time.time()
+        for index in range(len(names)):
+            pid = pids.get(index, 0)
+            sample = sample_process(pid) if pid else None
+            if sample is None:
+                # Not running: a record with PID 0 marks the gap
+                pids.pop(index, None)
+                previous.pop(index, None)
+                record = RECORD.pack(timestamp, index, 0, 0, 0, 0, 0, 0)
+            else:
+                # Counters of a new process (restart, PID reuse) start over
+                last_pid, last = previous.get(index, (pid, sample))
+                if last_pid != pid:
+                    last = sample
+                previous[index] = (pid, sample)
+                # Clamped: the unsigned record fields cannot take a counter that went backwards
+                record = RECORD.pack(timestamp, index, pid, max(0, sample[0] - last[0]), sample[1],
+                                     max(0, sample[2] - last[2]) >> 10, max(0, sample[3] - last[3]) >> 10,
+                                     sample[4])
+            offset = HEADER_SIZE + (written % capacity) * RECORD.size
+            ring[offset:offset + RECORD.size] = record
+            written += 1
+        # Publish the counter after the records, so readers never see half-written slots as valid
+        ring[WRITTEN_OFFSET:WRITTEN_OFFSET + 8] = struct.pack("<Q", written)
+        next_sample += interval
+        delay = next_sample - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_sample = time.monotonic()
+    ring.flush()
+
+def run_bench(names, ring_path, hz, capacity, seconds):
+    """Runs the agent for `seconds` and prints its own CPU usage as JSON."""
+    import json
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    run_agent(names, ring_path, hz, capacity, seconds)
+    cpu = time.process_time() - cpu_start
+    wall = time.monotonic() - wall_start
+    running = len(resolve_pids(names))
+    print(json.dumps({"seconds": round(wall, 2), "cpu_seconds": round(cpu, 3), "hz": hz,
+                      "programs": len(names), "running": running, "cpus": os.cpu_count(),
+                      "percent_of_core": round(100 * cpu / wall, 3)}))
+
+def get_agent_script(call):
+    """Python script with the agent functions and the given call."""
+    parts = [read_proc, resolve_pids, sample_process, pack_metadata, run_agent, run_bench]
+    constants = (f"RING_MAGIC = {RING_MAGIC!r}\nHEADER = struct.Struct({HEADER.format!r})\n"
+                 f"WRITTEN_OFFSET = {WRITTEN_OFFSET}\nHEADER_SIZE = {HEADER_SIZE}\nRECORD = struct.Struct({RECORD.format!r})\n"
+                 f"RESOLVE_INTERVAL = {RESOLVE_INTERVAL}\n")
+    source = "import os\nimport struct\nimport time\n\n" + constants + "\n" + "\n".join(inspect.getsource(p) for p in parts)
+    return source + f"\n{call}\n"
+
+# ============================================================================
+# LOCAL SIDE
+# ============================================================================
+
+def run_shell(command, local, input=None, text=True):
+    """Runs a shell command on the Pi, or locally with --local."""
+    if local:
+        return subprocess.run(["bash", "-c", command], input=input, capture_output=True, text=text)
+    return ssh_session.run_remote(command, input=input, text=text)
+
+def get_settings(args):
+    """Program names, sample rate and ring capacity from config and arguments."""
+    names = args.programs or [prog["name"] for prog in DEBUG_PROGRAMS]
+    hz = args.hz or REMOTE_CONFIG["resource_sample_hz"]
+    capacity = int(hz * len(names) * REMOTE_CONFIG["resource_ring_seconds"])
+    return names, hz, capacity
+
+def start(args):
+    """Ships the agent to the Pi and starts it in the background."""
+    names, hz, capacity = get_settings(args)
+    try:
+        # Checked here as well - the agent runs detached on the Pi, its errors go nowhere
+        pack_metadata(names, hz)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    script = get_agent_script(f"run_agent({names!r}, {REMOTE_RING!r}, {hz!r}, {capacity!r}, 0)")
+    command = (
+        f"if [ -f {REMOTE_PID} ] && kill -0 $(cat {REMOTE_PID}) 2>/dev/null; then kill $(cat {REMOTE_PID}); fi; "
+        f"cat > {REMOTE_SCRIPT} || exit 1; nohup nice -n 10 python3 {REMOTE_SCRIPT} >/dev/null 2>&1 </dev/null & "
+        f"echo $! > {REMOTE_PID}; cat {REMOTE_PID}"
+    )
+    result = run_shell(command, args.local, input=script)
+    if result.returncode != 0:
+        print(f"❌ Could not start the agent: {result.stderr.strip()}", file=sys.stderr)
+        return 1
+    ring_kb = (HEADER_SIZE + capacity * RECORD.size) / 1024
+    print(f"✅ Resource agent running (PID {result.stdout.strip()}): {len(names)} programs at {hz} Hz, "
+          f"ring {ring_kb:.0f} KB ({REMOTE_CONFIG['resource_ring_seconds']}s)")
+    return 0
+
+def stop(args):
+    """Stops the agent (the ring buffer stays for a last pull)."""
+    result = run_shell(f"[ -f {REMOTE_PID} ] && kill $(cat {REMOTE_PID}) 2>/dev/null; rm -f {REMOTE_PID}", args.local)
+    print("✅ Resource agent stopped" if result.returncode == 0 else "ℹ️  Resource agent was not running")
+    return 0
+
+def status(args):
+    """Shows whether the agent runs, its own CPU time and the ring fill level."""
+    command = (f"pid=$(cat {REMOTE_PID} 2>/dev/null); "
+               f"if [ -n \"$pid\" ] && kill -0 $pid 2>/dev/null; then echo \"$pid $(cut -d' ' -f14,15,22 /proc/$pid/stat) "
+               f"$(getconf CLK_TCK) $(cut -d' ' -f22 /proc/self/stat) $(cut -d' ' -f1 /proc/uptime)\"; fi")
+    result = run_shell(command, args.local)
+    if not result.stdout.strip():
+        print("❌ Resource agent not running")
+        return 1
+    pid, utime, stime, started, clk_tck, _, uptime = result.stdout.split()
+    clk_tck = int(clk_tck)
+    running = float(uptime) - int(started) / clk_tck
+    cpu = (int(utime) + int(stime)) / clk_tck
+    print(f"✅ Resource agent running (PID {pid}) for {running:.0f}s, "
+          f"own CPU {cpu:.2f}s = {100 * cpu / max(running, 1e-6):.3f}% of one core")
+    return 0
+
+def parse_ring(data):
+    """Parses a ring file. Returns (metadata, records in time order)."""
+    magic, _, record_size, capacity, _, started = HEADER.unpack_from(data)
+    if magic != RING_MAGIC or record_size != RECORD.size:
+        raise ValueError("not a resource ring buffer")
+    written = struct.unpack_from("<Q", data, WRITTEN_OFFSET)[0]
+    metadata = json.loads(data[HEADER.size:HEADER_SIZE].rstrip(b"\0"))
+    metadata["started"] = started
+    count = min(written, capacity)
+    first = written - count
+    records = [RECORD.unpack_from(data, HEADER_SIZE + ((first + i) % capacity) * RECORD.size) for i in range(count)]
+    return metadata, records
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+def summarize(metadata, records):
+    """Per program: CPU percentiles (percent of one core), RSS, threads, I/O, restarts and downtime."""
+    programs = metadata["programs"]
+    clk_tck = metadata["clk_tck"]
+    interval = 1.0 / metadata["hz"]
+    per_program = {}
+    last_time = {}
+    for t, index, pid, ticks, rss, read_kb, written_kb, threads in records:
+        entry = per_program.setdefault(index, {"cpu": [], "rss": [], "threads": 0, "read_kb": 0,
+                                               "written_kb": 0, "pids": [], "down": 0, "samples": 0})
+        entry["samples"] += 1
+        if pid == 0:
+            entry["down"] += 1
+            continue
+        if not entry["pids"] or entry["pids"][-1] != pid:
+            entry["pids"].append(pid)
+        elapsed = t - last_time.get(index, t - interval)
+        last_time[index] = t
+        entry["cpu"].append(100 * ticks / clk_tck / max(elapsed, 1e-6))
+        entry["rss"].append(rss)
+        entry["threads"] = max(entry["threads"], threads)
+        entry["read_kb"] += read_kb
+        entry["written_kb"] += written_kb
+
+    summary = {}
+    for index, entry in sorted(per_program.items()):
+        cpu = sorted(entry["cpu"])
+        rss = entry["rss"]
+        summary[programs[index]] = {
+            "samples": entry["samples"],
+            "uptime_percent": round(100 * (entry["samples"] - entry["down"]) / entry["samples"], 1),
+            "restarts": max(len(entry["pids"]) - 1, 0),
+            "cpu_p50": round(percentile(cpu, 0.50), 1),
+            "cpu_p95": round(percentile(cpu, 0.95), 1),
+            "cpu_p99": round(percentile(cpu, 0.99), 1),
+            "cpu_max": round(cpu[-1], 1) if cpu else 0,
+            "rss_last_kb": rss[-1] if rss else 0,
+            "rss_peak_kb": max(rss) if rss else 0,
+            "threads_max": entry["threads"],
+            "read_kb": entry["read_kb"],
+            "written_kb": entry["written_kb"],
+        }
+    span = records[-1][0] - records[0][0] if records else 0
+    return {"started": metadata["started"], "span_seconds": round(span, 1), "hz": metadata["hz"],
+            "programs": summary}
+
+def print_summary(summary):
+    """Prints the summary table."""
+    print(f"📊 {summary['span_seconds']:.0f}s of samples at {summary['hz']} Hz "
+          f"(agent started {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(summary['started']))})")
+    print(f"   {'PROGRAM':26s} {'UP%':>6s} {'RST':>4s} {'CPU p50':>8s} {'p95':>6s} {'p99':>6s} {'max':>6s} "
+          f"{'RSS MB':>7s} {'PEAK MB':>8s} {'THR':>4s} {'IO R/W MB':>11s}")
+    for name, s in summary["programs"].items():
+        if s["uptime_percent"] == 0:
+            print(f"   {name:26s} {'-':>6s}  not running")
+            continue
+        io = f"{s['read_kb'] / 1024:.1f}/{s['written_kb'] / 1024:.1f}"
+        print(f"   {name:26s} {s['uptime_percent']:6.1f} {s['restarts']:4d} {s['cpu_p50']:8.1f} {s['cpu_p95']:6.1f} "
+              f"{s['cpu_p99']:6.1f} {s['cpu_max']:6.1f} {s['rss_last_kb'] / 1024:7.1f} {s['rss_peak_kb'] / 1024:8.1f} "
+              f"{s['threads_max']:4d} {io:>11s}")
+
+def pull(args):
+    """Fetches the ring buffer (compressed) and summarizes it."""
+    result = run_shell(f"gzip -c {REMOTE_RING}", args.local, text=False)
+    if result.returncode != 0:
+        print("❌ No ring buffer on the Pi - start the agent first", file=sys.stderr)
+        return 1
+    data = gzip.decompress(result.stdout)
+    metadata, records = parse_ring(data)
+    summary = summarize(metadata, records)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+        print(f"📡 {len(result.stdout) / 1024:.1f} KB transferred for {len(records)} records")
+    return 0
+
+def bench(args):
+    """Runs the agent for --seconds in the foreground and reports its CPU cost."""
+    names, hz, capacity = get_settings(args)
+    ring = f"{REMOTE_DIR}/openmower-resources-bench.ring"
+    script = get_agent_script(f"run_bench({names!r}, {ring!r}, {hz!r}, {capacity!r}, {args.seconds!r})")
+    print(f"⏱️  Running the agent for {args.seconds}s at {hz} Hz ({len(names)} programs)...", file=sys.stderr)
+    result = run_shell(f"python3 - ; rm -f {ring}", args.local, input=script)
+    if result.returncode != 0 or not result.stdout.strip():
+        print(f"❌ Benchmark failed: {result.stderr.strip()}", file=sys.stderr)
+        return 1
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    data["budget_percent"] = CPU_BUDGET_PERCENT
+    data["ok"] = data["percent_of_core"] < CPU_BUDGET_PERCENT
+    if args.json:
+        print(json.dumps(data, indent=2))
+    else:
+        icon = "✅" if data["ok"] else "❌"
+        print(f"{icon} Agent CPU: {data['cpu_seconds']:.2f}s in {data['seconds']:.0f}s = "
+              f"{data['percent_of_core']:.3f}% of one core "
+              f"({data['percent_of_core'] / data['cpus']:.3f}% of {data['cpus']} cores, budget {CPU_BUDGET_PERCENT}%), "
+              f"{data['running']}/{data['programs']} programs running")
+    return 0 if data["ok"] else 1
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower per-process resource agent")
+    parser.add_argument("command", nargs="?", default="pull", choices=["start", "stop", "status", "pull", "bench"])
+    parser.add_argument("--programs", nargs="+", help="Program names (default: all DEBUG_PROGRAMS)")
+    parser.add_argument("--hz", type=float, help="Sample rate (default: resource_sample_hz)")
+    parser.add_argument("--seconds", type=float, default=30, help="Benchmark duration")
+    parser.add_argument("--local", action="store_true", help="Run on the dev machine instead of the Pi")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    return {"start": start, "stop": stop, "status": status, "pull": pull, "bench": bench}[args.command](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
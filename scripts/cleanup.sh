@@ -3,19 +3,31 @@
 # Cleanup Script für OpenMower Remote Debug
 echo "🧹 Cleaning up Remote Debug processes..."
 
-# SSH Tunnels beenden
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PROJECT_ROOT="$(dirname "$(dirname "$SCRIPT_DIR")")"  # Von devel/debug nach workspace root
+DEVEL_DIR="$PROJECT_ROOT/devel"
+
+# Tunnel-Supervisor per PID beenden (beendet auch seine SSH-Verbindung)
 echo "🔌 Closing SSH tunnels..."
-pkill -f "ssh.*-L.*1234" 2>/dev/null || true
-pkill -f "ssh.*-L.*11311" 2>/dev/null || true
+TUNNEL_PID_FILE="$DEVEL_DIR/tmp/tunnel.pid"
+if [ -f "$TUNNEL_PID_FILE" ]; then
+    TUNNEL_PID="$(cat "$TUNNEL_PID_FILE")"
+    if kill "$TUNNEL_PID" 2>/dev/null; then
+        # Warten, bis der Supervisor seinen Status geschrieben hat
+        for _ in 1 2 3 4 5 6 7 8 9 10; do
+            kill -0 "$TUNNEL_PID" 2>/dev/null || break
+            sleep 0.5
+        done
+        kill -9 "$TUNNEL_PID" 2>/dev/null || true
+    fi
+    rm -f "$TUNNEL_PID_FILE"
+fi
 
 # GDB Prozesse beenden
 echo "🐛 Stopping GDB processes..."
 pkill -f "gdb.*openmower" 2>/dev/null || true
 
 # Temporäre Dateien löschen
-SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
-PROJECT_ROOT="$(dirname "$(dirname "$(dirname "$SCRIPT_DIR")")")"
-DEVEL_DIR="$PROJECT_ROOT/devel"
 
 if [ -d "$DEVEL_DIR/tmp" ]; then
     echo "🗑️  Removing temporary files..."
@@ -0,0 +1,37 @@
+#!/bin/bash
+
+# Konfiguration für Debug-Skripte laden (wird per "source" eingebunden)
+# Nutzt das gecachte config.env; Python wird nur aufgerufen, wenn es fehlt
+# oder config.py / config_local.py neuer sind.
+CONFIG_ENV_FILE="$SCRIPT_DIR/config.env"
+# Workspace-Root selbst bestimmen (Skripte liegen in devel/debug), damit kein Aufrufer es vergessen kann
+PROJECT_ROOT="${PROJECT_ROOT:-$(dirname "$(dirname "$SCRIPT_DIR")")}"
+
+config_env_fresh() {
+    [ -f "$CONFIG_ENV_FILE" ] || return 1
+    local line
+    while IFS= read -r line; do
+        case "$line" in
+            "# source: "*)
+                [ "${line#\# source: }" -nt "$CONFIG_ENV_FILE" ] && return 1
+                ;;
+        esac
+    done < "$CONFIG_ENV_FILE"
+    return 0
+}
+
+if ! config_env_fresh; then
+    # Tools-Verzeichnis aus altem Env-File übernehmen, sonst Standard-Pfade probieren
+    if [ -f "$CONFIG_ENV_FILE" ]; then
+        TOOLS_DIR="$(sed -n "s/^TOOLS_DIR=//p" "$CONFIG_ENV_FILE" | tr -d "'")"
+    fi
+    for candidate in "$TOOLS_DIR" "$PROJECT_ROOT/.debug" "$PROJECT_ROOT/devel/debug-tools"; do
+        if [ -n "$candidate" ] && [ -f "$candidate/config.py" ]; then
+            TOOLS_DIR="$candidate"
+            break
+        fi
+    done
+    python3 "$TOOLS_DIR/config.py" --export-env "$CONFIG_ENV_FILE" --quiet >/dev/null
+fi
+
+source "$CONFIG_ENV_FILE"
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - SSH Session Manager
+
+Keeps one authenticated SSH master session per target open and lets all
+commands (tasks, scripts, pipeTransport) reuse it via OpenSSH connection
+multiplexing. The master closes itself after `ssh_control_persist` seconds
+of inactivity and is transparently re-established on the next command.
+
+Usage:
+    python3 ssh_session.py start          # Open master session
+    python3 ssh_session.py status         # Health check
+    python3 ssh_session.py stop           # Close master session
+    python3 ssh_session.py run -- <cmd>   # Run remote command (with latency)
+    python3 ssh_session.py latency        # Per-command latency statistics (Python tools only)
+    python3 ssh_session.py bench [-n N]   # Compare multiplexed vs. fresh connections
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, get_ssh_args, get_temp_dir
+
+# ============================================================================
+# MASTER SESSION HANDLING
+# ============================================================================
+
+def get_latency_log():
+    """Determines the file where per-command latencies are recorded."""
+    return os.path.join(get_temp_dir(), "ssh_latency.jsonl")
+
+def resolve_control_path():
+    """Resolves the expanded control socket path via 'ssh -G'."""
+    result = subprocess.run(["ssh", "-G"] + get_ssh_args(), capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition(" ")
+        if key == "controlpath" and value != "none":
+            return os.path.expanduser(value)
+    return None
+
+def is_master_alive():
+    """Checks whether the master session is running and responsive."""
+    result = subprocess.run(
+        ["ssh", "-O", "check"] + get_ssh_args(),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return result.returncode == 0
+
+def start_master(timeout=10, quiet=False):
+    """Starts a backgrounded master session. Returns True on success."""
+    control_path = resolve_control_path()
+    if control_path and os.path.exists(control_path) and not is_master_alive():
+        # Stale socket of a dead master (e.g. Pi rebooted) - remove before reconnecting
+        os.unlink(control_path)
+
+    # BatchMode: a missing key or unknown host key fails instead of waiting for a prompt
+    try:
+        result = subprocess.run(
+            ["ssh", "-o", "ControlMaster=yes", "-o", f"ConnectTimeout={timeout}", "-o", "BatchMode=yes",
+             "-N", "-f"] + get_ssh_args(),
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+            timeout=timeout * 2
+        )
+    except subprocess.TimeoutExpired:
+        if not quiet:
+            print(f"❌ Could not open SSH master session: no connection within {timeout * 2}s", file=sys.stderr)
+        return False
+    if result.returncode != 0:
+        if not quiet:
+            print(f"❌ Could not open SSH master session: {result.stderr.strip()}", file=sys.stderr)
+        return False
+    return True
+
+def stop_master():
+    """Closes the master session (if running)."""
+    if not is_master_alive():
+        return False
+    subprocess.run(["ssh", "-O", "exit"] + get_ssh_args(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return True
+
+def ensure_master(timeout=10, quiet=False):
+    """Health check with auto-reconnect. Returns True if a master session is usable."""
+    if not REMOTE_CONFIG.get("ssh_multiplex", True):
+        return False
+    if is_master_alive():
+        return True
+    return start_master(timeout, quiet)
+
+# ============================================================================
+# COMMAND EXECUTION
+# ============================================================================
+
+def record_latency(command, seconds, multiplexed, returncode):
+    """Appends a latency measurement to the latency log."""
+    entry = {
+        "time": time.time(),
+        "command": command.split()[0] if command else "",
+        "seconds": round(seconds, 4),
+        "multiplexed": multiplexed,
+        "returncode": returncode,
+    }
+    try:
+        with open(get_latency_log(), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError:
+        pass
+
+def run_remote(command, input=None, capture_output=True, timeout=None, text=True, verbose=False):
+    """
+    Runs a command on the remote host over the master session.
+    Returns the subprocess.CompletedProcess; latency is recorded in the latency log.
+    """
+    multiplexed = ensure_master()
+    start = time.monotonic()
+    result = subprocess.run(
+        ["ssh"] + get_ssh_args() + [command],
+        input=input, capture_output=capture_output, timeout=timeout, text=text
+    )
+    elapsed = time.monotonic() - start
+    record_latency(command, elapsed, multiplexed, result.returncode)
+    if verbose:
+        mode = "multiplexed" if multiplexed else "direct"
+        print(f"⏱️  {elapsed * 1000:.0f} ms ({mode})", file=sys.stderr)
+    return result
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def summarize_latencies(entries):
+    """Summarizes latency entries grouped by multiplexed/direct."""
+    summary = {}
+    for mode in (True, False):
+        values = [e["seconds"] for e in entries if e.get("multiplexed") == mode]
+        if values:
+            summary["multiplexed" if mode else "direct"] = {
+                "count": len(values),
+                "median_ms": round(statistics.median(values) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1),
+            }
+    return summary
+
+def print_latency_summary(summary):
+    """Prints a latency summary and the saving per command."""
+    for mode, stats in summary.items():
+        print(f"  {mode:12s} {stats['count']:4d} commands, median {stats['median_ms']:7.1f} ms, max {stats['max_ms']:7.1f} ms")
+    if "multiplexed" in summary and "direct" in summary:
+        saved = summary["direct"]["median_ms"] - summary["multiplexed"]["median_ms"]
+        print(f"  💡 Saving per command: {saved:.1f} ms")
+
+def load_latency_log():
+    """Loads all recorded latency entries."""
+    entries = []
+    if os.path.exists(get_latency_log()):
+        with open(get_latency_log()) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    return entries
+
+def benchmark(rounds):
+    """Measures round trips with a fresh connection vs. the master session."""
+    entries = []
+    for _ in range(rounds):
+        start = time.monotonic()
+        result = subprocess.run(
+            ["ssh", "-o", "ControlPath=none"] + get_ssh_args() + ["true"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        entries.append({"seconds": time.monotonic() - start, "multiplexed": False, "returncode": result.returncode})
+
+    if not ensure_master():
+        print("❌ Master session not available (ssh_multiplex disabled or connection failed)")
+        return None
+    for _ in range(rounds):
+        start = time.monotonic()
+        result = subprocess.run(["ssh"] + get_ssh_args() + ["true"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        entries.append({"seconds": time.monotonic() - start, "multiplexed": True, "returncode": result.returncode})
+    return summarize_latencies(entries)
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower SSH session manager")
+    sub = parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("start", help="Open master session")
+    sub.add_parser("stop", help="Close master session")
+    sub.add_parser("status", help="Health check of the master session")
+    run_parser = sub.add_parser("run", help="Run a remote command over the master session")
+    run_parser.add_argument("remote_command", nargs=argparse.REMAINDER)
+    sub.add_parser("latency", help="Show recorded per-command latencies")
+    bench_parser = sub.add_parser("bench", help="Compare fresh connections with the master session")
+    bench_parser.add_argument("-n", "--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.action == "start":
+        if ensure_master():
+            print("✅ SSH master session is open")
+            return 0
+        return 1
+    if args.action == "stop":
+        print("✅ SSH master session closed" if stop_master() else "ℹ️  No SSH master session running")
+        return 0
+    if args.action == "status":
+        if is_master_alive():
+            print(f"✅ SSH master session alive ({resolve_control_path()})")
+            return 0
+        print("⚠️  No SSH master session running")
+        return 1
+    if args.action == "run":
+        # Only the leading "--" separates our options from the remote command
+        remote_command = args.remote_command
+        if remote_command[:1] == ["--"]:
+            remote_command = remote_command[1:]
+        command = " ".join(remote_command)
+        result = run_remote(command, capture_output=False, verbose=True)
+        return result.returncode
+    if args.action == "latency":
+        summary = summarize_latencies(load_latency_log())
+        if not summary:
+            print("ℹ️  No latencies recorded yet")
+            return 0
+        print("⏱️  SSH command latency:")
+        print_latency_summary(summary)
+        # Only run_remote() records - VS Code tasks and shell scripts calling ssh directly are not included
+        print("  ℹ️  Covers the Python tools (run_remote); direct ssh calls of tasks/scripts are not recorded")
+        return 0
+    if args.action == "bench":
+        summary = benchmark(args.rounds)
+        if summary is None:
+            return 1
+        print(f"⏱️  SSH round trips ({args.rounds} each):")
+        print_latency_summary(summary)
+        return 0
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
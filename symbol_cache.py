@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Symbol Cache
+
+Mirrors the remote binaries of the DEBUG_PROGRAMS entries and their shared
+library dependencies (devel/lib, /opt/ros/noetic/lib, system libraries) into a
+local sysroot, indexed by ELF build-id:
+- one remote inventory call lists all objects with their build-ids
+- only objects whose build-id changed are transferred (one compressed stream)
+- a .build-id/ directory lets gdb find objects by build-id
+- the least recently used objects are evicted when the size cap is exceeded
+
+The gdbserver launch configurations point gdb's sysroot and solib-search-path
+at this cache, so debug sessions after the first start without bulk transfers.
+
+Usage:
+    python3 symbol_cache.py sync [program ...]   # Update cache (default: all debug programs)
+    python3 symbol_cache.py status               # Cache size and object count
+    python3 symbol_cache.py evict                # Enforce the size cap
+    python3 symbol_cache.py lookup <build-id>    # Find a cached object by build-id
+"""
+
+import argparse
+import inspect
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, detect_project_binaries, get_cache_dir, get_ros_environment, get_ssh_args, get_target_id
+import ssh_session
+
+# ============================================================================
+# ELF BUILD-ID (also executed on the Pi - keep free of module dependencies)
+# ============================================================================
+
+def elf_build_id(read):
+    """Extracts the GNU build-id from an ELF image. read(offset, size) returns bytes."""
+    import struct
+    ident = read(0, 16)
+    if len(ident) < 16 or ident[:4] != b"\x7fELF":
+        return None
+    is64 = ident[4] == 2
+    endian = "<" if ident[5] == 1 else ">"
+    if is64:
+        phoff = struct.unpack(endian + "Q", read(32, 8))[0]
+        phentsize, phnum = struct.unpack(endian + "HH", read(54, 4))
+    else:
+        phoff = struct.unpack(endian + "I", read(28, 4))[0]
+        phentsize, phnum = struct.unpack(endian + "HH", read(42, 4))
+
+    for i in range(phnum):
+        header = read(phoff + i * phentsize, phentsize)
+        if len(header) < phentsize or struct.unpack(endian + "I", header[:4])[0] != 4:  # PT_NOTE
+            continue
+        if is64:
+            offset, filesz = struct.unpack(endian + "Q", header[8:16])[0], struct.unpack(endian + "Q", header[32:40])[0]
+        else:
+            offset, filesz = struct.unpack(endian + "I", header[4:8])[0], struct.unpack(endian + "I", header[16:20])[0]
+        notes = read(offset, filesz)
+        pos = 0
+        while pos + 12 <= len(notes):
+            namesz, descsz, note_type = struct.unpack(endian + "III", notes[pos:pos + 12])
+            name_start = pos + 12
+            desc_start = name_start + ((namesz + 3) & ~3)
+            if note_type == 3 and notes[name_start:name_start + namesz].rstrip(b"\0") == b"GNU":  # NT_GNU_BUILD_ID
+                return notes[desc_start:desc_start + descsz].hex()
+            pos = desc_start + ((descsz + 3) & ~3)
+    return None
+
+def read_build_id(path):
+    """Reads the GNU build-id of an ELF file (None if missing, not ELF or truncated)."""
+    import struct
+    try:
+        with open(path, "rb") as f:
+            def read(offset, size):
+                f.seek(offset)
+                return f.read(size)
+            return elf_build_id(read)
+    except (OSError, ValueError, struct.error):
+        # struct.error: truncated header, e.g. a binary being relinked right now
+        return None
+
+def remote_inventory(binaries):
+    """Lists binaries plus their shared libraries with build-id and size as JSON (runs on the Pi)."""
+    import json
+    import os
+    import subprocess
+    objects = {}
+    for binary in binaries:
+        paths = [binary]
+        try:
+            output = subprocess.run(["ldd", binary], capture_output=True, text=True).stdout
+        except OSError:
+            output = ""
+        for line in output.splitlines():
+            parts = line.split("=>")
+            target = (parts[1] if len(parts) > 1 else parts[0]).strip().split(" (")[0].strip()
+            if target.startswith("/"):
+                paths.append(target)
+        for path in paths:
+            if path in objects or not os.path.isfile(path):
+                continue
+            try:
+                objects[path] = {"build_id": read_build_id(path), "size": os.stat(path).st_size}
+            except OSError:
+                continue  # Removed meanwhile (relink)
+    print(json.dumps(objects))
+
+def get_remote_inventory_script(binaries):
+    """Python script (for 'python3 -' on the Pi) printing the inventory of the given binaries."""
+    sources = [inspect.getsource(f) for f in (elf_build_id, read_build_id, remote_inventory)]
+    return "\n".join(sources) + f"\nremote_inventory({binaries!r})\n"
+
+# ============================================================================
+# CACHE LAYOUT
+# ============================================================================
+
+def get_cache_root():
+    """Determines the symbol cache directory of the current target (fleet targets differ at the same paths)."""
+    cache_root = os.path.join(get_cache_dir(), "symbols", get_target_id())
+    os.makedirs(cache_root, exist_ok=True)
+    return cache_root
+
+def get_sysroot():
+    """Local sysroot mirror (remote absolute paths below it)."""
+    sysroot = os.path.join(get_cache_root(), "sysroot")
+    os.makedirs(sysroot, exist_ok=True)
+    return sysroot
+
+def get_debug_file_directory():
+    """Directory with .build-id/xx/yyyy.debug links (gdb debug-file-directory)."""
+    return os.path.join(get_cache_root(), "debug")
+
+def get_solib_search_path():
+    """solib-search-path entries inside the sysroot."""
+    sysroot = get_sysroot()
+    return ":".join([
+        sysroot + f"{REMOTE_CONFIG['workspace']}/devel/lib",
+        sysroot + "/opt/ros/noetic/lib",
+    ])
+
+def get_gdb_setup_commands():
+    """gdb commands pointing the local debugger at the cache."""
+    return [
+        f"set sysroot {get_sysroot()}",
+        f"set solib-search-path {get_solib_search_path()}",
+        f"set debug-file-directory {get_debug_file_directory()}",
+    ]
+
+def get_index_path():
+    """Determines the cache index file."""
+    return os.path.join(get_cache_root(), "symbol_index.json")
+
+def load_index():
+    """Loads the cache index {remote path: {build_id, size, last_used}}."""
+    try:
+        with open(get_index_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_index(index):
+    """Writes the cache index atomically."""
+    with open(get_index_path() + ".tmp", "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(get_index_path() + ".tmp", get_index_path())
+
+def get_local_path(remote_path):
+    """Local path of a remote object inside the sysroot."""
+    return get_sysroot() + remote_path
+
+def get_build_id_link(build_id):
+    """Path of the .build-id link for a build-id."""
+    return os.path.join(get_debug_file_directory(), ".build-id", build_id[:2], build_id[2:] + ".debug")
+
+def get_object_key(info):
+    """Identity of an object version: the build-id (size for objects without build-id)."""
+    return info["build_id"] or f"size:{info['size']}"
+
+# ============================================================================
+# SYNC AND EVICTION
+# ============================================================================
+
+def get_program_binaries(names=None):
+    """Remote binary paths of the selected debug programs."""
+    programs = detect_project_binaries()
+    if names:
+        programs = [p for p in programs if p["name"] in names]
+    return [f"{REMOTE_CONFIG['workspace']}/devel/lib/{p['path']}" for p in programs]
+
+def fetch_objects(paths):
+    """Transfers remote objects as one compressed tar stream into the sysroot. Returns bytes received."""
+    ssh_session.ensure_master(quiet=True)
+    quoted = " ".join(shlex.quote(p) for p in paths)
+    process = subprocess.Popen(
+        ["ssh"] + get_ssh_args() + [f"tar czhPf - -- {quoted}"],
+        stdout=subprocess.PIPE
+    )
+    received = 0
+    with tarfile.open(fileobj=process.stdout, mode="r|gz") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            remote_path = "/" + member.name.lstrip("/")
+            if ".." in remote_path.split("/"):
+                continue
+            local_path = get_local_path(remote_path)
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            with open(local_path + ".tmp", "wb") as f:
+                shutil.copyfileobj(tar.extractfile(member), f)
+            os.replace(local_path + ".tmp", local_path)
+            os.chmod(local_path, 0o755)
+            received += member.size
+    if process.wait() != 0:
+        raise RuntimeError(f"remote tar failed (exit code {process.returncode})")
+    return received
+
+def link_build_id(remote_path, build_id):
+    """Creates the .build-id link of a cached object."""
+    link = get_build_id_link(build_id)
+    os.makedirs(os.path.dirname(link), exist_ok=True)
+    if os.path.lexists(link):
+        os.unlink(link)
+    os.symlink(get_local_path(remote_path), link)
+
+def remove_object(remote_path, info):
+    """Removes a cached object and its build-id link."""
+    for path in (get_local_path(remote_path), get_build_id_link(info["build_id"]) if info.get("build_id") else None):
+        if path and os.path.lexists(path):
+            os.unlink(path)
+
+def evict(index, keep=()):
+    """Evicts least recently used objects until the cache fits the size cap. Returns evicted paths."""
+    max_bytes = int(REMOTE_CONFIG.get("symbol_cache_max_mb", 2048)) * 1024 * 1024
+    total = sum(info["size"] for info in index.values())
+    evicted = []
+    for remote_path, info in sorted(index.items(), key=lambda item: item[1].get("last_used", 0)):
+        if total <= max_bytes:
+            break
+        if remote_path in keep:
+            continue
+        remove_object(remote_path, info)
+        total -= info["size"]
+        evicted.append(remote_path)
+    for remote_path in evicted:
+        del index[remote_path]
+    return evicted
+
+def sync(program_names=None, verbose=True):
+    """Updates the cache for the selected programs. Returns a statistics dict."""
+    start = time.monotonic()
+    binaries = get_program_binaries(program_names)
+    library_path = get_ros_environment()["LD_LIBRARY_PATH"]
+    result = ssh_session.run_remote(
+        f"LD_LIBRARY_PATH={shlex.quote(library_path)} python3 -",
+        input=get_remote_inventory_script(binaries)
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"remote inventory failed: {result.stderr.strip()}")
+    inventory = json.loads(result.stdout)
+
+    index = load_index()
+    stale = [path for path, info in inventory.items()
+             if path not in index or get_object_key(index[path]) != get_object_key(info)
+             or not os.path.exists(get_local_path(path))]
+
+    # Drop outdated versions first (the new object is written to the same sysroot path)
+    for path in stale:
+        if path in index:
+            remove_object(path, index.pop(path))
+    received = fetch_objects(stale) if stale else 0
+    now = time.time()
+    for path, info in inventory.items():
+        if path in stale and os.path.exists(get_local_path(path)) and info["build_id"]:
+            link_build_id(path, info["build_id"])
+        index[path] = {"build_id": info["build_id"], "size": info["size"], "last_used": now}
+    evicted = evict(index, keep=set(inventory))
+    save_index(index)
+
+    stats = {
+        "objects": len(inventory),
+        "fetched": len(stale),
+        "received_bytes": received,
+        "cached_bytes": sum(info["size"] for path, info in inventory.items() if path not in stale),
+        "evicted": len(evicted),
+        "seconds": round(time.monotonic() - start, 2),
+    }
+    if verbose:
+        print(f"📦 Symbol cache: {stats['objects']} objects, {stats['fetched']} fetched "
+              f"({stats['received_bytes'] / 1e6:.1f} MB), {stats['cached_bytes'] / 1e6:.1f} MB reused, "
+              f"{stats['evicted']} evicted in {stats['seconds']:.2f}s")
+    return stats
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower debug symbol cache")
+    sub = parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("sync").add_argument("programs", nargs="*")
+    sub.add_parser("status")
+    sub.add_parser("evict")
+    sub.add_parser("lookup").add_argument("build_id")
+    args = parser.parse_args()
+
+    if args.action == "sync":
+        try:
+            sync(args.programs or None)
+        except RuntimeError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        return 0
+    index = load_index()
+    if args.action == "status":
+        total = sum(info["size"] for info in index.values())
+        print(f"📦 {len(index)} objects, {total / 1e6:.1f} MB "
+              f"(cap {REMOTE_CONFIG.get('symbol_cache_max_mb', 2048)} MB) in {get_cache_root()}")
+        return 0
+    if args.action == "evict":
+        evicted = evict(index)
+        save_index(index)
+        print(f"🗑️  {len(evicted)} objects evicted")
+        return 0
+    if args.action == "lookup":
+        for remote_path, info in index.items():
+            if info.get("build_id") == args.build_id:
+                print(get_local_path(remote_path))
+                return 0
+        return 1
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Web UI Telemetry Bridge
+
+Publishes the state of the debug session to the mosquitto broker started by
+start_web_ui.sh (port 1883), so the web UI can show it live:
+- node health of the DEBUG_PROGRAMS processes on the Pi: alive, restart
+  count, CPU and RSS (one long-running sampler on the Pi, reusing the
+  /proc readers of resource_agent.py)
+- result of the last deploy (deploy.py) and of the last remote build (build_planner.py)
+- tunnel status (tunnel_supervisor.py)
+
+Updates are coalesced: the flat state (keys like "nodes/mower_logic/cpu") is
+compared with what was last published, and at most `telemetry_rate_hz`
+batched delta messages per second carry the changed keys only. Numeric noise
+below a deadband is not sent. A retained keyframe with the full state is
+published every `telemetry_keyframe_seconds`. New web UI clients start from
+the keyframe and apply the deltas after its sequence number.
+
+Topics (prefix `telemetry_topic`):
+    <prefix>/telemetry/state    retained keyframe  {"seq", "t", "state": {key: value}}
+    <prefix>/telemetry/delta    batched update     {"seq", "t", "set": {key: value}, "del": [key]}
+    <prefix>/telemetry/status   retained "online" / "offline" (last will)
+
+The MQTT 3.1.1 client is built in (QoS 0, no dependencies).
+
+Usage:
+    python3 telemetry_bridge.py                            # Publish to the broker on the Pi
+    python3 telemetry_bridge.py --local --broker localhost # Sample local processes, local broker
+    python3 telemetry_bridge.py watch                      # Subscribe and show the reconstructed state
+"""
+
+import argparse
+import collections
+import inspect
+import json
+import os
+import select
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import DEBUG_PROGRAMS, REMOTE_CONFIG, get_ssh_args
+import build_planner
+import deploy
+import resource_agent
+import ssh_session
+import tunnel_supervisor
+
+# Node sampling interval on the Pi (independent of the publish rate)
+HEALTH_INTERVAL = 1.0
+RECONNECT_DELAYS = [1, 2, 5, 10, 30]
+MQTT_KEEPALIVE = 30
+
+# Changes smaller than this are not published (matched against the end of the key)
+DEADBANDS = {
+    "/cpu": 2.0,        # percent of one core
+    "/rss_mb": 1.0,
+    "/rtt_ms": 5.0,
+    "/uptime_s": 60.0,
+}
+
+# MQTT control packet types
+CONNECT, CONNACK, PUBLISH, SUBSCRIBE, SUBACK, PINGREQ, PINGRESP, DISCONNECT = 1, 2, 3, 8, 9, 12, 13, 14
+
+# ============================================================================
+# MQTT 3.1.1 CLIENT (QoS 0)
+# ============================================================================
+
+def encode_length(length):
+    """Encodes the MQTT remaining length (variable byte integer)."""
+    data = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        data.append(byte | (0x80 if length else 0))
+        if not length:
+            return bytes(data)
+
+def encode_string(value):
+    """Encodes a length-prefixed UTF-8 string."""
+    data = value.encode() if isinstance(value, str) else value
+    return struct.pack("!H", len(data)) + data
+
+class MqttClient:
+    """Minimal MQTT 3.1.1 client on a plain socket: connect, QoS 0 publish/subscribe, keepalive."""
+
+    def __init__(self, host, port, client_id, will=None, keepalive=MQTT_KEEPALIVE):
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.will = will
+        self.keepalive = keepalive
+        self.sock = None
+        self.buffer = b""
+        self.last_sent = 0.0
+        self.sent_bytes = 0
+        self.sent_messages = 0
+
+    def send_packet(self, packet_type, flags, body):
+        """Sends one control packet."""
+        data = bytes([packet_type << 4 | flags]) + encode_length(len(body)) + body
+        self.sock.sendall(data)
+        self.last_sent = time.monotonic()
+        self.sent_bytes += len(data)
+
+    def read_packet(self, timeout):
+        """Reads one packet. Returns (type, flags, body), None on timeout; raises ConnectionError on EOF."""
+        deadline = time.monotonic() + timeout
+        while True:
+            if len(self.buffer) >= 2:
+                length, multiplier, offset = 0, 1, 1
+                while offset < len(self.buffer) and offset <= 4:
+                    byte = self.buffer[offset]
+                    length += (byte & 0x7F) * multiplier
+                    multiplier *= 128
+                    offset += 1
+                    if not byte & 0x80:
+                        if len(self.buffer) >= offset + length:
+                            header = self.buffer[0]
+                            body = self.buffer[offset:offset + length]
+                            self.buffer = self.buffer[offset + length:]
+                            return header >> 4, header & 0x0F, body
+                        break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.sock], [], [], remaining)[0]:
+                return None
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionError("broker closed the connection")
+            self.buffer += data
+
+    def connect(self, timeout=5.0):
+        """Opens the connection and waits for CONNACK."""
+        self.sock = socket.create_connection((self.host, self.port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = b""
+        flags = 0x02  # clean session
+        payload = encode_string(self.client_id)
+        if self.will:
+            topic, message, retain = self.will
+            flags |= 0x04 | (0x20 if retain else 0)
+            payload += encode_string(topic) + encode_string(message)
+        self.send_packet(CONNECT, 0, encode_string("MQTT") + bytes([4, flags]) + struct.pack("!H", self.keepalive) + payload)
+        packet = self.read_packet(timeout)
+        if packet is None or packet[0] != CONNACK:
+            raise ConnectionError("no CONNACK from broker")
+        if packet[2][1] != 0:
+            raise ConnectionError(f"broker refused the connection (code {packet[2][1]})")
+
+    def publish(self, topic, payload, retain=False):
+        """Publishes a message with QoS 0."""
+        data = payload.encode() if isinstance(payload, str) else payload
+        self.send_packet(PUBLISH, 0x01 if retain else 0, encode_string(topic) + data)
+        self.sent_messages += 1
+
+    def subscribe(self, topic, timeout=5.0):
+        """Subscribes with QoS 0 and waits for SUBACK."""
+        self.send_packet(SUBSCRIBE, 0x02, struct.pack("!H", 1) + encode_string(topic) + bytes([0]))
+        while True:
+            packet = self.read_packet(timeout)
+            if packet is None:
+                raise ConnectionError("no SUBACK from broker")
+            if packet[0] == SUBACK:
+                return
+
+    def ping_if_idle(self):
+        """Sends PINGREQ when nothing was sent for half the keepalive interval."""
+        if time.monotonic() - self.last_sent > self.keepalive / 2:
+            self.send_packet(PINGREQ, 0, b"")
+
+    def service(self):
+        """Keeps the connection alive and drops incoming packets (PINGRESP) of a publish-only client."""
+        self.ping_if_idle()
+        while self.read_packet(0) is not None:
+            pass
+
+    def close(self):
+        """Disconnects cleanly (the last will is not sent)."""
+        if self.sock:
+            try:
+                self.send_packet(DISCONNECT, 0, b"")
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+
+def parse_publish(flags, body):
+    """Splits a PUBLISH body into (topic, payload)."""
+    length = struct.unpack("!H", body[:2])[0]
+    offset = 2 + length + (2 if flags & 0x06 else 0)
+    return body[2:2 + length].decode(), body[offset:]
+
+# ============================================================================
+# NODE HEALTH SAMPLER (runs on the Pi - keep free of module dependencies)
+# ============================================================================
+
+def stream_health(names, interval):
+    """Prints one JSON line per interval: alive, restarts, CPU % and RSS of each program."""
+    import json
+    clk_tck = os.sysconf("SC_CLK_TCK")
+    pids = {}
+    last_pid = {}
+    restarts = [0] * len(names)
+    previous = {}
+    next_resolve = 0.0
+    last = time.monotonic()
+    while True:
+        now = time.monotonic()
+        elapsed = max(now - last, 1e-3)
+        last = now
+        if now >= next_resolve:
+            pids = resolve_pids(names)
+            next_resolve = now + RESOLVE_INTERVAL
+        nodes = {}
+        for index, name in enumerate(names):
+            pid = pids.get(index)
+            sample = sample_process(pid) if pid else None
+            if pid and sample is None:
+                # Gone: look again right away, a restarted node has a new PID
+                pid = resolve_pids([name]).get(0)
+                sample = sample_process(pid) if pid else None
+            if pid and sample:
+                pids[index] = pid
+                if last_pid.get(index, pid) != pid:
+                    restarts[index] += 1
+                last_pid[index] = pid
+                cpu = 100.0 * (sample[0] - previous[pid][0]) / clk_tck / elapsed if pid in previous else 0.0
+                previous[pid] = sample
+                nodes[name] = {"alive": True, "pid": pid, "restarts": restarts[index],
+                               "cpu": round(cpu, 1), "rss_mb": round(sample[1] / 1024.0, 1)}
+            else:
+                pids.pop(index, None)
+                nodes[name] = {"alive": False, "pid": 0, "restarts": restarts[index], "cpu": 0.0, "rss_mb": 0.0}
+        print(json.dumps({"t": round(time.time(), 2), "nodes": nodes}), flush=True)
+        time.sleep(max(0.0, interval - (time.monotonic() - now)))
+
+def get_health_script(names, interval):
+    """Python script with the sampler and the /proc readers of resource_agent.py."""
+    parts = [resource_agent.read_proc, resource_agent.resolve_pids, resource_agent.sample_process, stream_health]
+    source = ("import os\nimport time\n\n" + f"RESOLVE_INTERVAL = {resource_agent.RESOLVE_INTERVAL}\n\n"
+              + "\n".join(inspect.getsource(p) for p in parts))
+    return source + f"\nstream_health({names!r}, {interval!r})\n"
+
+def run_health_stream(state, names, local, stop):
+    """Feeds the node health into the state; the sampler is restarted when the connection drops."""
+    attempt = 0
+    while not stop.is_set():
+        if local:
+            command = [sys.executable, "-u", "-"]
+        else:
+            ssh_session.ensure_master(quiet=True)
+            command = ["ssh"] + get_ssh_args() + ["python3 -u -"]
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL, text=True)
+        process.stdin.write(get_health_script(names, HEALTH_INTERVAL))
+        process.stdin.close()
+        state.update("health", {"connected": True})
+        for line in process.stdout:
+            if stop.is_set():
+                break
+            try:
+                sample = json.loads(line)
+            except ValueError:
+                continue
+            attempt = 0
+            state.update("nodes", sample["nodes"])
+        process.kill()
+        process.wait()
+        state.update("health", {"connected": False})
+        if stop.wait(RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)]):
+            return
+        attempt += 1
+
+# ============================================================================
+# STATE COALESCING
+# ============================================================================
+
+def flatten(prefix, value, out):
+    """Flattens nested dicts into "a/b/c" keys."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flatten(f"{prefix}/{key}", item, out)
+    else:
+        out[prefix] = value
+    return out
+
+def is_within_deadband(key, old, new):
+    """Checks whether a numeric change is too small to be published."""
+    if isinstance(old, bool) or isinstance(new, bool) or not isinstance(old, (int, float)) \
+            or not isinstance(new, (int, float)):
+        return False
+    for suffix, band in DEADBANDS.items():
+        if key.endswith(suffix):
+            return abs(new - old) < band
+    return False
+
+class TelemetryState:
+    """Flat telemetry state; sources update it at any rate, the publisher takes coalesced deltas."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = {}
+        self.published = {}
+        self.seq = 0
+        self.updates = 0
+
+    def update(self, prefix, values):
+        """Replaces the subtree below prefix with the given (nested) values."""
+        flat = flatten(prefix, values, {})
+        with self.lock:
+            for key in [k for k in self.current if k.startswith(prefix + "/") and k not in flat]:
+                del self.current[key]
+            self.current.update(flat)
+            self.updates += 1
+
+    def take_delta(self):
+        """Returns the changes since the last publish as {"seq", "t", "set", "del"} (None if nothing changed)."""
+        with self.lock:
+            changed = {key: value for key, value in self.current.items()
+                       if key not in self.published or (self.published[key] != value
+                                                        and not is_within_deadband(key, self.published[key], value))}
+            deleted = sorted(key for key in self.published if key not in self.current)
+            if not changed and not deleted:
+                return None
+            self.published.update(changed)
+            for key in deleted:
+                del self.published[key]
+            self.seq += 1
+            return {"seq": self.seq, "t": round(time.time(), 2), "set": changed, "del": deleted}
+
+    def take_keyframe(self):
+        """Returns the full state; deltas after it are relative to this state."""
+        with self.lock:
+            self.published = dict(self.current)
+            return {"seq": self.seq, "t": round(time.time(), 2), "state": dict(self.current)}
+
+# ============================================================================
+# LOCAL SOURCES (deploy/build history, tunnel status)
+# ============================================================================
+
+def read_last_entry(path):
+    """Last JSON line of a history file (None if missing)."""
+    try:
+        with open(path) as f:
+            lines = collections.deque((line for line in f if line.strip()), maxlen=1)
+    except OSError:
+        return None
+    return json.loads(lines[0]) if lines else None
+
+def get_deploy_values(entry):
+    """Telemetry values of a deploy history entry."""
+    return {"ok": entry["ok"], "time": round(entry["time"]), "full": entry.get("full", False),
+            "changed": entry.get("changed"), "stages": entry.get("stages", {})}
+
+def get_build_values(entry):
+    """Telemetry values of a build history entry."""
+    values = {"ok": entry["ok"], "time": round(entry["time"]), "full": entry["full"], "reason": entry["reason"],
+              "total_s": entry["total"], "packages": len(entry["timings"]), "skipped": len(entry["skipped"])}
+    if entry.get("ccache"):
+        values["ccache_hit_rate"] = entry["ccache"]["hit_rate"]
+    return values
+
+def get_tunnel_values():
+    """Telemetry values of the tunnel supervisor."""
+    status = tunnel_supervisor.load_status()
+    running = tunnel_supervisor.read_pid() is not None
+    if not status:
+        return {"running": running, "state": "not running"}
+    return {
+        "running": running,
+        "state": status["state"] if running else "not running",
+        "uptime_s": status["uptime_s"],
+        "reconnects": status["reconnects"],
+        "rtt_ms": status["rtt_ms"]["last"],
+        "forwards": {port: bool(forward["local"] and running) for port, forward in status["forwards"].items()},
+    }
+
+def poll_local_sources(state, mtimes):
+    """Updates the state from the history and status files that changed since the last poll."""
+    sources = [
+        ("deploy", deploy.get_history_path(), lambda path: get_deploy_values(read_last_entry(path))),
+        ("build", build_planner.get_history_path(), lambda path: get_build_values(read_last_entry(path))),
+        ("tunnel", tunnel_supervisor.get_status_file(), lambda path: get_tunnel_values()),
+    ]
+    for name, path, load in sources:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if name == "tunnel" or mtime != mtimes.get(name):
+            # The tunnel state also depends on the supervisor process, not only on its file
+            mtimes[name] = mtime
+            if mtime is not None or name == "tunnel":
+                try:
+                    state.update(name, load(path))
+                except (ValueError, KeyError, TypeError):
+                    pass
+
+# ============================================================================
+# BRIDGE
+# ============================================================================
+
+def get_broker(args):
+    """Broker (host, port) from arguments and config."""
+    host = args.broker or ("localhost" if args.local else REMOTE_CONFIG["host"])
+    if ":" in host:
+        host, port = host.rsplit(":", 1)
+        return host, int(port)
+    return host, REMOTE_CONFIG.get("mqtt_port", 1883)
+
+def connect_with_retry(client, stop):
+    """Connects to the broker, retrying with backoff. Returns False if stopped."""
+    attempt = 0
+    while not stop.is_set():
+        try:
+            client.connect()
+            return True
+        except OSError as e:
+            delay = RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)]
+            print(f"⚠️  Broker {client.host}:{client.port} not reachable ({e}) - retry in {delay}s", file=sys.stderr)
+            attempt += 1
+            stop.wait(delay)
+    return False
+
+def run_bridge(args):
+    """Publishes coalesced telemetry until interrupted. Returns the exit code."""
+    host, port = get_broker(args)
+    prefix = REMOTE_CONFIG.get("telemetry_topic", "openmower/debug") + "/telemetry"
+    rate_hz = args.rate or REMOTE_CONFIG.get("telemetry_rate_hz", 1.0)
+    keyframe_seconds = REMOTE_CONFIG.get("telemetry_keyframe_seconds", 30)
+    names = args.programs or [prog["name"] for prog in DEBUG_PROGRAMS]
+
+    state = TelemetryState()
+    stop = threading.Event()
+    threading.Thread(target=run_health_stream, args=(state, names, args.local, stop), daemon=True).start()
+    client = MqttClient(host, port, f"openmower-debug-{os.getpid()}", will=(f"{prefix}/status", "offline", True))
+    print(f"📡 Telemetry → mqtt://{host}:{port}/{prefix}/# (max {rate_hz} updates/s, {len(names)} nodes)")
+
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    # Stopped like Ctrl+C (VS Code task termination), so the retained status says "offline"
+    signal.signal(signal.SIGTERM, interrupt)
+    mtimes = {}
+    deltas = keyframes = 0
+    started = time.monotonic()
+    next_keyframe = 0.0
+    connected = False
+    try:
+        while not args.duration or time.monotonic() - started < args.duration:
+            tick = time.monotonic()
+            poll_local_sources(state, mtimes)
+            try:
+                if not connected:
+                    if not connect_with_retry(client, stop):
+                        break
+                    client.publish(f"{prefix}/status", "online", retain=True)
+                    connected = True
+                    next_keyframe = 0.0
+                if tick >= next_keyframe:
+                    client.publish(f"{prefix}/state", json.dumps(state.take_keyframe(), separators=(",", ":")), retain=True)
+                    keyframes += 1
+                    next_keyframe = tick + keyframe_seconds
+                else:
+                    delta = state.take_delta()
+                    if delta:
+                        client.publish(f"{prefix}/delta", json.dumps(delta, separators=(",", ":")))
+                        deltas += 1
+                client.service()
+            except OSError as e:
+                print(f"⚠️  Broker connection lost ({e}) - reconnecting", file=sys.stderr)
+                if client.sock:
+                    client.sock.close()
+                    client.sock = None
+                connected = False
+            time.sleep(max(0.0, 1.0 / rate_hz - (time.monotonic() - tick)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        if connected:
+            try:
+                client.publish(f"{prefix}/status", "offline", retain=True)
+            except OSError:
+                pass
+            client.close()
+
+    seconds = max(time.monotonic() - started, 1e-6)
+    print(f"\n📊 {state.updates} source updates coalesced into {deltas} deltas + {keyframes} keyframes, "
+          f"{client.sent_bytes / 1024:.1f} KB ({client.sent_bytes / seconds:.0f} B/s, "
+          f"{client.sent_messages / seconds:.2f} msg/s)")
+    return 0
+
+def watch(args):
+    """Subscribes to the telemetry and prints the state reconstructed from keyframe and deltas."""
+    host, port = get_broker(args)
+    prefix = REMOTE_CONFIG.get("telemetry_topic", "openmower/debug") + "/telemetry"
+    client = MqttClient(host, port, f"openmower-debug-watch-{os.getpid()}")
+    try:
+        client.connect()
+        client.subscribe(f"{prefix}/#")
+    except OSError as e:
+        print(f"❌ Broker {host}:{port}: {e}", file=sys.stderr)
+        return 1
+    print(f"👀 Watching mqtt://{host}:{port}/{prefix}/#")
+    state = {}
+    seq = None
+    started = time.monotonic()
+    try:
+        while not args.duration or time.monotonic() - started < args.duration:
+            packet = client.read_packet(1.0)
+            client.ping_if_idle()
+            if packet is None or packet[0] != PUBLISH:
+                continue
+            topic, payload = parse_publish(packet[1], packet[2])
+            if topic.endswith("/status"):
+                print(f"🔌 bridge {payload.decode()}")
+                continue
+            message = json.loads(payload)
+            if topic.endswith("/state"):
+                state, seq = dict(message["state"]), message["seq"]
+                print(f"🧊 keyframe #{seq}: {len(state)} keys")
+            elif topic.endswith("/delta"):
+                if seq is None or message["seq"] <= seq:
+                    continue
+                if message["seq"] != seq + 1:
+                    # Missed a delta (QoS 0) - the next keyframe resynchronizes
+                    print(f"⚠️  gap before delta #{message['seq']} - waiting for keyframe")
+                    seq = None
+                    continue
+                seq = message["seq"]
+                state.update(message["set"])
+                for key in message["del"]:
+                    state.pop(key, None)
+                changes = ", ".join(f"{key}={value}" for key, value in sorted(message["set"].items()))
+                print(f"Δ #{seq}: {changes}{' -' + ','.join(message['del']) if message['del'] else ''}")
+    except (KeyboardInterrupt, ConnectionError):
+        pass
+    finally:
+        client.close()
+    return 0
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower telemetry bridge to the web UI MQTT broker")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "watch"])
+    parser.add_argument("--broker", help="Broker host[:port] (default: Pi host, mqtt_port)")
+    parser.add_argument("--programs", nargs="+", help="Program names (default: all DEBUG_PROGRAMS)")
+    parser.add_argument("--rate", type=float, help="Max delta messages per second (default: telemetry_rate_hz)")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after N seconds (0 = until Ctrl+C)")
+    parser.add_argument("--local", action="store_true", help="Sample processes on the dev machine, broker on localhost")
+    args = parser.parse_args()
+    return watch(args) if args.command == "watch" else run_bridge(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Tooling Benchmark
+
+Measures the overhead of the debug tooling itself: configuration loading,
+binary detection, VS Code config generation, the rsync command, the
+connection probes, delta sync, build planning and the deploy pipeline.
+
+Each run creates a synthetic OpenMower-shaped workspace (configurable number
+of packages and files), copies the tools into its devel/debug-tools and runs
+the benchmarks there in a separate process against a stand-in "Pi":
+- shim (default): an ssh stand-in that runs the remote commands locally
+- sshd: the real ssh client against a local sshd (key login required)
+Both go through an ssh wrapper that injects the delay of a latency profile.
+
+Results are written as JSON; `compare` flags regressions between two runs,
+e.g. of two versions of this repository.
+
+Usage:
+    python3 tooling_bench.py run                                # Default workspace, no latency
+    python3 tooling_bench.py run --packages 60 --files 40 --latency wifi
+    python3 tooling_bench.py run --ssh sshd --ssh-key ~/.ssh/id_ed25519 --output before.json
+    python3 tooling_bench.py compare before.json after.json     # Exit 1 on regression
+"""
+
+import argparse
+import asyncio
+import contextlib
+import getpass
+import importlib.util
+import inspect
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import DEBUG_PROGRAMS, EXCLUDED_PACKAGES, REMOTE_CONFIG, get_cache_dir, get_tools_dir
+
+# Delay per ssh invocation: round trip (+ jitter), plus the handshake of connections without master session
+LATENCY_PROFILES = {
+    "none": {"rtt_ms": 0, "jitter_ms": 0, "handshake_ms": 0},
+    "lan": {"rtt_ms": 2, "jitter_ms": 1, "handshake_ms": 30},
+    "wifi": {"rtt_ms": 15, "jitter_ms": 10, "handshake_ms": 150},
+    "lte": {"rtt_ms": 60, "jitter_ms": 30, "handshake_ms": 400},
+}
+
+# A benchmark regressed if its median is this much slower than before ...
+REGRESSION_FACTOR = 1.25
+# ... and at least this many milliseconds slower (ignores noise on fast benchmarks)
+REGRESSION_MIN_MS = 2.0
+
+# ============================================================================
+# SSH STAND-IN (written as executable - keep free of module dependencies)
+# ============================================================================
+
+def fake_ssh(mode, real_ssh, rtt_ms, jitter_ms, handshake_ms):
+    """ssh stand-in: waits for the latency profile, then runs the command locally (shim) or via real ssh (sshd)."""
+    import os
+    import random
+    import subprocess
+    import sys
+    import time
+    argv = sys.argv[1:]
+    options_with_argument = set("bcDEeFIiJLlmOopQRSWw")
+    multiplexed = any(arg.startswith("ControlPath=") for arg in argv)
+    control = None
+    i = 0
+    while i < len(argv) and argv[i].startswith("-") and len(argv[i]) > 1:
+        flag = argv[i][1]
+        if flag == "O":
+            control = argv[i + 1] if len(argv[i]) == 2 else argv[i][2:]
+        i += 2 if flag in options_with_argument and len(argv[i]) == 2 else 1
+    delay = rtt_ms + random.uniform(0, jitter_ms) + (0 if multiplexed else handshake_ms)
+    time.sleep(delay / 1000.0)
+    if mode == "sshd":
+        os.execv(real_ssh, [real_ssh] + argv)
+    if control is not None or i >= len(argv) - 1:
+        # Master session control or no command: nothing runs on the stand-in
+        sys.exit(0)
+    os.chdir(os.path.expanduser("~"))
+    sys.exit(subprocess.call(["bash", "-c", " ".join(argv[i + 1:])]))
+
+def write_ssh_wrapper(bin_dir, mode, profile):
+    """Writes the ssh wrapper into bin_dir (prepended to PATH of the benchmark process)."""
+    real_ssh = shutil.which("ssh") or "/usr/bin/ssh"
+    path = os.path.join(bin_dir, "ssh")
+    with open(path, "w") as f:
+        f.write("#!/usr/bin/env python3\n")
+        f.write(inspect.getsource(fake_ssh))
+        f.write(f"\nfake_ssh({mode!r}, {real_ssh!r}, {profile['rtt_ms']}, {profile['jitter_ms']}, "
+                f"{profile['handshake_ms']})\n")
+    os.chmod(path, 0o755)
+    return path
+
+# ============================================================================
+# SYNTHETIC WORKSPACE
+# ============================================================================
+
+def write_file(path, content):
+    """Writes a text file, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+def get_package_names(count):
+    """OpenMower package names first (debug programs, excluded packages), then synthetic ones."""
+    names = [p["path"].split("/")[0] for p in DEBUG_PROGRAMS] + list(EXCLUDED_PACKAGES)
+    names = list(dict.fromkeys(names))[:count]
+    return names + [f"pkg_{i:03d}" for i in range(count - len(names))]
+
+def create_workspace(root, packages, files, file_kb, seed):
+    """
+    Creates a catkin workspace shaped like OpenMower: top-level packages plus
+    message packages below src/lib, each with package.xml dependencies, headers and sources.
+    Returns {"packages", "files", "bytes"}.
+    """
+    rng = random.Random(seed)
+    write_file(os.path.join(root, "CMakeLists.txt"), "# synthetic OpenMower workspace\n")
+    toplevel = "/opt/ros/noetic/share/catkin/cmake/toplevel.cmake"
+    os.makedirs(os.path.join(root, "src"), exist_ok=True)
+    if os.path.exists(toplevel):
+        os.symlink(toplevel, os.path.join(root, "src", "CMakeLists.txt"))
+
+    # Roughly every sixth package is a library below src/lib (like xbot_msgs) the others depend on
+    lib_count = max(1, packages // 6)
+    lib_names = (["xbot_msgs", "xbot_rpc"] + [f"lib_{i:03d}" for i in range(lib_count)])[:lib_count]
+    names = lib_names + get_package_names(packages - lib_count)
+    filler = "// " + "x" * 76 + "\n"
+    total_files = total_bytes = 0
+    for index, name in enumerate(names):
+        package_dir = os.path.join(root, "src", "lib" if index < lib_count else "", name)
+        deps = sorted(rng.sample(names[:index], min(index, 3))) if index else []
+        depend_xml = "".join(f"  <depend>{dep}</depend>\n" for dep in deps)
+        write_file(os.path.join(package_dir, "package.xml"),
+                   f'<?xml version="1.0"?>\n<package format="2">\n  <name>{name}</name>\n  <version>0.0.1</version>\n'
+                   f"  <description>synthetic</description>\n  <maintainer email=\"bench@example.com\">bench</maintainer>\n"
+                   f"  <license>MIT</license>\n  <buildtool_depend>catkin</buildtool_depend>\n{depend_xml}</package>\n")
+        sources = [f"src/unit_{i:03d}.cpp" for i in range(max(1, files - 1))]
+        write_file(os.path.join(package_dir, "CMakeLists.txt"),
+                   f"cmake_minimum_required(VERSION 3.0.2)\nproject({name})\n"
+                   f"find_package(catkin REQUIRED COMPONENTS {' '.join(deps)})\ncatkin_package()\n"
+                   f"include_directories(include)\nadd_executable({name} src/main.cpp {' '.join(sources)})\n")
+        write_file(os.path.join(package_dir, "include", name, f"{name}.h"), f"#pragma once\nint {name}_value();\n")
+        write_file(os.path.join(package_dir, "src", "main.cpp"), "int main() { return 0; }\n")
+        for i, source in enumerate(sources):
+            content = f"#include \"{name}/{name}.h\"\nint {name}_unit_{i}() {{ return {i}; }}\n"
+            content += filler * max(0, file_kb * 1024 // len(filler))
+            write_file(os.path.join(package_dir, source), content)
+            total_bytes += len(content)
+        total_files += len(sources) + 4
+    return {"packages": len(names), "files": total_files, "bytes": total_bytes}
+
+def install_tools(root):
+    """Copies the debug tools into devel/debug-tools of the synthetic workspace."""
+    target = os.path.join(root, "devel", "debug-tools")
+    shutil.copytree(get_tools_dir(), target,
+                    ignore=shutil.ignore_patterns(".git", "__pycache__", "config_local.py", "*.jsonl"))
+    return target
+
+def write_config_local(tools_dir, workspace, mode, ssh_key):
+    """Points the copied tools to the stand-in Pi."""
+    config = {
+        "host": "127.0.0.1",
+        "user": getpass.getuser(),
+        "workspace": workspace,
+        "ssh_multiplex": mode == "sshd",
+        "ssh_key": ssh_key or REMOTE_CONFIG.get("ssh_key", "~/.ssh/id_rsa_openmower"),
+    }
+    write_file(os.path.join(tools_dir, "config_local.py"), f"LOCAL_CONFIG = {config!r}\n")
+
+# ============================================================================
+# BENCHMARKS (run inside the synthetic workspace)
+# ============================================================================
+
+def summarize_samples(samples):
+    """Statistics of a list of durations in seconds."""
+    values = [s * 1000 for s in samples]
+    return {
+        "rounds": len(values),
+        "min_ms": round(min(values), 3),
+        "median_ms": round(statistics.median(values), 3),
+        "max_ms": round(max(values), 3),
+    }
+
+def measure(results, name, function, rounds, prepare=None):
+    """Runs a benchmark; tool output is discarded. A failing benchmark is recorded with its error."""
+    samples = []
+    try:
+        for _ in range(rounds):
+            if prepare:
+                prepare()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                function()
+                samples.append(time.perf_counter() - start)
+    except Exception as e:  # noqa: BLE001 - a broken stage must not hide the others
+        results[name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"   ❌ {name:28s} {results[name]['error']}", file=sys.stderr)
+        return
+    results[name] = summarize_samples(samples)
+    print(f"   ⏱️  {name:28s} {results[name]['median_ms']:10.2f} ms", file=sys.stderr)
+
+def touch_sources(root, count, state):
+    """Changes count source files (round robin). Returns their project-relative paths."""
+    if "sources" not in state:
+        state["sources"] = sorted(
+            os.path.relpath(os.path.join(dirpath, name), root)
+            for dirpath, _, filenames in os.walk(os.path.join(root, "src"))
+            for name in filenames if name.startswith("unit_")
+        )
+        state["next"] = 0
+    paths = []
+    for _ in range(count):
+        path = state["sources"][state["next"] % len(state["sources"])]
+        state["next"] += 1
+        with open(os.path.join(root, path), "a") as f:
+            f.write(f"// touched {time.time()}\n")
+        paths.append(path)
+    return paths
+
+def run_worker(rounds, touch):
+    """Runs all benchmarks against the configured stand-in Pi. Returns {name: statistics}."""
+    import build_planner
+    import config
+    import delta_sync
+    import deploy
+    import diagnostics
+    import ssh_session
+    spec = importlib.util.spec_from_file_location("generate_vscode", os.path.join(get_tools_dir(), "generate-vscode.py"))
+    generate_vscode = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(generate_vscode)
+
+    root = config.get_project_root()
+    results = {}
+    state = {}
+    print(f"🏁 Benchmarking in {root}", file=sys.stderr)
+
+    # Local: configuration and generation (every CLI invocation pays the import)
+    measure(results, "config_import_cold", lambda: subprocess.run(
+        [sys.executable, "-c", "import config"], cwd=get_tools_dir(), check=True), rounds)
+    measure(results, "load_config", config.load_config, rounds)
+    measure(results, "detect_project_binaries", config.detect_project_binaries, rounds)
+    programs = config.detect_project_binaries()
+    measure(results, "generate_launch_json", lambda: generate_vscode.generate_launch_json(programs), rounds)
+    measure(results, "generate_tasks_json", lambda: generate_vscode.generate_tasks_json(programs), rounds)
+    measure(results, "get_rsync_command", config.get_rsync_command, rounds)
+
+    # Connection
+    measure(results, "ssh_round_trip", lambda: ssh_session.run_remote("true"), rounds)
+    probe_times = {}
+
+    def run_probes():
+        for result in asyncio.run(diagnostics.run_diagnostics()):
+            probe_times.setdefault(result["name"], []).append(result["ms"] / 1000.0)
+
+    measure(results, "connection_probes", run_probes, rounds)
+    for name, samples in probe_times.items():
+        results[f"probe_{name}"] = summarize_samples(samples)
+
+    # Transfer
+    def rsync_full():
+        code = delta_sync.rsync_full(quiet=True)
+        if code != 0:
+            raise RuntimeError(f"rsync exit code {code}")
+
+    if shutil.which("rsync"):
+        measure(results, "rsync_full", rsync_full, 1)
+    else:
+        results["rsync_full"] = {"skipped": "rsync not installed"}
+    measure(results, "delta_sync_full", lambda: delta_sync.sync(full=True), 1)
+    measure(results, "delta_sync_noop", delta_sync.sync, rounds)
+    measure(results, "delta_sync_incremental", delta_sync.sync, rounds, lambda: touch_sources(root, touch, state))
+    touched = []
+    measure(results, "delta_sync_paths", lambda: delta_sync.sync_paths(touched), rounds,
+            lambda: touched.__setitem__(slice(None), touch_sources(root, touch, state)))
+
+    # Build planning and deploy pipeline
+    def plan():
+        pending = delta_sync.get_pending_changes()
+        build_planner.plan_build(pending["changed"], pending["deleted"], build_planner.load_packages())
+
+    measure(results, "build_plan", plan, rounds)
+    if ssh_session.run_remote("test -f /opt/ros/noetic/setup.bash").returncode != 0:
+        results["deploy"] = {"skipped": "no ROS on the stand-in Pi"}
+        return results
+    stages = {}
+
+    def run_deploy():
+        entry = deploy.deploy()
+        for stage, seconds in entry["stages"].items():
+            if seconds is not None:
+                stages.setdefault(stage, []).append(seconds)
+        if not entry["ok"]:
+            raise RuntimeError("deploy failed")
+
+    # The first deploy configures the workspace on the Pi (full build) - not part of the statistics
+    measure(results, "deploy_initial", run_deploy, 1)
+    stages.clear()
+    measure(results, "deploy", run_deploy, rounds, lambda: touch_sources(root, touch, state))
+    for stage, samples in stages.items():
+        results[f"deploy_stage_{stage}"] = summarize_samples(samples)
+    return results
+
+# ============================================================================
+# RUN / COMPARE
+# ============================================================================
+
+def get_version():
+    """Version of the benchmarked tools (git describe, if available)."""
+    result = subprocess.run(["git", "-C", get_tools_dir(), "describe", "--always", "--dirty"],
+                            capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else "unknown"
+
+def run(args):
+    """Creates the synthetic workspace, runs the worker and writes the results. Returns the exit code."""
+    base = tempfile.mkdtemp(prefix="openmower-bench-")
+    try:
+        workspace = os.path.join(base, "ws")
+        remote_workspace = os.path.join(base, "pi", "openmower_ros")
+        print(f"🏗️  Synthetic workspace: {args.packages} packages × {args.files} files ({args.file_kb} KB) in {base}")
+        shape = create_workspace(workspace, args.packages, args.files, args.file_kb, args.seed)
+        tools_dir = install_tools(workspace)
+        write_config_local(tools_dir, remote_workspace, args.ssh, args.ssh_key)
+
+        bin_dir = os.path.join(base, "bin")
+        os.makedirs(bin_dir)
+        write_ssh_wrapper(bin_dir, args.ssh, LATENCY_PROFILES[args.latency])
+        env = dict(os.environ, PATH=bin_dir + os.pathsep + os.environ.get("PATH", ""),
+                   XDG_CACHE_HOME=os.path.join(base, "cache"))
+        env.pop("OPENMOWER_TARGET", None)
+        print(f"📡 Stand-in Pi: {args.ssh}, latency profile '{args.latency}'")
+
+        # Results come back through a file - tools and their subprocesses may write to stdout
+        results_file = os.path.join(base, "results.json")
+        start = time.monotonic()
+        process = subprocess.run(
+            [sys.executable, os.path.join(tools_dir, "tooling_bench.py"), "worker",
+             "--rounds", str(args.rounds), "--touch", str(args.touch), "--output", results_file],
+            env=env, cwd=workspace, stdout=subprocess.DEVNULL
+        )
+        if process.returncode != 0:
+            print(f"❌ Benchmark process failed (exit code {process.returncode})", file=sys.stderr)
+            return 1
+        with open(results_file) as f:
+            benchmarks = json.load(f)
+        report = {
+            "version": get_version(),
+            "label": args.label,
+            "time": time.time(),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "ssh": args.ssh,
+            "latency": dict(LATENCY_PROFILES[args.latency], name=args.latency),
+            "workspace": dict(shape, files_per_package=args.files, file_kb=args.file_kb, seed=args.seed),
+            "rounds": args.rounds,
+            "seconds": round(time.monotonic() - start, 2),
+            "benchmarks": benchmarks,
+        }
+    finally:
+        if args.keep:
+            print(f"📁 Kept {base}")
+        else:
+            shutil.rmtree(base, ignore_errors=True)
+
+    output = args.output
+    if not output:
+        bench_dir = os.path.join(get_cache_dir(), "bench")
+        os.makedirs(bench_dir, exist_ok=True)
+        output = os.path.join(bench_dir, time.strftime("%Y%m%d-%H%M%S") + f"_{report['version']}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ {len(report['benchmarks'])} benchmarks in {report['seconds']:.1f}s → {output}")
+    return 0
+
+def compare(old_path, new_path):
+    """Compares the medians of two result files. Returns 1 if a benchmark regressed."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    for key in ("workspace", "ssh", "latency"):
+        if old.get(key) != new.get(key):
+            print(f"⚠️  Different {key}: results are not directly comparable")
+    print(f"📊 {old['version']} → {new['version']}")
+    print(f"   {'benchmark':30s} {'before':>10s} {'after':>10s} {'change':>8s}")
+    regressions = []
+    for name, after in new["benchmarks"].items():
+        before = old["benchmarks"].get(name, {})
+        if "median_ms" not in after or "median_ms" not in before:
+            continue
+        a, b = after["median_ms"], before["median_ms"]
+        change = (a - b) / b * 100 if b else 0.0
+        regression = a > b * REGRESSION_FACTOR and a - b >= REGRESSION_MIN_MS
+        flag = "  ⚠️  regression" if regression else ""
+        print(f"   {name:30s} {b:8.2f}ms {a:8.2f}ms {change:+7.1f}%{flag}")
+        if regression:
+            regressions.append(name)
+    if regressions:
+        print(f"⚠️  Regressed: {', '.join(regressions)}")
+        return 1
+    print("✅ No regressions")
+    return 0
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower debug tooling benchmark")
+    parser.add_argument("command", choices=["run", "compare", "worker"])
+    parser.add_argument("results", nargs="*", help="compare: two result files (before, after)")
+    parser.add_argument("--packages", type=int, default=20, help="Packages in the synthetic workspace")
+    parser.add_argument("--files", type=int, default=15, help="Source files per package")
+    parser.add_argument("--file-kb", type=int, default=4, help="Approximate size of each source file")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the package dependency graph")
+    parser.add_argument("--rounds", type=int, default=5, help="Repetitions per benchmark")
+    parser.add_argument("--touch", type=int, default=3, help="Files changed per incremental round")
+    parser.add_argument("--ssh", choices=["shim", "sshd"], default="shim", help="Stand-in Pi")
+    parser.add_argument("--ssh-key", help="sshd: key for the login to localhost")
+    parser.add_argument("--latency", choices=sorted(LATENCY_PROFILES), default="none", help="Injected latency profile")
+    parser.add_argument("--label", default="", help="Free text stored with the results")
+    parser.add_argument("--output", help="Result file (default: cache directory; required for worker)")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic workspace")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        if not args.output:
+            parser.error("worker needs --output")
+        results = run_worker(args.rounds, args.touch)
+        with open(args.output, "w") as f:
+            json.dump(results, f)
+        return 0
+    if args.command == "compare":
+        if len(args.results) != 2:
+            parser.error("compare needs two result files")
+        return compare(*args.results)
+    return run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
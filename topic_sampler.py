@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - ROS Topic Sampler
+
+Measures message rate, bandwidth and inter-arrival jitter per topic on the
+Pi itself, so high-rate topics (GPS, IMU, odometry) never cross the Wi-Fi:
+- messages are received raw (rospy.AnyMsg, no deserialization)
+- statistics are aggregated into fixed time windows kept in a ring buffer
+- only one compact JSON line per window is streamed back over one SSH channel
+- a synthetic publisher stands in for the robot when testing
+
+Usage:
+    python3 topic_sampler.py                          # All topics, terminal view
+    python3 topic_sampler.py --topics /imu/data_raw   # Selected topics
+    python3 topic_sampler.py --json --duration 30     # JSON lines, stop after 30s
+    python3 topic_sampler.py --synthetic --local      # Synthetic publisher, no Pi/ROS needed
+"""
+
+import argparse
+import inspect
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, get_ros_environment, get_ssh_args
+import ssh_session
+
+# Synthetic stand-ins for the high-rate mower topics: name:rate_hz:bytes:jitter_ms
+SYNTHETIC_TOPICS = ["/gps/rtk_fix:10:180:5", "/imu/data_raw:100:320:2", "/odom:50:720:3"]
+
+DEFAULT_WINDOW = 1.0
+DEFAULT_RING_SIZE = 300
+
+# ============================================================================
+# SAMPLER (runs on the Pi - keep free of module dependencies)
+# ============================================================================
+
+class WindowAggregator:
+    """Per-topic counters of the current window plus a ring buffer of finished windows."""
+
+    def __init__(self, window, ring_size):
+        import collections
+        import threading
+        self.window = window
+        self.ring = collections.deque(maxlen=ring_size)
+        self.lock = threading.Lock()
+        self.current = {}
+        self.last_arrival = {}
+        self.start = time.monotonic()
+
+    def add(self, topic, arrival, size):
+        """Records one message (called from subscriber threads)."""
+        with self.lock:
+            # count, bytes, gaps, sum of gaps, sum of squared gaps, max gap
+            stats = self.current.get(topic)
+            if stats is None:
+                stats = self.current[topic] = [0, 0, 0, 0.0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += size
+            last = self.last_arrival.get(topic)
+            if last is not None:
+                gap = arrival - last
+                stats[2] += 1
+                stats[3] += gap
+                stats[4] += gap * gap
+                stats[5] = max(stats[5], gap)
+            self.last_arrival[topic] = arrival
+
+    def roll(self, now):
+        """Closes the current window. Returns its summary {t, w, topics: {name: [count, hz, B/s, jitter ms, max gap ms]}}."""
+        with self.lock:
+            current, self.current = self.current, {}
+            last_arrival = dict(self.last_arrival)
+        elapsed = max(now - self.start, 1e-6)
+        self.start = now
+        topics = {}
+        for topic, last in last_arrival.items():
+            count, size, gaps, gap_sum, gap_sq, max_gap = current.get(topic, [0, 0, 0, 0.0, 0.0, 0.0])
+            jitter = 0.0
+            if gaps > 1:
+                mean = gap_sum / gaps
+                jitter = max(gap_sq / gaps - mean * mean, 0.0) ** 0.5
+            # A silent topic reports the time since its last message as gap
+            max_gap = max(max_gap, now - last) if count == 0 else max_gap
+            topics[topic] = [count, round(count / elapsed, 2), round(size / elapsed),
+                             round(jitter * 1000, 2), round(max_gap * 1000, 1)]
+        summary = {"t": round(time.time(), 3), "w": round(elapsed, 3), "topics": topics}
+        self.ring.append(summary)
+        return summary
+
+def summarize_ring(ring):
+    """Aggregates the ring buffer: per topic mean/min rate, mean bandwidth, p95 jitter, max gap."""
+    per_topic = {}
+    for window in ring:
+        for topic, values in window["topics"].items():
+            per_topic.setdefault(topic, []).append(values)
+    summary = {}
+    for topic, rows in per_topic.items():
+        rates = [row[1] for row in rows]
+        jitters = sorted(row[3] for row in rows)
+        summary[topic] = {
+            "windows": len(rows),
+            "rate_hz": round(sum(rates) / len(rates), 2),
+            "min_rate_hz": min(rates),
+            "bandwidth_Bps": round(sum(row[2] for row in rows) / len(rows)),
+            "jitter_p95_ms": jitters[min(len(jitters) - 1, int(len(jitters) * 0.95))],
+            "max_gap_ms": max(row[4] for row in rows),
+        }
+    return summary
+
+def start_synthetic_source(specs, aggregator, stop):
+    """Starts one publisher thread per 'name:rate_hz:bytes:jitter_ms' spec."""
+    import random
+    import threading
+
+    def publish(topic, rate, size, jitter):
+        next_time = time.monotonic()
+        while not stop.is_set():
+            next_time += 1.0 / rate
+            delay = next_time - time.monotonic() + random.gauss(0, jitter / 1000.0)
+            if delay > 0:
+                stop.wait(delay)
+            aggregator.add(topic, time.monotonic(), size)
+
+    for spec in specs:
+        topic, rate, size, jitter = (spec.split(":") + ["0"])[:4]
+        threading.Thread(target=publish, args=(topic, float(rate), int(size), float(jitter)), daemon=True).start()
+    return lambda: None
+
+def start_ros_source(topics, aggregator):
+    """Subscribes to the topics (all published topics if empty). Returns a function picking up new topics."""
+    import rospy
+    rospy.init_node("openmower_topic_sampler", anonymous=True, disable_signals=True)
+    subscribed = {}
+
+    def refresh():
+        wanted = topics or [name for name, _ in rospy.get_published_topics()]
+        for topic in wanted:
+            if topic not in subscribed and topic != "/rosout_agg":
+                subscribed[topic] = rospy.Subscriber(
+                    topic, rospy.AnyMsg, lambda msg, t=topic: aggregator.add(t, time.monotonic(), len(msg._buff)),
+                    queue_size=100, tcp_nodelay=True
+                )
+
+    refresh()
+    return refresh
+
+def run_sampler(topics, window, ring_size, duration, synthetic):
+    """Samples until the duration is reached or the channel closes; prints one JSON line per window."""
+    import json
+    import sys
+    import threading
+    aggregator = WindowAggregator(window, ring_size)
+    stop = threading.Event()
+    if synthetic:
+        refresh = start_synthetic_source(synthetic, aggregator, stop)
+    else:
+        refresh = start_ros_source(topics, aggregator)
+    started = time.monotonic()
+    next_roll = started + window
+    try:
+        while not duration or time.monotonic() - started < duration:
+            time.sleep(max(next_roll - time.monotonic(), 0))
+            next_roll += window
+            sys.stdout.write(json.dumps(aggregator.roll(time.monotonic()), separators=(",", ":")) + "\n")
+            sys.stdout.flush()
+            refresh()
+        sys.stdout.write(json.dumps({"summary": summarize_ring(aggregator.ring)}, separators=(",", ":")) + "\n")
+        sys.stdout.flush()
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+    stop.set()
+
+def get_sampler_script(topics, window, ring_size, duration, synthetic):
+    """Python script (for 'python3 -') running the sampler with the given settings."""
+    parts = [WindowAggregator, summarize_ring, start_synthetic_source, start_ros_source, run_sampler]
+    source = "import time\n\n" + "\n".join(inspect.getsource(part) for part in parts)
+    return source + f"\nrun_sampler({topics!r}, {window!r}, {ring_size!r}, {duration!r}, {synthetic!r})\n"
+
+# ============================================================================
+# LOCAL VIEW
+# ============================================================================
+
+def get_sampler_command(local):
+    """Command running the sampler script from stdin (on the Pi or locally)."""
+    if local:
+        return [sys.executable, "-u", "-"]
+    workspace = shlex.quote(REMOTE_CONFIG["workspace"])
+    exports = " && ".join(f"export {k}={shlex.quote(v)}" for k, v in get_ros_environment().items())
+    remote = (f"cd {workspace} && source /opt/ros/noetic/setup.bash && "
+              f"{{ source devel/setup.bash 2>/dev/null || true; }} && {exports} && exec python3 -u -")
+    ssh_session.ensure_master(quiet=True)
+    return ["ssh"] + get_ssh_args() + [f"bash -c {shlex.quote(remote)}"]
+
+def format_rate(bytes_per_second):
+    """Formats a bandwidth."""
+    return f"{bytes_per_second / 1024:.1f}"
+
+def print_window(window):
+    """Prints one window as table, busiest topics first."""
+    topics = sorted(window["topics"].items(), key=lambda item: -item[1][2])
+    total = sum(values[2] for _, values in topics)
+    print(f"\n⏱️  {time.strftime('%H:%M:%S', time.localtime(window['t']))}  window {window['w']:.2f}s  "
+          f"{len(topics)} topics  {format_rate(total)} KB/s")
+    print(f"   {'TOPIC':40s} {'RATE Hz':>9s} {'KB/s':>8s} {'JITTER ms':>10s} {'MAX GAP ms':>11s}")
+    for topic, (count, rate, bandwidth, jitter, max_gap) in topics:
+        flag = "  ⚠️" if count == 0 else ""
+        print(f"   {topic[:40]:40s} {rate:9.1f} {format_rate(bandwidth):>8s} {jitter:10.2f} {max_gap:11.1f}{flag}")
+
+def print_summary(summary):
+    """Prints the ring buffer summary of the session."""
+    print("\n📊 Session summary")
+    print(f"   {'TOPIC':40s} {'AVG Hz':>8s} {'MIN Hz':>8s} {'KB/s':>8s} {'JIT p95':>8s} {'MAX GAP':>9s}")
+    for topic, s in sorted(summary.items(), key=lambda item: -item[1]["bandwidth_Bps"]):
+        print(f"   {topic[:40]:40s} {s['rate_hz']:8.1f} {s['min_rate_hz']:8.1f} {format_rate(s['bandwidth_Bps']):>8s} "
+              f"{s['jitter_p95_ms']:8.2f} {s['max_gap_ms']:9.1f}")
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower ROS topic rate/bandwidth sampler")
+    parser.add_argument("--topics", nargs="+", default=[], help="Topics to sample (default: all published)")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW, help="Window length in seconds")
+    parser.add_argument("--ring-size", type=int, default=DEFAULT_RING_SIZE, help="Windows kept for the summary")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after N seconds (0 = until Ctrl+C)")
+    parser.add_argument("--synthetic", nargs="*", metavar="NAME:HZ:BYTES:JITTER_MS",
+                        help="Use a synthetic publisher instead of ROS (default: GPS/IMU/odometry stand-ins)")
+    parser.add_argument("--local", action="store_true", help="Run the sampler locally instead of on the Pi")
+    parser.add_argument("--json", action="store_true", help="Print the JSON lines instead of tables")
+    args = parser.parse_args()
+
+    synthetic = None if args.synthetic is None else (args.synthetic or SYNTHETIC_TOPICS)
+    process = subprocess.Popen(get_sampler_command(args.local), stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, text=True, bufsize=1)
+    process.stdin.write(get_sampler_script(args.topics, args.window, args.ring_size, args.duration, synthetic))
+    process.stdin.close()
+
+    received = 0
+    try:
+        for line in process.stdout:
+            received += len(line)
+            if args.json:
+                sys.stdout.write(line)
+                sys.stdout.flush()
+                continue
+            data = json.loads(line)
+            if "summary" in data:
+                print_summary(data["summary"])
+            else:
+                print_window(data)
+    except KeyboardInterrupt:
+        process.terminate()
+    returncode = process.wait()
+    if not args.json:
+        print(f"\n📡 {received / 1024:.1f} KB summaries received over the channel")
+    return 0 if returncode in (0, -15) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
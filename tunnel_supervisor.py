@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Tunnel Supervisor
+
+Forwards all tunnel ports (gdbserver, ROS master, ...) over one
+key-authenticated SSH connection and keeps it alive:
+- the connection runs a tiny echo loop on the Pi; a periodic ping through it
+  measures the round-trip time and reports which forwarded ports are listening
+- the local end of each forward is checked in /proc/net/tcp (connecting to it
+  would consume a 'gdbserver --once' session)
+- a dead or unresponsive connection is re-established with exponential backoff
+- uptime, reconnect count, latency and forward states go to a status file
+
+Usage:
+    python3 tunnel_supervisor.py start     # Start in the background (tunnel.sh)
+    python3 tunnel_supervisor.py status    # Show status and metrics
+    python3 tunnel_supervisor.py stop      # Stop by PID (cleanup.sh)
+    python3 tunnel_supervisor.py run       # Run in the foreground
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, get_ssh_args, get_temp_dir
+
+PROBE_INTERVAL = 5.0
+PROBE_TIMEOUT = 5.0
+CONNECT_TIMEOUT = 20.0
+BACKOFF_MIN = 1.0
+BACKOFF_MAX = 30.0
+RTT_WINDOW = 60
+
+# Remote echo loop: answers "ping <seq>" with "pong <seq> <listening ports>"
+REMOTE_PROBE_LOOP = (
+    "while read -r cmd seq; do "
+    "if command -v ss >/dev/null; then "
+    "ports=$(ss -Htln 2>/dev/null | awk '{n=split($4,a,\":\"); print a[n]}' | sort -un | tr '\\n' ,); "
+    "else ports='?'; fi; "
+    "echo \"pong $seq ${ports:-none}\"; done"
+)
+
+# ============================================================================
+# PATHS AND CONFIGURATION
+# ============================================================================
+
+def get_pid_file():
+    """PID file of the running supervisor (read by cleanup.sh)."""
+    return os.path.join(get_temp_dir(), "tunnel.pid")
+
+def get_status_file():
+    """Status/metrics file of the supervisor."""
+    return os.path.join(get_temp_dir(), "tunnel_status.json")
+
+def get_log_file():
+    """Log file of the background supervisor."""
+    return os.path.join(get_temp_dir(), "tunnel.log")
+
+def get_tunnel_ports():
+    """Forwarded ports: the gdbserver port plus tunnel_ports (ROS master by default)."""
+    ports = [int(REMOTE_CONFIG.get("gdbserver_port", 1234))] + [int(p) for p in REMOTE_CONFIG.get("tunnel_ports", [11311])]
+    return sorted(set(ports))
+
+def get_tunnel_command(ports):
+    """SSH command of the tunnel: one dedicated connection (no multiplexing) with all forwards."""
+    args = get_ssh_args(dict(REMOTE_CONFIG, ssh_multiplex=False))
+    options = ["-o", "BatchMode=yes", "-o", "ExitOnForwardFailure=yes", "-o", "ConnectTimeout=10",
+               "-o", "ServerAliveInterval=10", "-o", "ServerAliveCountMax=3"]
+    for port in ports:
+        options += ["-L", f"{port}:localhost:{port}"]
+    return ["ssh"] + args[:-1] + options + [args[-1], f"bash -c {shlex.quote(REMOTE_PROBE_LOOP)}"]
+
+def read_pid():
+    """Returns the PID of the running supervisor (None if not running)."""
+    try:
+        with open(get_pid_file()) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
+
+def is_local_listening(port):
+    """Checks /proc/net/tcp{,6} for a listening socket on the port (without connecting)."""
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if fields[3] == "0A" and int(fields[1].rsplit(":", 1)[1], 16) == port:
+                        return True
+        except (OSError, StopIteration):
+            continue
+    return False
+
+# ============================================================================
+# SUPERVISOR
+# ============================================================================
+
+def new_status(ports):
+    """Initial status/metrics record."""
+    return {
+        "pid": os.getpid(),
+        "target": get_ssh_args()[-1],
+        "started": time.time(),
+        "state": "connecting",
+        "connected_since": None,
+        "uptime_s": 0.0,
+        "reconnects": 0,
+        "last_error": "",
+        "rtt_ms": {"last": None, "avg": None, "p95": None},
+        "forwards": {str(port): {"local": False, "remote_listening": None} for port in ports},
+        "updated": time.time(),
+    }
+
+def write_status(status):
+    """Writes the status file atomically."""
+    status["updated"] = time.time()
+    if status["connected_since"]:
+        status["uptime_s"] = round(time.time() - status["connected_since"], 1)
+    tmp_path = get_status_file() + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(status, f, indent=2)
+    os.replace(tmp_path, get_status_file())
+
+def update_rtt(status, samples, rtt_ms):
+    """Adds a round-trip sample and updates the latency metrics."""
+    samples.append(rtt_ms)
+    del samples[:-RTT_WINDOW]
+    ordered = sorted(samples)
+    status["rtt_ms"] = {
+        "last": round(rtt_ms, 1),
+        "avg": round(statistics.mean(samples), 1),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+    }
+
+async def run_connection(status, ports, samples, stop):
+    """Runs one tunnel connection until it dies or stop is set. Returns True if it was ever connected."""
+    process = await asyncio.create_subprocess_exec(
+        *get_tunnel_command(ports), stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    connected = False
+    seq = 0
+    error = ""
+    try:
+        while not stop.is_set():
+            seq += 1
+            start = time.monotonic()
+            try:
+                process.stdin.write(f"ping {seq}\n".encode())
+                await process.stdin.drain()
+                line = await asyncio.wait_for(process.stdout.readline(), PROBE_TIMEOUT if connected else CONNECT_TIMEOUT)
+            except (ConnectionError, asyncio.TimeoutError):
+                error = "probe timeout" if connected else "connect timeout"
+                break
+            if not line:
+                break
+            parts = line.decode(errors="replace").split()
+            if len(parts) < 3 or parts[0] != "pong" or parts[1] != str(seq):
+                continue
+            update_rtt(status, samples, (time.monotonic() - start) * 1000)
+            if not connected:
+                connected = True
+                status["connected_since"] = time.time()
+                status["state"] = "connected"
+                status["last_error"] = ""
+                print(f"✅ Tunnel connected ({', '.join(map(str, ports))})", flush=True)
+            remote_ports = None if parts[2] == "?" else set(parts[2].split(","))
+            for port in ports:
+                status["forwards"][str(port)] = {
+                    "local": is_local_listening(port),
+                    "remote_listening": None if remote_ports is None else str(port) in remote_ports,
+                }
+            write_status(status)
+            # Sleep until the next probe, but react immediately to stop or a dying ssh
+            waiters = [asyncio.ensure_future(stop.wait()), asyncio.ensure_future(process.wait())]
+            await asyncio.wait(waiters, timeout=PROBE_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in waiters:
+                waiter.cancel()
+            if process.returncode is not None:
+                break
+    finally:
+        if process.returncode is None:
+            process.kill()
+        try:
+            stderr = (await asyncio.wait_for(process.stderr.read(), PROBE_TIMEOUT)).decode(errors="replace").strip()
+        except asyncio.TimeoutError:
+            stderr = ""
+        process.stdin.close()
+        await process.wait()
+    if not stop.is_set():
+        status["last_error"] = (stderr.splitlines()[-1] if stderr else error) or f"ssh exited ({process.returncode})"
+    return connected
+
+async def supervise():
+    """Keeps the tunnel up until SIGTERM/SIGINT."""
+    ports = get_tunnel_ports()
+    status = new_status(ports)
+    samples = []
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    backoff = BACKOFF_MIN
+    while not stop.is_set():
+        status["state"] = "connecting"
+        write_status(status)
+        if await run_connection(status, ports, samples, stop):
+            backoff = BACKOFF_MIN
+        if stop.is_set():
+            break
+        if status["connected_since"]:
+            status["reconnects"] += 1
+        status["state"] = "backoff"
+        status["connected_since"] = None
+        status["uptime_s"] = 0.0
+        for forward in status["forwards"].values():
+            forward.update(local=False, remote_listening=None)
+        write_status(status)
+        # Jitter avoids synchronized reconnects of several supervisors
+        delay = backoff * random.uniform(0.8, 1.2)
+        print(f"⚠️  Tunnel down ({status['last_error']}) - reconnecting in {delay:.1f}s", flush=True)
+        try:
+            await asyncio.wait_for(stop.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        backoff = min(backoff * 2, BACKOFF_MAX)
+
+    status["state"] = "stopped"
+    status["connected_since"] = None
+    write_status(status)
+
+def run_foreground():
+    """Runs the supervisor in the foreground (PID file for stop/cleanup)."""
+    if read_pid() not in (None, os.getpid()):
+        print(f"ℹ️  Tunnel supervisor already running (PID {read_pid()})")
+        return 0
+    with open(get_pid_file(), "w") as f:
+        f.write(str(os.getpid()))
+    try:
+        asyncio.run(supervise())
+    finally:
+        if read_pid() == os.getpid():
+            os.unlink(get_pid_file())
+    return 0
+
+# ============================================================================
+# CONTROL
+# ============================================================================
+
+def start_background(wait=15.0):
+    """Starts the supervisor as background process and waits for the first connection."""
+    pid = read_pid()
+    if pid:
+        print(f"ℹ️  Tunnel supervisor already running (PID {pid})")
+        return 0
+    with open(get_log_file(), "a") as log:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "run"], stdin=subprocess.DEVNULL,
+                         stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    print(f"🌐 Starting tunnel supervisor ({', '.join(map(str, get_tunnel_ports()))} -> {get_ssh_args()[-1]})...")
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.2)
+        status = load_status()
+        if status and status.get("state") == "connected" and read_pid():
+            print_status(status)
+            return 0
+    print(f"⚠️  Not connected yet - retrying in the background (log: {get_log_file()})")
+    return 1
+
+def stop_background(timeout=5.0):
+    """Stops the supervisor by PID."""
+    pid = read_pid()
+    if not pid:
+        print("ℹ️  Tunnel supervisor not running")
+        return 0
+    os.kill(pid, signal.SIGTERM)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and read_pid():
+        time.sleep(0.1)
+    if read_pid():
+        os.kill(pid, signal.SIGKILL)
+    print(f"🔌 Tunnel supervisor stopped (PID {pid})")
+    return 0
+
+def load_status():
+    """Loads the status file (None if missing)."""
+    try:
+        with open(get_status_file()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def print_status(status):
+    """Prints the supervisor status."""
+    running = read_pid() is not None
+    state = status["state"] if running else "not running"
+    rtt = status["rtt_ms"]
+    print(f"🌐 Tunnel {status['target']}: {state}")
+    if running and status["state"] == "connected":
+        print(f"   Uptime {status['uptime_s']:.0f}s, reconnects {status['reconnects']}, "
+              f"RTT last {rtt['last']} ms / avg {rtt['avg']} ms / p95 {rtt['p95']} ms")
+    elif status["last_error"]:
+        print(f"   Last error: {status['last_error']}")
+    for port, forward in status["forwards"].items():
+        remote = {True: "listening", False: "no service", None: "unknown"}[forward["remote_listening"]]
+        print(f"   {'✅' if forward['local'] and running else '❌'} localhost:{port} -> Pi:{port} ({remote})")
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower SSH tunnel supervisor")
+    parser.add_argument("action", choices=["start", "stop", "status", "run"])
+    parser.add_argument("--json", action="store_true", help="Print status as JSON")
+    args = parser.parse_args()
+
+    if args.action == "start":
+        return start_background()
+    if args.action == "stop":
+        return stop_background()
+    if args.action == "run":
+        return run_foreground()
+    status = load_status()
+    if args.json:
+        print(json.dumps(dict(status or {}, running=read_pid() is not None), indent=2))
+    elif status:
+        print_status(status)
+    else:
+        print("ℹ️  Tunnel supervisor has not run yet")
+    return 0 if read_pid() else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+OpenMower Remote Debug - Watch Mode
+
+Save-triggered edit/build loop: watches the project root with inotify,
+debounces bursts of saves, ships only the changed paths (delta_sync.py)
+and rebuilds only the affected packages on the Pi (build_planner.py).
+
+A build that is still running when new edits arrive is stale - it is
+cancelled on the Pi and the next build covers both change sets. Each
+cycle reports the latency from the first save to a fresh binary on the Pi.
+
+Usage:
+    python3 watch_mode.py                  # Watch, sync and rebuild until Ctrl+C
+    python3 watch_mode.py --owner-only     # Rebuild only the owning packages, not their dependents
+    python3 watch_mode.py --no-build       # Only keep the Pi workspace in sync
+    python3 watch_mode.py --debounce 500   # Quiet time in ms before a change burst is shipped
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import os
+import select
+import statistics
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config import REMOTE_CONFIG, get_project_root
+import build_planner
+import delta_sync
+import ssh_session
+
+# inotify(7)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+
+# Content changes only - plain IN_MODIFY would fire for every write() of a save
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ATTRIB
+
+# Editor swap/backup files never reach the Pi
+WATCH_IGNORE_PATTERNS = ("*.swp", "*.swx", "*~", ".#*", "#*#", "4913", "*.tmp", ".goutputstream-*")
+
+# Poll interval while a build runs and no edits are pending
+BUILD_POLL_SECONDS = 0.2
+
+# ============================================================================
+# INOTIFY
+# ============================================================================
+
+libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+
+class TreeWatcher:
+    """Recursive inotify watch of the project tree (sync excludes are not watched)."""
+
+    def __init__(self, root):
+        self.root = root
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        self.overflowed = False
+        self.add_tree(root)
+
+    def add_tree(self, path):
+        """Watches a directory and all its subdirectories."""
+        for dirpath, dirnames, _ in os.walk(path):
+            dirnames[:] = [name for name in dirnames
+                           if not delta_sync.is_excluded(name) and not os.path.islink(os.path.join(dirpath, name))]
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(dirpath), WATCH_MASK | IN_ONLYDIR)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise OSError(error, "inotify watch limit reached - raise fs.inotify.max_user_watches")
+                continue  # Directory vanished meanwhile
+            self.dirs[wd] = os.path.relpath(dirpath, self.root)
+
+    def read_changes(self):
+        """Drains the pending events. Returns the changed paths relative to the project root."""
+        changes = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changes
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    self.overflowed = True
+                    continue
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                if wd not in self.dirs or not name:
+                    continue
+                name = os.fsdecode(name)
+                if any(fnmatch.fnmatch(name, pattern) for pattern in WATCH_IGNORE_PATTERNS):
+                    continue
+                if mask & IN_ISDIR and delta_sync.is_excluded(name):
+                    continue
+                path = os.path.normpath(os.path.join(self.dirs[wd], name))
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # New directory: watch it - its content is picked up by the directory rescan in the sync
+                    self.add_tree(os.path.join(self.root, path))
+                elif mask & IN_ISDIR and mask & IN_ATTRIB:
+                    continue
+                changes.add(path)
+
+    def close(self):
+        """Releases the inotify instance."""
+        os.close(self.fd)
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def get_kill_tree_command(pid):
+    """Remote command: stops a process and all its descendants (the stale build shell)."""
+    return (
+        "kill_tree() { kill -STOP \"$1\" 2>/dev/null; "
+        "for child in $(pgrep -P \"$1\"); do kill_tree \"$child\"; done; "
+        "kill -TERM \"$1\" 2>/dev/null; kill -CONT \"$1\" 2>/dev/null; }; "
+        f"kill_tree {int(pid)}"
+    )
+
+def get_plan(owner_only):
+    """Plans the build for all pending (not yet built) changes."""
+    pending = delta_sync.get_pending_changes()
+    packages = build_planner.load_packages()
+    plan = build_planner.plan_build(pending["changed"], pending["deleted"], packages)
+    if owner_only and not plan["full"]:
+        owners = {build_planner.map_file_to_package(path, packages)
+                  for path in pending["changed"] + pending["deleted"]}
+        plan["skipped"] = sorted(set(plan["skipped"]) | (set(plan["build"]) - owners))
+        plan["build"] = [name for name in plan["build"] if name in owners]
+        plan["reason"] += ", dependents skipped"
+    return plan
+
+def start_build(plan):
+    """Starts the remote build in the background. Returns the build state dict."""
+    build = {"plan": plan, "shell": build_planner.open_remote_shell(), "started": time.monotonic(),
+             "result": None}
+
+    def runner():
+        build["result"] = build_planner.finish_remote_build(build["shell"], plan)
+
+    build["thread"] = threading.Thread(target=runner, daemon=True)
+    build["thread"].start()
+    return build
+
+def cancel_build(build, reason):
+    """Cancels a stale build: kills its process tree on the Pi and the local ssh."""
+    shell = build["shell"]
+    deadline = time.monotonic() + 2.0
+    while shell["remote_pid"] is None and shell["process"].poll() is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    if shell["remote_pid"] is not None and shell["process"].poll() is None:
+        ssh_session.run_remote(get_kill_tree_command(shell["remote_pid"]), timeout=15)
+    shell["process"].kill()
+    build["thread"].join()
+    print(f"\n🛑 Stale build cancelled after {time.monotonic() - build['started']:.2f}s - {reason}")
+
+# ============================================================================
+# WATCH LOOP
+# ============================================================================
+
+def print_latency(cycle, build_seconds=None):
+    """Prints the save-to-Pi latency of a cycle."""
+    total = time.monotonic() - cycle["first_event"]
+    parts = [f"debounce {cycle['debounce']:.2f}s", f"sync {cycle['sync']:.2f}s"]
+    if build_seconds is None:
+        print(f"⚡ Save → Pi workspace: {total:.2f}s ({', '.join(parts)})")
+    else:
+        parts.append(f"build {build_seconds:.2f}s")
+        print(f"⚡ Save → fresh binary on Pi: {total:.2f}s ({', '.join(parts)})")
+    return total
+
+def print_summary(latencies, cancelled):
+    """Prints the latency statistics of the session."""
+    if not latencies:
+        print("\nℹ️  No completed cycles")
+        return
+    print(f"\n📊 {len(latencies)} cycles, {cancelled} stale build(s) cancelled")
+    print(f"   save → Pi: median {statistics.median(latencies):.2f}s, "
+          f"min {min(latencies):.2f}s, max {max(latencies):.2f}s")
+
+def run_cycle(paths, rescan, owner_only, no_build, cycle):
+    """Syncs a debounced change burst and starts the rebuild. Returns the build state (or None)."""
+    start = time.monotonic()
+    if rescan:
+        print("⚠️  inotify queue overflowed - rescanning the whole tree")
+        delta_sync.sync(verbose=False)
+    else:
+        delta_sync.sync_paths(paths, verbose=True)
+    cycle["sync"] = time.monotonic() - start
+    if no_build:
+        return None
+
+    plan = get_plan(owner_only)
+    if not plan["full"] and not plan["build"]:
+        return None
+    build_planner.print_plan(plan)
+    build = start_build(plan)
+    build["cycle"] = cycle
+    return build
+
+def watch(debounce, owner_only=False, no_build=False):
+    """Runs the watch loop until interrupted. Returns the exit code."""
+    root = get_project_root()
+    print(f"🔄 Initial sync of {root}")
+    try:
+        delta_sync.sync(verbose=False)
+    except RuntimeError as e:
+        print(f"❌ Sync failed: {e}", file=sys.stderr)
+        return 1
+    watcher = TreeWatcher(root)
+    print(f"👀 Watching {len(watcher.dirs)} directories → {REMOTE_CONFIG['host']} "
+          f"(debounce {debounce * 1000:.0f} ms, Ctrl+C to stop)")
+
+    pending = set()
+    retry = set()
+    first_event = last_event = None
+    build = None
+    latencies = []
+    cancelled = 0
+    try:
+        while True:
+            timeout = None
+            if pending or watcher.overflowed:
+                timeout = max(0.0, last_event + debounce - time.monotonic())
+            elif build:
+                timeout = BUILD_POLL_SECONDS
+            readable, _, _ = select.select([watcher.fd], [], [], timeout)
+            now = time.monotonic()
+            if readable:
+                changes = watcher.read_changes()
+                if changes or watcher.overflowed:
+                    pending |= changes
+                    first_event = first_event or now
+                    last_event = now
+
+            if build and not build["thread"].is_alive():
+                ok, timings = build["result"]
+                total = time.monotonic() - build["started"]
+                build_planner.record_build(build["plan"], ok, timings, round(total, 2), build["shell"]["ccache"])
+                if ok:
+                    delta_sync.clear_pending_changes()
+                    latencies.append(print_latency(build["cycle"], total))
+                build = None
+
+            if (pending or watcher.overflowed) and now - last_event >= debounce:
+                cycle = {"first_event": first_event, "debounce": now - first_event}
+                if build:
+                    # The stale build's changes are still pending - the new plan includes them
+                    cancel_build(build, "new edits arrived")
+                    cancelled += 1
+                    cycle["first_event"] = min(first_event, build["cycle"]["first_event"])
+                    build = None
+                paths, rescan = sorted(pending | retry), watcher.overflowed
+                pending = set()
+                watcher.overflowed = False
+                first_event = last_event = None
+                try:
+                    build = run_cycle(paths, rescan, owner_only, no_build, cycle)
+                except RuntimeError as e:
+                    print(f"❌ Sync failed: {e} - retrying with the next change", file=sys.stderr)
+                    retry |= set(paths)
+                    continue
+                retry = set()
+                if build is None:
+                    latencies.append(print_latency(cycle))
+    except KeyboardInterrupt:
+        if build and build["thread"].is_alive():
+            cancel_build(build, "interrupted")
+    finally:
+        watcher.close()
+    print_summary(latencies, cancelled)
+    return 0
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description="OpenMower save-triggered sync + rebuild loop")
+    parser.add_argument("--debounce", type=int, default=REMOTE_CONFIG.get("watch_debounce_ms", 300),
+                        help="Quiet time in ms before a burst of saves is shipped")
+    parser.add_argument("--owner-only", action="store_true",
+                        help="Rebuild only the packages owning the changed files (skip dependents)")
+    parser.add_argument("--no-build", action="store_true", help="Only sync, never build")
+    args = parser.parse_args()
+    return watch(args.debounce / 1000.0, owner_only=args.owner_only, no_build=args.no_build)
+
+if __name__ == "__main__":
+    sys.exit(main())